@@ -1,6 +1,7 @@
 const { ipcMain, dialog, app } = require('electron');
 const fs = require('fs');
 const path = require('path');
+const { openStore, storePath } = require('./segment-store');
 
 // You need to get a reference to your main window - adjust this based on your main.js setup
 let mainWindow;
@@ -67,6 +68,10 @@ ipcMain.handle('select-json-file', async () => {
 // Read json file
 ipcMain.handle('read-json-file', async (event, filePath) => {
   try {
+    // Segment files edited through their store are read from it, so patches since the last export show up
+    if (fs.existsSync(storePath(filePath))) {
+      return { success: true, data: openStore(filePath).all() };
+    }
     const content = await fs.promises.readFile(filePath, 'utf-8');
     const json = JSON.parse(content);
     return { success: true, data: json };
@@ -244,6 +249,55 @@ ipcMain.handle('write-json-file-by-path', async (_event, filePath, data) => {
   }
 });
 
+// Segment store - single-segment patches and range queries instead of whole-file rewrites
+ipcMain.handle('load-segments', async (_event, filePath) => {
+  try {
+    return { success: true, data: openStore(filePath).all() };
+  } catch (err) {
+    return { success: false, error: err.message };
+  }
+});
+
+ipcMain.handle('query-segments', async (_event, filePath, query) => {
+  try {
+    return { success: true, data: openStore(filePath).query(query || {}) };
+  } catch (err) {
+    return { success: false, error: err.message };
+  }
+});
+
+ipcMain.handle('patch-segment', async (_event, filePath, id, fields) => {
+  try {
+    openStore(filePath).patch(id, fields);
+    return { success: true };
+  } catch (err) {
+    console.error(`❌ Error patching segment ${id}:`, err);
+    return { success: false, error: err.message };
+  }
+});
+
+// Replace every segment and write the JSON file
+ipcMain.handle('import-segments', async (_event, filePath, segments) => {
+  try {
+    const store = openStore(filePath);
+    store.replace(segments);
+    store.export();
+    return { success: true, path: filePath };
+  } catch (err) {
+    return { success: false, error: err.message };
+  }
+});
+
+// Bring the JSON file up to date with the store (for tools that read the JSON directly)
+ipcMain.handle('export-segments', async (_event, filePath) => {
+  try {
+    openStore(filePath).export();
+    return { success: true, path: filePath };
+  } catch (err) {
+    return { success: false, error: err.message };
+  }
+});
+
 // Get project path
 ipcMain.handle('get-project-path', async (_event, projectName) => {
   try {
@@ -14,13 +14,20 @@ contextBridge.exposeInMainWorld('electron', {
   getProjectPath: (projectName) => ipcRenderer.invoke('get-project-path', projectName),
   getAppPath: () => ipcRenderer.invoke('get-app-path'),
 
+  // Segment store methods
+  loadSegments: (filePath) => ipcRenderer.invoke('load-segments', filePath),
+  querySegments: (filePath, query) => ipcRenderer.invoke('query-segments', filePath, query),
+  patchSegment: (filePath, id, fields) => ipcRenderer.invoke('patch-segment', filePath, id, fields),
+  importSegments: (filePath, segments) => ipcRenderer.invoke('import-segments', filePath, segments),
+  exportSegments: (filePath) => ipcRenderer.invoke('export-segments', filePath),
+
   // Python/Video processing methods
   selectVideoFile: () => ipcRenderer.invoke('select-video-file'),
   copyVideoToProject: (params) => ipcRenderer.invoke('copy-video-to-project', params),
   checkPythonDependencies: () => ipcRenderer.invoke('check-python-dependencies'),
 
   // Audio extraction methods
-  runAudioExtraction: (inputPath, outputPath) => ipcRenderer.invoke('run-audio-extraction', { inputPath, outputPath }),
+  runAudioExtraction: (inputPath, outputPath, segments) => ipcRenderer.invoke('run-audio-extraction', { inputPath, outputPath, segments }),
   onAudioExtractionProgress: (callback) => {
     ipcRenderer.on('audio-extraction-progress', (event, data) => callback(data));
   },
@@ -41,12 +48,16 @@ contextBridge.exposeInMainWorld('electron', {
   onTranscriptionStatus: (callback) => {
     ipcRenderer.on('transcription-status', (event, data) => callback(data));
   },
+  onTranscriptionSegment: (callback) => {
+    ipcRenderer.on('transcription-segment', (event, data) => callback(data));
+  },
   onCorrectionsStatus: (callback) => {
     ipcRenderer.on('corrections-status', (event, data) => callback(data));
   },
   removeTranscriptionListeners: () => {
     ipcRenderer.removeAllListeners('transcription-progress');
     ipcRenderer.removeAllListeners('transcription-status');
+    ipcRenderer.removeAllListeners('transcription-segment');
     ipcRenderer.removeAllListeners('corrections-status');
   },
 
@@ -59,6 +70,49 @@ contextBridge.exposeInMainWorld('electron', {
     ipcRenderer.removeAllListeners('translation-status');
   },
 
+  // Pause, resume or cancel a running transcription or translation
+  controlJob: (params) => ipcRenderer.invoke('control-job', params),
+
+  // Streaming extract -> transcribe -> translate pipeline
+  runPipeline: (params) => ipcRenderer.invoke('run-pipeline', params),
+  onPipelineProgress: (callback) => {
+    ipcRenderer.on('pipeline-progress', (event, data) => callback(data));
+  },
+  onPipelineStatus: (callback) => {
+    ipcRenderer.on('pipeline-status', (event, data) => callback(data));
+  },
+  removePipelineListeners: () => {
+    ipcRenderer.removeAllListeners('pipeline-progress');
+    ipcRenderer.removeAllListeners('pipeline-status');
+  },
+
+  // Batch mode methods
+  runBatch: (params) => ipcRenderer.invoke('run-batch', params),
+  getBatchQueue: (projectDir) => ipcRenderer.invoke('get-batch-queue', projectDir),
+  onBatchProgress: (callback) => {
+    ipcRenderer.on('batch-progress', (event, data) => callback(data));
+  },
+  onBatchStatus: (callback) => {
+    ipcRenderer.on('batch-status', (event, data) => callback(data));
+  },
+  removeBatchListeners: () => {
+    ipcRenderer.removeAllListeners('batch-progress');
+    ipcRenderer.removeAllListeners('batch-status');
+  },
+
+  // Slide detection methods
+  runSlideDetection: (params) => ipcRenderer.invoke('run-slide-detection', params),
+  onSlideDetectionProgress: (callback) => {
+    ipcRenderer.on('slide-detection-progress', (event, data) => callback(data));
+  },
+  onSlideDetectionStatus: (callback) => {
+    ipcRenderer.on('slide-detection-status', (event, data) => callback(data));
+  },
+  removeSlideDetectionListeners: () => {
+    ipcRenderer.removeAllListeners('slide-detection-progress');
+    ipcRenderer.removeAllListeners('slide-detection-status');
+  },
+
   // Python environment setup methods
   setupLocalPython: () => ipcRenderer.invoke('setup-local-python'),
   testLocalPython: () => ipcRenderer.invoke('test-local-python'),
@@ -70,6 +124,11 @@ contextBridge.exposeInMainWorld('electron', {
     ipcRenderer.removeAllListeners('audio-extraction-status');
     ipcRenderer.removeAllListeners('transcription-progress');
     ipcRenderer.removeAllListeners('transcription-status');
+    ipcRenderer.removeAllListeners('transcription-segment');
     ipcRenderer.removeAllListeners('translation-status');
+    ipcRenderer.removeAllListeners('pipeline-progress');
+    ipcRenderer.removeAllListeners('pipeline-status');
+    ipcRenderer.removeAllListeners('slide-detection-progress');
+    ipcRenderer.removeAllListeners('slide-detection-status');
   }
 });
\ No newline at end of file
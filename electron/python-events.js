@@ -1,7 +1,9 @@
-const { ipcMain, dialog } = require('electron');
+const { ipcMain, dialog, app } = require('electron');
 const fs = require('fs');
+const os = require('os');
 const path = require('path');
 const { spawn } = require('child_process');
+const readline = require('readline');
 
 // You need to get a reference to your main window - adjust this based on your main.js setup
 let mainWindow;
@@ -52,6 +54,55 @@ function getPythonCommand() {
   }
 }
 
+// Extraction and transcription share one artifact cache in the app's data directory
+function getCacheDir() {
+  return path.join(app.getPath('userData'), 'cache');
+}
+
+// What the Python environment provides, from probe_environment.py: package specs and metadata
+// only (no `import whisper`, which loads all of torch), cached per interpreter in the cache dir
+function probeEnvironment(pythonCommand = getPythonCommand(), { refresh = false } = {}) {
+  const args = [path.join(__dirname, 'python', 'probe_environment.py')];
+  if (refresh) {
+    args.push('--refresh');
+  }
+
+  return new Promise((resolve) => {
+    const probe = spawn(pythonCommand, args, {
+      env: {
+        ...process.env,
+        SLIDER_CACHE_DIR: getCacheDir()
+      }
+    });
+    let output = '';
+    let error = '';
+
+    probe.stdout.on('data', (data) => {
+      output += data.toString();
+    });
+
+    probe.stderr.on('data', (data) => {
+      error += data.toString();
+    });
+
+    probe.on('close', (code) => {
+      if (code !== 0) {
+        resolve({ success: false, error: error.trim() || `Environment probe exited with code ${code}` });
+        return;
+      }
+      try {
+        resolve({ success: true, report: JSON.parse(output) });
+      } catch (e) {
+        resolve({ success: false, error: `Could not parse environment probe output: ${e.message}` });
+      }
+    });
+
+    probe.on('error', (err) => {
+      resolve({ success: false, error: err.message });
+    });
+  });
+}
+
 // Select video file
 ipcMain.handle('select-video-file', async () => {
   const result = await dialog.showOpenDialog({
@@ -125,35 +176,8 @@ ipcMain.handle('check-python-dependencies', async () => {
     const pythonCommand = getPythonCommand();
     console.log('Checking Python dependencies with command:', pythonCommand);
     
-    // Check Python and Whisper together with detailed output
-    const pythonCheck = spawn(pythonCommand, ['-c', 'import whisper; print("OK")']);
-    const pythonPromise = new Promise((resolve) => {
-      let output = '';
-      let error = '';
-      
-      pythonCheck.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      pythonCheck.stderr.on('data', (data) => {
-        error += data.toString();
-      });
-      
-      pythonCheck.on('close', (code) => {
-        console.log('Python check results:');
-        console.log('- Exit code:', code);
-        console.log('- Stdout:', output.trim());
-        console.log('- Stderr:', error.trim());
-        console.log('- Success:', code === 0 && output.includes('OK'));
-        
-        resolve(code === 0 && output.includes('OK'));
-      });
-      
-      pythonCheck.on('error', (err) => {
-        console.log('Python check error:', err.message);
-        resolve(false);
-      });
-    });
+    // Check Python and a transcription backend without importing them
+    const pythonPromise = probeEnvironment(pythonCommand);
 
     // Check ffmpeg
     const ffmpegCheck = spawn('ffmpeg', ['-version']);
@@ -168,7 +192,13 @@ ipcMain.handle('check-python-dependencies', async () => {
       });
     });
 
-    const [python, ffmpeg] = await Promise.all([pythonPromise, ffmpegPromise]);
+    const [probe, ffmpeg] = await Promise.all([pythonPromise, ffmpegPromise]);
+    const python = probe.success && probe.report.backends.length > 0;
+    
+    console.log('Python check results:');
+    console.log('- Success:', probe.success);
+    console.log('- Backends:', probe.success ? probe.report.backends : probe.error);
+    console.log('- Cached:', probe.success && probe.report.cached);
     
     console.log('Final dependency check results:');
     console.log('Python + Whisper:', python);
@@ -177,7 +207,8 @@ ipcMain.handle('check-python-dependencies', async () => {
     return {
       python,
       ffmpeg,
-      ready: python && ffmpeg
+      ready: python && ffmpeg,
+      environment: probe.success ? probe.report : undefined
     };
   } catch (error) {
     console.error('Error checking dependencies:', error);
@@ -190,7 +221,7 @@ ipcMain.handle('check-python-dependencies', async () => {
 });
 
 // Audio extraction handler
-ipcMain.handle('run-audio-extraction', async (_event, { inputPath, outputPath }) => {
+ipcMain.handle('run-audio-extraction', async (_event, { inputPath, outputPath, segments = 'auto' }) => {
   try {
     // Initialize paths
     let absoluteInputPath = inputPath;
@@ -225,16 +256,24 @@ ipcMain.handle('run-audio-extraction', async (_event, { inputPath, outputPath })
     console.log('Script path:', pythonScript);
     console.log('Input path:', absoluteInputPath);
     console.log('Output path:', absoluteOutputPath);
+    console.log('Segments:', segments);
     
     return new Promise((resolve) => {
-      const pythonProcess = spawn(pythonCommand, [pythonScript, absoluteInputPath, absoluteOutputPath]);
+      // Long recordings are decoded as parallel time ranges ("auto" decides by duration and cores)
+      const pythonProcess = spawn(pythonCommand, [pythonScript, absoluteInputPath, absoluteOutputPath, String(segments)], {
+        env: {
+          ...process.env,
+          SLIDER_CACHE_DIR: getCacheDir()
+        }
+      });
       
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
       let hasError = false;
       let errorMessage = '';
       
-      pythonProcess.stdout.on('data', (data) => {
-        const output = data.toString().trim();
-        console.log('Python output:', output);
+      lines.on('line', (line) => {
+        const output = line.trim();
+        if (!output) return;
         
         // Parse structured output from Python script
         if (output.startsWith('PROGRESS:')) {
@@ -308,156 +347,347 @@ ipcMain.handle('run-audio-extraction', async (_event, { inputPath, outputPath })
   }
 });
 
-// Transcription handler with improved process management
-ipcMain.handle('run-transcription', async (_event, { audioPath, outputPath, corrections, language = 'he', modelSize = 'medium' }) => {
+// Running jobs that take pause/resume/cancel commands on stdin (see python/job_control.py)
+const activeJobs = new Map();
+
+// How long a cancelled job gets to finish its chunk or request and save, before it is terminated
+const CANCEL_GRACE_MS = 60 * 1000;
+
+// A timeout that stops counting while its job is paused
+function createJobTimeout(ms, onTimeout) {
+  let remaining = ms;
+  let started = Date.now();
+  let timer = setTimeout(onTimeout, remaining);
+  let cleared = false;
+
+  return {
+    pause() {
+      if (!timer) return;
+      clearTimeout(timer);
+      timer = null;
+      remaining -= Date.now() - started;
+    },
+    resume() {
+      if (timer || cleared) return;
+      started = Date.now();
+      timer = setTimeout(onTimeout, Math.max(0, remaining));
+    },
+    clear() {
+      cleared = true;
+      clearTimeout(timer);
+      timer = null;
+    }
+  };
+}
+
+// Long-lived transcription worker - keeps Whisper models loaded between runs
+let transcriptionWorker = null;
+let transcriptionJobCounter = 0;
+
+function getTranscriptionWorker() {
+  if (transcriptionWorker && transcriptionWorker.exitCode === null && !transcriptionWorker.killed) {
+    return transcriptionWorker;
+  }
+
+  const pythonCommand = getPythonCommand();
+  const workerScript = path.join(__dirname, 'python', 'whisper_worker.py');
+
+  console.log('Starting transcription worker:', pythonCommand, workerScript);
+
+  // Spawn process with increased memory
+  const worker = spawn(pythonCommand, [workerScript], {
+    stdio: ['pipe', 'pipe', 'pipe'],
+    env: {
+      ...process.env,
+      // Set Python memory limits
+      PYTHONUNBUFFERED: '1',
+      OMP_NUM_THREADS: '1', // Limit OpenMP threads to reduce memory usage
+      MKL_NUM_THREADS: '1', // Limit MKL threads
+      NUMEXPR_NUM_THREADS: '1', // Limit NumExpr threads
+      OPENBLAS_NUM_THREADS: '1', // Limit OpenBLAS threads
+      // Add memory limit for PyTorch
+      PYTORCH_CUDA_ALLOC_CONF: 'max_split_size_mb:512',
+      SLIDER_CACHE_DIR: getCacheDir()
+    }
+  });
+
+  // Read stdout line by line so JSON messages split across chunks stay intact
+  worker.lines = readline.createInterface({ input: worker.stdout });
+  worker.setMaxListeners(0);
+
+  // A command written just as the worker exits must not take the main process down
+  worker.stdin.on('error', (error) => {
+    console.error('Transcription worker stdin error:', error.message);
+  });
+
+  worker.on('exit', (code, signal) => {
+    console.log('Transcription worker exited:', code, signal);
+    if (transcriptionWorker === worker) {
+      transcriptionWorker = null;
+    }
+  });
+
+  worker.on('error', (error) => {
+    console.error('Transcription worker error:', error);
+    if (transcriptionWorker === worker) {
+      transcriptionWorker = null;
+    }
+  });
+
+  transcriptionWorker = worker;
+  return worker;
+}
+
+function stopTranscriptionWorker() {
+  if (transcriptionWorker) {
+    transcriptionWorker.stdin.end();
+    transcriptionWorker.kill('SIGTERM');
+    transcriptionWorker = null;
+  }
+}
+
+app.on('before-quit', stopTranscriptionWorker);
+
+// Transcription handler - sends jobs to the long-lived worker
+ipcMain.handle('run-transcription', async (_event, { audioPath, outputPath, corrections, correctionsPath, language = 'he', modelSize = 'medium', chunkSeconds = 'auto', overlapSeconds = 1, workers = 1, resume = true, backend = 'whisper', memoryBudgetMb }) => {
   try {
     // Initialize paths
     let absoluteAudioPath = audioPath;
     let absoluteOutputPath = outputPath;
-    
+
     // Handle relative project paths
     if (audioPath.startsWith('projects/')) {
       absoluteAudioPath = path.join(__dirname, '..', audioPath);
     }
-    
+
     if (outputPath.startsWith('projects/')) {
       absoluteOutputPath = path.join(__dirname, '..', outputPath);
-      
+
       // Ensure output directory exists
       const outputDir = path.dirname(absoluteOutputPath);
       if (!fs.existsSync(outputDir)) {
         fs.mkdirSync(outputDir, { recursive: true });
       }
     }
-    
+
     // Verify audio file exists
     if (!fs.existsSync(absoluteAudioPath)) {
       return { success: false, error: `Audio file does not exist: ${absoluteAudioPath}` };
     }
-    
+
     // Check file size and recommend smaller model for large files
     const stats = fs.statSync(absoluteAudioPath);
     const fileSizeMB = stats.size / (1024 * 1024);
-    
+
     console.log(`Audio file size: ${fileSizeMB.toFixed(2)} MB`);
-    
+
     if (fileSizeMB > 50 && modelSize !== 'tiny') {
       console.log('Large file detected, consider using tiny model');
     }
-    
-    // Get the correct Python command and script path
-    const pythonCommand = getPythonCommand();
-    const pythonScript = path.join(__dirname, 'python', '2_transcribe_audio.py');
-    
+
+    const jobId = `transcription_${Date.now()}_${++transcriptionJobCounter}`;
+
+    // Corrections go to the worker as a file - large dictionaries don't belong in a JSON message
+    let absoluteCorrectionsPath = correctionsPath || null;
+    let temporaryCorrectionsPath = null;
+
+    if (absoluteCorrectionsPath && absoluteCorrectionsPath.startsWith('projects/')) {
+      absoluteCorrectionsPath = path.join(__dirname, '..', absoluteCorrectionsPath);
+    } else if (!absoluteCorrectionsPath && corrections && corrections !== 'null') {
+      temporaryCorrectionsPath = path.join(os.tmpdir(), `slider-corrections-${jobId}.json`);
+      fs.writeFileSync(temporaryCorrectionsPath, typeof corrections === 'string' ? corrections : JSON.stringify(corrections), 'utf-8');
+      absoluteCorrectionsPath = temporaryCorrectionsPath;
+    }
+
     console.log('Transcription details:');
-    console.log('Python command:', pythonCommand);
-    console.log('Script path:', pythonScript);
+    console.log('Job id:', jobId);
     console.log('Audio path:', absoluteAudioPath);
     console.log('Output path:', absoluteOutputPath);
     console.log('Language:', language);
     console.log('Model size:', modelSize);
+    console.log('Chunk length:', `${chunkSeconds}s (overlap ${overlapSeconds}s)`);
+    console.log('Workers:', workers);
+    console.log('Memory budget:', memoryBudgetMb ? `${memoryBudgetMb} MB` : 'auto');
+    console.log('Backend:', backend);
     console.log('File size:', `${fileSizeMB.toFixed(2)} MB`);
-    
+
     return new Promise((resolve) => {
-      const args = [
-        pythonScript,
-        absoluteAudioPath,
-        absoluteOutputPath,
-        corrections || 'null',
+      const job = {
+        id: jobId,
+        audioPath: absoluteAudioPath,
+        outputPath: absoluteOutputPath,
+        correctionsPath: absoluteCorrectionsPath,
         language,
-        modelSize
-      ];
-      
-      console.log('Full command:', pythonCommand, args.join(' '));
-      
-      // Spawn process with increased memory and timeout
-      const pythonProcess = spawn(pythonCommand, args, {
-        stdio: ['pipe', 'pipe', 'pipe'],
-        env: {
-          ...process.env,
-          // Set Python memory limits
-          PYTHONUNBUFFERED: '1',
-          OMP_NUM_THREADS: '1', // Limit OpenMP threads to reduce memory usage
-          MKL_NUM_THREADS: '1', // Limit MKL threads
-          NUMEXPR_NUM_THREADS: '1', // Limit NumExpr threads
-          OPENBLAS_NUM_THREADS: '1', // Limit OpenBLAS threads
-          // Add memory limit for PyTorch
-          PYTORCH_CUDA_ALLOC_CONF: 'max_split_size_mb:512'
-        }
-      });
-      
-      let hasError = false;
+        modelSize,
+        // 'auto' fits chunk length and worker count into the memory budget
+        chunkSeconds,
+        overlapSeconds,
+        workers,
+        memoryBudgetMb,
+        // 'whisper' (PyTorch) or 'faster-whisper' (int8 on CPU)
+        backend,
+        // Continue from the checkpoint journal if an earlier run of the same job was interrupted
+        resume
+      };
+
+      const pythonProcess = getTranscriptionWorker();
+
+      // The worker's JOB line decides the result; errors before it are chunks it skipped
+      const warnings = [];
       let errorMessage = '';
-      let lastActivity = Date.now();
-      
-      // Set up timeout (30 minutes for transcription)
-      const timeout = setTimeout(() => {
-        console.log('Transcription timeout reached, killing process...');
-        pythonProcess.kill('SIGTERM');
-        
-        setTimeout(() => {
-          if (!pythonProcess.killed) {
-            console.log('Force killing process...');
-            pythonProcess.kill('SIGKILL');
+      let isActive = false;
+      let settled = false;
+      let timedOut = false;
+      let escalation = null;
+      // Started when the worker picks the job up, not while it waits behind another one
+      let timeout = null;
+      let paused = false;
+
+      const sendCommand = (command) => {
+        if (pythonProcess.exitCode === null && pythonProcess.stdin.writable) {
+          pythonProcess.stdin.write(JSON.stringify({ command, id: jobId }) + '\n');
+        }
+      };
+
+      const jobControl = {
+        control: (command) => {
+          if (command === 'pause') {
+            paused = true;
+            if (timeout) timeout.pause();
           }
-        }, 5000);
-        
-        resolve({ 
-          success: false, 
-          error: 'Transcription timed out. Try using a smaller model (tiny or base) or a shorter audio file.' 
-        });
-      }, 30 * 60 * 1000); // 30 minutes
-      
-      pythonProcess.stdout.on('data', (data) => {
-        lastActivity = Date.now();
-        const output = data.toString().trim();
-        
-        // Split by lines in case multiple JSON objects are on same line
-        const lines = output.split('\n');
-        
-        for (const line of lines) {
-          const trimmedLine = line.trim();
-          if (!trimmedLine) continue;
-          
-          console.log('Transcription output line:', trimmedLine);
-          
-          // Parse structured output from Python script
-          if (trimmedLine.startsWith('PROGRESS:')) {
-            try {
-              const progressData = JSON.parse(trimmedLine.substring(9));
-              if (mainWindow && mainWindow.webContents) {
-                mainWindow.webContents.send('transcription-progress', progressData);
-              }
-            } catch (e) {
-              console.error('Error parsing transcription progress data:', e);
-              console.error('Problematic line:', trimmedLine);
+          if (command === 'resume') {
+            paused = false;
+            if (timeout) timeout.resume();
+          }
+          sendCommand(command);
+        }
+      };
+      activeJobs.set('transcription', jobControl);
+
+      const finish = (result) => {
+        if (settled) return;
+        settled = true;
+        if (timeout) timeout.clear();
+        clearTimeout(escalation);
+        if (activeJobs.get('transcription') === jobControl) {
+          activeJobs.delete('transcription');
+        }
+        if (temporaryCorrectionsPath) {
+          fs.rm(temporaryCorrectionsPath, { force: true }, () => {});
+        }
+        pythonProcess.lines.removeListener('line', onLine);
+        pythonProcess.stderr.removeListener('data', onStderr);
+        pythonProcess.removeListener('exit', onExit);
+        pythonProcess.removeListener('error', onError);
+        resolve(result);
+      };
+
+      // Set up timeout (30 minutes for transcription, not counting pauses). The job is cancelled
+      // first, so finished chunks are saved and the worker keeps its model; it is only killed
+      // if it doesn't stop within the grace period.
+      const onTimeout = () => {
+        console.log('Transcription timeout reached, cancelling job...');
+        timedOut = true;
+        sendCommand('cancel');
+
+        escalation = setTimeout(() => {
+          if (settled) return;
+          console.log('Cancelled transcription did not stop, killing worker...');
+          pythonProcess.kill('SIGTERM');
+
+          setTimeout(() => {
+            if (pythonProcess.exitCode === null) {
+              console.log('Force killing worker...');
+              pythonProcess.kill('SIGKILL');
+            }
+          }, 5000);
+        }, CANCEL_GRACE_MS);
+      };
+
+      const onLine = (line) => {
+        const trimmedLine = line.trim();
+        if (!trimmedLine) return;
+
+        console.log('Transcription output line:', trimmedLine);
+
+        // Parse structured output from Python script
+        if (trimmedLine.startsWith('JOB:')) {
+          try {
+            const jobData = JSON.parse(trimmedLine.substring(4));
+            if (jobData.id !== jobId) return;
+
+            if (jobData.status === 'started') {
+              isActive = true;
+              timeout = createJobTimeout(30 * 60 * 1000, onTimeout);
+              if (paused) timeout.pause();
+            } else if (jobData.status === 'done') {
+              finish({ success: true, warnings });
+            } else if (jobData.status === 'cancelled') {
+              finish({
+                success: false,
+                cancelled: true,
+                error: timedOut
+                  ? 'Transcription timed out. The finished chunks were saved and are reused when you run it again. Try using a smaller model (tiny or base) or a shorter audio file.'
+                  : 'Transcription cancelled. The finished chunks were saved and are reused when you run it again.'
+              });
+            } else {
+              finish({
+                success: false,
+                error: errorMessage || jobData.error || 'Transcription failed'
+              });
             }
-          } else if (trimmedLine.startsWith('STATUS:')) {
-            try {
-              const statusData = JSON.parse(trimmedLine.substring(7));
-              if (mainWindow && mainWindow.webContents) {
-                mainWindow.webContents.send('transcription-status', statusData);
-              }
-              
-              if (statusData.status === 'error') {
-                hasError = true;
-                errorMessage = statusData.message;
-              }
-            } catch (e) {
-              console.error('Error parsing transcription status data:', e);
-              console.error('Problematic line:', trimmedLine);
+          } catch (e) {
+            console.error('Error parsing transcription job data:', e);
+            console.error('Problematic line:', trimmedLine);
+          }
+        } else if (!isActive) {
+          // Output that belongs to another job or to worker startup
+          return;
+        } else if (trimmedLine.startsWith('SEGMENT:')) {
+          // Finished segments arrive while later chunks are still decoding
+          try {
+            const segmentData = JSON.parse(trimmedLine.substring(8));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('transcription-segment', segmentData);
             }
-          } else {
-            // Handle regular log messages
-            console.log('Transcription output:', trimmedLine);
+          } catch (e) {
+            console.error('Error parsing transcription segment data:', e);
+            console.error('Problematic line:', trimmedLine);
           }
+        } else if (trimmedLine.startsWith('PROGRESS:')) {
+          try {
+            const progressData = JSON.parse(trimmedLine.substring(9));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('transcription-progress', progressData);
+            }
+          } catch (e) {
+            console.error('Error parsing transcription progress data:', e);
+            console.error('Problematic line:', trimmedLine);
+          }
+        } else if (trimmedLine.startsWith('STATUS:')) {
+          try {
+            const statusData = JSON.parse(trimmedLine.substring(7));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('transcription-status', statusData);
+            }
+
+            if (statusData.status === 'error') {
+              errorMessage = statusData.message;
+              warnings.push(statusData.message);
+            }
+          } catch (e) {
+            console.error('Error parsing transcription status data:', e);
+            console.error('Problematic line:', trimmedLine);
+          }
+        } else {
+          // Handle regular log messages
+          console.log('Transcription output:', trimmedLine);
         }
-      });
-      
-      pythonProcess.stderr.on('data', (data) => {
-        lastActivity = Date.now();
+      };
+
+      const onStderr = (data) => {
         const error = data.toString().trim();
-        
+
         // Filter out common Whisper warnings that aren't real errors
         const ignoredWarnings = [
           'FP16 is not supported on CPU',
@@ -468,20 +698,19 @@ ipcMain.handle('run-transcription', async (_event, { audioPath, outputPath, corr
           '%|',
           'warnings.warn'
         ];
-        
+
         const isIgnoredWarning = ignoredWarnings.some(warning => error.includes(warning));
-        
+
         // Check for memory errors
-        const isMemoryError = error.includes('MemoryError') || 
-                             error.includes('out of memory') || 
+        const isMemoryError = error.includes('MemoryError') ||
+                             error.includes('out of memory') ||
                              error.includes('killed') ||
                              error.includes('Killed');
-        
+
         if (isMemoryError) {
           console.error('Memory error detected:', error);
-          hasError = true;
           errorMessage = 'Out of memory. Try using a smaller model (tiny or base) or a shorter audio file.';
-          
+
           if (mainWindow && mainWindow.webContents) {
             mainWindow.webContents.send('transcription-status', {
               type: 'status',
@@ -489,11 +718,10 @@ ipcMain.handle('run-transcription', async (_event, { audioPath, outputPath, corr
               message: errorMessage
             });
           }
-        } else if (!isIgnoredWarning) {
+        } else if (!isIgnoredWarning && isActive) {
           console.error('Transcription error:', error);
-          hasError = true;
           errorMessage = error;
-          
+
           if (mainWindow && mainWindow.webContents) {
             mainWindow.webContents.send('transcription-status', {
               type: 'status',
@@ -505,101 +733,308 @@ ipcMain.handle('run-transcription', async (_event, { audioPath, outputPath, corr
           // Just log warnings without treating as errors
           console.log('Transcription warning (ignored):', error);
         }
-      });
-      
-      pythonProcess.on('close', (code) => {
-        clearTimeout(timeout);
-        console.log('Transcription process closed with code:', code);
-        
-        if (code === null) {
-          // Process was killed/terminated
-          resolve({ 
-            success: false, 
-            error: 'Transcription was interrupted. This usually happens due to memory constraints. Try using a smaller model (tiny or base).' 
+      };
+
+      // Handle the worker dying mid-job
+      const onExit = (code, signal) => {
+        console.log('Transcription worker closed with code:', code, 'signal:', signal);
+
+        if (timedOut) {
+          finish({
+            success: false,
+            error: 'Transcription timed out. Try using a smaller model (tiny or base) or a shorter audio file.'
+          });
+        } else if (signal === 'SIGKILL' || signal === 'SIGTERM' || code === null) {
+          finish({
+            success: false,
+            error: 'Transcription was interrupted. This usually happens due to memory constraints. Try using a smaller model (tiny or base).'
           });
-        } else if (code === 0 && !hasError) {
-          resolve({ success: true });
         } else {
-          resolve({ 
-            success: false, 
-            error: errorMessage || `Python transcription process exited with code ${code}` 
+          finish({
+            success: false,
+            error: errorMessage || `Python transcription process exited with code ${code}`
           });
         }
-      });
-      
-      pythonProcess.on('error', (error) => {
-        clearTimeout(timeout);
+      };
+
+      const onError = (error) => {
         console.error('Failed to start transcription process:', error);
-        resolve({ 
-          success: false, 
-          error: `Failed to start transcription process: ${error.message}` 
+        finish({
+          success: false,
+          error: `Failed to start transcription process: ${error.message}`
         });
-      });
-      
-      // Handle process being killed
-      pythonProcess.on('exit', (code, signal) => {
-        clearTimeout(timeout);
-        if (signal === 'SIGKILL' || signal === 'SIGTERM') {
-          console.log('Process was killed with signal:', signal);
-          resolve({ 
-            success: false, 
-            error: 'Transcription process was terminated. Try using a smaller model or shorter audio file.' 
-          });
-        }
-      });
+      };
+
+      pythonProcess.lines.on('line', onLine);
+      pythonProcess.stderr.on('data', onStderr);
+      pythonProcess.on('exit', onExit);
+      pythonProcess.on('error', onError);
+
+      pythonProcess.stdin.write(JSON.stringify(job) + '\n');
     });
-    
+
   } catch (error) {
     console.error('Error in transcription:', error);
     return { success: false, error: error.message };
   }
 });
 
-// Setup local Python environment
-ipcMain.handle('setup-local-python', async () => {
+// Re-apply corrections to an existing segments file without re-transcribing
+ipcMain.handle('apply-corrections', async (_event, { jsonFilePath, corrections, outputPath }) => {
   try {
-    const projectRoot = path.join(__dirname, '..');
-    const envPath = path.join(projectRoot, 'python-env');
-    
-    console.log('Setting up local Python environment...');
-    console.log('Project root:', projectRoot);
-    console.log('Environment path:', envPath);
-    
-    // Check if environment already exists
-    if (fs.existsSync(envPath)) {
-      // Test if it has whisper
-      const pythonPath = path.join(envPath, 'bin', 'python');
-      if (fs.existsSync(pythonPath)) {
-        const testResult = await new Promise((resolve) => {
-          const testProcess = spawn(pythonPath, ['-c', 'import whisper; print("OK")']);
-          testProcess.on('close', (code) => resolve(code === 0));
-          testProcess.on('error', () => resolve(false));
-        });
-        
-        if (testResult) {
-          return { success: true, message: 'Local Python environment already exists and works!' };
-        }
-      }
-      
-      // Remove broken environment
-      console.log('Removing broken environment...');
-      fs.rmSync(envPath, { recursive: true, force: true });
+    // Initialize paths
+    let absoluteJsonPath = jsonFilePath;
+    let absoluteOutputPath = outputPath || jsonFilePath;
+
+    // Handle relative project paths
+    if (jsonFilePath.startsWith('projects/')) {
+      absoluteJsonPath = path.join(__dirname, '..', jsonFilePath);
     }
-    
+
+    if (absoluteOutputPath.startsWith('projects/')) {
+      absoluteOutputPath = path.join(__dirname, '..', absoluteOutputPath);
+    }
+
+    // Verify segments file exists
+    if (!fs.existsSync(absoluteJsonPath)) {
+      return { success: false, error: `Segments file does not exist: ${absoluteJsonPath}` };
+    }
+
+    // Hand the dictionary over as a file - large dictionaries don't fit on a command line
+    const correctionsPath = path.join(os.tmpdir(), `slider-corrections-${Date.now()}.json`);
+    fs.writeFileSync(correctionsPath, JSON.stringify(corrections || {}), 'utf-8');
+
+    const pythonCommand = getPythonCommand();
+    const pythonScript = path.join(__dirname, 'python', 'corrections.py');
+
+    console.log('Corrections details:');
+    console.log('Script path:', pythonScript);
+    console.log('Segments path:', absoluteJsonPath);
+    console.log('Output path:', absoluteOutputPath);
+    console.log('Rules:', Object.keys(corrections || {}).length);
+
     return new Promise((resolve) => {
-      console.log('Creating virtual environment...');
-      const createEnv = spawn('python3', ['-m', 'venv', envPath]);
-      
-      createEnv.stdout.on('data', (data) => {
-        console.log('venv stdout:', data.toString());
-      });
-      
-      createEnv.stderr.on('data', (data) => {
-        console.log('venv stderr:', data.toString());
-      });
-      
-      createEnv.on('close', (code) => {
-        if (code !== 0) {
+      const pythonProcess = spawn(pythonCommand, [pythonScript, absoluteJsonPath, correctionsPath, absoluteOutputPath]);
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
+
+      let hasError = false;
+      let errorMessage = '';
+
+      lines.on('line', (line) => {
+        const trimmedLine = line.trim();
+        if (!trimmedLine) return;
+
+        if (trimmedLine.startsWith('STATUS:')) {
+          try {
+            const statusData = JSON.parse(trimmedLine.substring(7));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('corrections-status', statusData);
+            }
+
+            if (statusData.status === 'error') {
+              hasError = true;
+              errorMessage = statusData.message;
+            }
+          } catch (e) {
+            console.error('Error parsing corrections status data:', e);
+          }
+        } else {
+          console.log('Corrections output:', trimmedLine);
+        }
+      });
+
+      pythonProcess.stderr.on('data', (data) => {
+        const error = data.toString().trim();
+        console.error('Corrections error:', error);
+        hasError = true;
+        errorMessage = error;
+      });
+
+      pythonProcess.on('close', (code) => {
+        fs.rm(correctionsPath, { force: true }, () => {});
+
+        if (code === 0 && !hasError) {
+          resolve({ success: true });
+        } else {
+          resolve({
+            success: false,
+            error: errorMessage || `Corrections process exited with code ${code}`
+          });
+        }
+      });
+
+      pythonProcess.on('error', (error) => {
+        fs.rm(correctionsPath, { force: true }, () => {});
+        resolve({
+          success: false,
+          error: `Failed to start corrections process: ${error.message}`
+        });
+      });
+    });
+
+  } catch (error) {
+    console.error('Error applying corrections:', error);
+    return { success: false, error: error.message };
+  }
+});
+
+// Detect slide changes in the project video and pre-assign segment slide numbers
+ipcMain.handle('run-slide-detection', async (_event, { projectName, videoPath, segmentsPath, timesPath, fps = 1, overwrite = false }) => {
+  try {
+    const projectPath = path.join(__dirname, '..', 'projects', projectName);
+
+    // Defaults: the video copied by copy-video-to-project, the project's segments and imported slides
+    let absoluteVideoPath = videoPath ? path.resolve(path.join(__dirname, '..'), videoPath) : null;
+    if (!absoluteVideoPath) {
+      const filesFolder = path.join(projectPath, 'files');
+      const video = fs.existsSync(filesFolder) && fs.readdirSync(filesFolder).find(file => path.parse(file).name === 'video');
+      absoluteVideoPath = video ? path.join(filesFolder, video) : null;
+    }
+    const absoluteSegmentsPath = segmentsPath
+      ? path.resolve(path.join(__dirname, '..'), segmentsPath)
+      : path.join(projectPath, 'segments.json');
+    const slidesDir = path.join(projectPath, 'slides');
+    // Projects translated before segments carried start/end take their times from the transcription
+    const projectTimesPath = path.join(projectPath, 'files', 'audio_segments.json');
+    const absoluteTimesPath = timesPath
+      ? path.resolve(path.join(__dirname, '..'), timesPath)
+      : (fs.existsSync(projectTimesPath) ? projectTimesPath : null);
+
+    if (!absoluteVideoPath || !fs.existsSync(absoluteVideoPath)) {
+      return { success: false, error: 'The project has no video to detect slides in' };
+    }
+    if (!fs.existsSync(absoluteSegmentsPath)) {
+      return { success: false, error: `Segments file does not exist: ${absoluteSegmentsPath}` };
+    }
+
+    const pythonCommand = getPythonCommand();
+    const pythonScript = path.join(__dirname, 'python', '4_detect_slides.py');
+
+    console.log('Slide detection details:');
+    console.log('Video path:', absoluteVideoPath);
+    console.log('Segments path:', absoluteSegmentsPath);
+    console.log('Slides folder:', slidesDir, fs.existsSync(slidesDir));
+    console.log('Times path:', absoluteTimesPath);
+
+    return new Promise((resolve) => {
+      const job = {
+        videoPath: absoluteVideoPath,
+        segmentsPath: absoluteSegmentsPath,
+        slidesDir: fs.existsSync(slidesDir) ? slidesDir : null,
+        timesPath: absoluteTimesPath,
+        fps,
+        overwrite
+      };
+      const pythonProcess = spawn(pythonCommand, [pythonScript, '--job', '-']);
+      pythonProcess.stdin.write(JSON.stringify(job) + '\n');
+      pythonProcess.stdin.end();
+
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
+      let hasError = false;
+      let errorMessage = '';
+
+      lines.on('line', (line) => {
+        const trimmedLine = line.trim();
+        if (!trimmedLine) return;
+
+        if (trimmedLine.startsWith('PROGRESS:')) {
+          try {
+            const progressData = JSON.parse(trimmedLine.substring(9));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('slide-detection-progress', progressData);
+            }
+          } catch (e) {
+            console.error('Error parsing slide detection progress data:', e);
+          }
+        } else if (trimmedLine.startsWith('STATUS:')) {
+          try {
+            const statusData = JSON.parse(trimmedLine.substring(7));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('slide-detection-status', statusData);
+            }
+
+            if (statusData.status === 'error') {
+              hasError = true;
+              errorMessage = statusData.message;
+            }
+          } catch (e) {
+            console.error('Error parsing slide detection status data:', e);
+          }
+        } else {
+          console.log('Slide detection output:', trimmedLine);
+        }
+      });
+
+      pythonProcess.stderr.on('data', (data) => {
+        console.error('Slide detection error:', data.toString().trim());
+      });
+
+      pythonProcess.on('close', (code) => {
+        if (code === 0 && !hasError) {
+          resolve({ success: true, segmentsPath: absoluteSegmentsPath, slidesPath: `${absoluteSegmentsPath}.slides.json` });
+        } else {
+          resolve({
+            success: false,
+            error: errorMessage || `Slide detection exited with code ${code}`
+          });
+        }
+      });
+
+      pythonProcess.on('error', (error) => {
+        resolve({
+          success: false,
+          error: `Failed to start slide detection: ${error.message}`
+        });
+      });
+    });
+
+  } catch (error) {
+    console.error('Error detecting slides:', error);
+    return { success: false, error: error.message };
+  }
+});
+
+// Setup local Python environment
+ipcMain.handle('setup-local-python', async () => {
+  try {
+    const projectRoot = path.join(__dirname, '..');
+    const envPath = path.join(projectRoot, 'python-env');
+    
+    console.log('Setting up local Python environment...');
+    console.log('Project root:', projectRoot);
+    console.log('Environment path:', envPath);
+    
+    // Check if environment already exists
+    if (fs.existsSync(envPath)) {
+      // Test if it has whisper
+      const pythonPath = path.join(envPath, 'bin', 'python');
+      if (fs.existsSync(pythonPath)) {
+        const probe = await probeEnvironment(pythonPath);
+        
+        if (probe.success && probe.report.packages.whisper.installed) {
+          return { success: true, message: 'Local Python environment already exists and works!' };
+        }
+      }
+      
+      // Remove broken environment
+      console.log('Removing broken environment...');
+      fs.rmSync(envPath, { recursive: true, force: true });
+    }
+    
+    return new Promise((resolve) => {
+      console.log('Creating virtual environment...');
+      const createEnv = spawn('python3', ['-m', 'venv', envPath]);
+      
+      createEnv.stdout.on('data', (data) => {
+        console.log('venv stdout:', data.toString());
+      });
+      
+      createEnv.stderr.on('data', (data) => {
+        console.log('venv stderr:', data.toString());
+      });
+      
+      createEnv.on('close', (code) => {
+        if (code !== 0) {
           resolve({ success: false, error: `Failed to create virtual environment (exit code: ${code})` });
           return;
         }
@@ -608,7 +1043,7 @@ ipcMain.handle('setup-local-python', async () => {
         
         // Install whisper in the new environment
         const pythonPath = path.join(envPath, 'bin', 'python');
-        const installWhisper = spawn(pythonPath, ['-m', 'pip', 'install', 'openai-whisper', 'pydub']);
+        const installWhisper = spawn(pythonPath, ['-m', 'pip', 'install', 'openai-whisper']);
         
         installWhisper.stdout.on('data', (data) => {
           console.log('pip stdout:', data.toString());
@@ -668,38 +1103,18 @@ ipcMain.handle('test-local-python', async () => {
     console.log('Python command:', pythonCommand);
     console.log('Python executable exists:', fs.existsSync(pythonCommand));
     
-    // Test Python import
-    const result = await new Promise((resolve) => {
-      const testProcess = spawn(pythonCommand, ['-c', 'import whisper; print("SUCCESS: Whisper found!"); print("Python path:", __file__)']);
-      let output = '';
-      let error = '';
-      
-      testProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      testProcess.stderr.on('data', (data) => {
-        error += data.toString();
-      });
-      
-      testProcess.on('close', (code) => {
-        resolve({
-          exitCode: code,
-          output: output.trim(),
-          error: error.trim(),
-          success: code === 0 && output.includes('SUCCESS')
-        });
-      });
-      
-      testProcess.on('error', (err) => {
-        resolve({
-          exitCode: -1,
-          output: '',
-          error: err.message,
-          success: false
-        });
-      });
-    });
+    // Look Whisper up without importing it; an explicit test always re-probes
+    const probe = await probeEnvironment(pythonCommand, { refresh: true });
+    const whisper = probe.success ? probe.report.packages.whisper : null;
+    const result = {
+      exitCode: probe.success ? 0 : -1,
+      output: whisper && whisper.installed
+        ? `SUCCESS: Whisper ${whisper.version || '(unknown version)'} found! Python: ${probe.report.python.executable}`
+        : '',
+      error: probe.success ? (whisper.installed ? '' : 'Whisper is not installed') : probe.error,
+      success: !!(whisper && whisper.installed),
+      environment: probe.success ? probe.report : undefined
+    };
     
     console.log('Test result:', result);
     
@@ -727,60 +1142,24 @@ ipcMain.handle('debug-python-environment', async () => {
     console.log('Python command:', pythonCommand);
     console.log('Environment PATH:', process.env.PATH);
     
-    // Test Python version
-    const versionResult = await new Promise((resolve) => {
-      const versionCheck = spawn(pythonCommand, ['--version']);
-      let output = '';
-      
-      versionCheck.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      versionCheck.stderr.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      versionCheck.on('close', (code) => {
-        resolve({ success: code === 0, output: output.trim() });
-      });
-    });
+    // One probe answers version, Whisper and path questions without importing Whisper
+    const probe = await probeEnvironment(pythonCommand, { refresh: true });
+    const report = probe.report;
+    const whisper = probe.success ? report.packages.whisper : null;
     
-    // Test Whisper import
-    const whisperResult = await new Promise((resolve) => {
-      const whisperCheck = spawn(pythonCommand, ['-c', 'import whisper; print("Whisper version:", whisper.__version__)']);
-      let output = '';
-      let error = '';
-      
-      whisperCheck.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      whisperCheck.stderr.on('data', (data) => {
-        error += data.toString();
-      });
-      
-      whisperCheck.on('close', (code) => {
-        resolve({ 
-          success: code === 0, 
-          output: output.trim(), 
-          error: error.trim() 
-        });
-      });
-    });
+    const versionResult = probe.success
+      ? { success: true, output: `Python ${report.python.version}` }
+      : { success: false, output: probe.error };
     
-    // Test Python path
-    const pathResult = await new Promise((resolve) => {
-      const pathCheck = spawn(pythonCommand, ['-c', 'import sys; print("Python executable:", sys.executable); print("Python path:", sys.path)']);
-      let output = '';
-      
-      pathCheck.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      pathCheck.on('close', (code) => {
-        resolve({ success: code === 0, output: output.trim() });
-      });
-    });
+    const whisperResult = {
+      success: !!(whisper && whisper.installed),
+      output: whisper && whisper.installed ? `Whisper version: ${whisper.version}` : '',
+      error: probe.success ? (whisper.installed ? '' : 'Whisper is not installed') : probe.error
+    };
+    
+    const pathResult = probe.success
+      ? { success: true, output: `Python executable: ${report.python.executable}\nPython path: ${JSON.stringify(report.python.path)}` }
+      : { success: false, output: probe.error };
     
     return {
       cwd: process.cwd(),
@@ -788,7 +1167,8 @@ ipcMain.handle('debug-python-environment', async () => {
       envPath: process.env.PATH,
       version: versionResult,
       whisper: whisperResult,
-      pythonPath: pathResult
+      pythonPath: pathResult,
+      environment: report
     };
     
   } catch (error) {
@@ -806,7 +1186,11 @@ ipcMain.handle('run-translation', async (_event, params) => {
       systemPrompt, 
       sourceLanguage = 'he', 
       targetLanguage = 'en', 
-      model = 'gpt-4' 
+      model = 'gpt-4',
+      concurrency = 8,
+      batchSize = 10,
+      resume = true,
+      useMemory = true
     } = params;
     
     // Initialize paths
@@ -854,84 +1238,128 @@ ipcMain.handle('run-translation', async (_event, params) => {
     console.log('Source language:', sourceLanguage);
     console.log('Target language:', targetLanguage);
     console.log('Model:', model);
+    console.log('Concurrency:', concurrency, 'Batch size:', batchSize);
     console.log('API key length:', apiKey.length);
     
     return new Promise((resolve) => {
-      const args = [
-        pythonScript,
-        absoluteInputPath,
-        absoluteOutputPath,
+      // The job travels over stdin so the API key and prompt stay off the command line
+      const job = {
+        inputPath: absoluteInputPath,
+        outputPath: absoluteOutputPath,
         apiKey,
         systemPrompt,
         sourceLanguage,
         targetLanguage,
-        model
-      ];
+        model,
+        concurrency,
+        batchSize,
+        // Continue from the checkpoint journal if an earlier run of the same job was interrupted
+        resume,
+        // Earlier projects' (hand-corrected) translations are reused or sent as examples
+        memoryPaths: useMemory ? [path.join(__dirname, '..', 'projects')] : []
+      };
+      const args = [pythonScript, '--job', '-'];
       
-      console.log('Full translation command:', pythonCommand, args.slice(0, 3).join(' ') + ' [API_KEY] [PROMPT] ...');
+      console.log('Full translation command:', pythonCommand, args.join(' '));
       
       // Spawn process with timeout
       const pythonProcess = spawn(pythonCommand, args, {
         stdio: ['pipe', 'pipe', 'pipe'],
         env: {
           ...process.env,
-          PYTHONUNBUFFERED: '1'
+          PYTHONUNBUFFERED: '1',
+          SLIDER_CACHE_DIR: getCacheDir()
         }
       });
       
-      let hasError = false;
+      // stdin stays open after the job: pause/resume/cancel commands follow on it
+      pythonProcess.stdin.on('error', (error) => {
+        console.error('Translation stdin error:', error.message);
+      });
+      pythonProcess.stdin.write(JSON.stringify(job) + '\n');
+      
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
+      // The exit code and the last status decide the result; errors before it are segments that failed
+      const warnings = [];
+      let lastStatus = null;
       let errorMessage = '';
+      let wasCancelled = false;
+      let timedOut = false;
+      let escalation = null;
       
-      // Set up timeout (20 minutes for translation)
-      const timeout = setTimeout(() => {
-        console.log('Translation timeout reached, killing process...');
-        pythonProcess.kill('SIGTERM');
-        
-        setTimeout(() => {
-          if (!pythonProcess.killed) {
-            console.log('Force killing translation process...');
-            pythonProcess.kill('SIGKILL');
-          }
-        }, 5000);
-        
-        resolve({ 
-          success: false, 
-          error: 'Translation timed out. This may happen with very long texts or API rate limits.' 
-        });
-      }, 20 * 60 * 1000); // 20 minutes
+      const sendCommand = (command) => {
+        if (pythonProcess.exitCode === null && pythonProcess.stdin.writable) {
+          pythonProcess.stdin.write(command + '\n');
+        }
+      };
       
-      pythonProcess.stdout.on('data', (data) => {
-        const output = data.toString().trim();
-        
-        // Split by lines in case multiple JSON objects are on same line
-        const lines = output.split('\n');
+      // Set up timeout (20 minutes for translation, not counting pauses). Cancelling first
+      // saves the translations finished so far; the process is only killed if it doesn't stop.
+      const timeout = createJobTimeout(20 * 60 * 1000, () => {
+        console.log('Translation timeout reached, cancelling...');
+        timedOut = true;
+        sendCommand('cancel');
         
-        for (const line of lines) {
-          const trimmedLine = line.trim();
-          if (!trimmedLine) continue;
+        escalation = setTimeout(() => {
+          if (pythonProcess.exitCode !== null) return;
+          console.log('Cancelled translation did not stop, killing process...');
+          pythonProcess.kill('SIGTERM');
           
-          console.log('Translation output:', trimmedLine);
-          
-          // Parse structured output from Python script
-          if (trimmedLine.startsWith('STATUS:')) {
-            try {
-              const statusData = JSON.parse(trimmedLine.substring(7));
-              if (mainWindow && mainWindow.webContents) {
-                mainWindow.webContents.send('translation-status', statusData);
-              }
-              
-              if (statusData.status === 'error') {
-                hasError = true;
-                errorMessage = statusData.message;
-              }
-            } catch (e) {
-              console.error('Error parsing translation status data:', e);
-              console.error('Problematic line:', trimmedLine);
+          setTimeout(() => {
+            if (pythonProcess.exitCode === null) {
+              console.log('Force killing translation process...');
+              pythonProcess.kill('SIGKILL');
             }
-          } else {
-            // Handle regular log messages
-            console.log('Translation log:', trimmedLine);
+          }, 5000);
+        }, CANCEL_GRACE_MS);
+      });
+      
+      const jobControl = {
+        control: (command) => {
+          if (command === 'pause') timeout.pause();
+          if (command === 'resume') timeout.resume();
+          sendCommand(command);
+        }
+      };
+      activeJobs.set('translation', jobControl);
+      
+      const cleanup = () => {
+        timeout.clear();
+        clearTimeout(escalation);
+        if (activeJobs.get('translation') === jobControl) {
+          activeJobs.delete('translation');
+        }
+      };
+      
+      // Whole lines only - a chunk can end mid-line; progress is already coalesced on the Python side
+      lines.on('line', (line) => {
+        const trimmedLine = line.trim();
+        if (!trimmedLine) return;
+        
+        // Parse structured output from Python script
+        if (trimmedLine.startsWith('STATUS:')) {
+          try {
+            const statusData = JSON.parse(trimmedLine.substring(7));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('translation-status', statusData);
+            }
+            
+            if (['success', 'warning', 'error'].includes(statusData.status)) {
+              lastStatus = statusData.status;
+            }
+            if (statusData.status === 'error') {
+              errorMessage = statusData.message;
+              warnings.push(statusData.message);
+            } else if (statusData.status === 'cancelled') {
+              wasCancelled = true;
+            }
+          } catch (e) {
+            console.error('Error parsing translation status data:', e);
+            console.error('Problematic line:', trimmedLine);
           }
+        } else {
+          // Handle regular log messages
+          console.log('Translation log:', trimmedLine);
         }
       });
       
@@ -941,16 +1369,12 @@ ipcMain.handle('run-translation', async (_event, params) => {
         
         // Check for common API errors
         if (error.includes('401') || error.includes('Unauthorized')) {
-          hasError = true;
           errorMessage = 'Invalid API key. Please check your OpenAI API key.';
         } else if (error.includes('429') || error.includes('rate_limit')) {
-          hasError = true;
           errorMessage = 'API rate limit exceeded. Please wait and try again.';
         } else if (error.includes('insufficient_quota')) {
-          hasError = true;
           errorMessage = 'Insufficient API quota. Please check your OpenAI account billing.';
         } else {
-          hasError = true;
           errorMessage = error;
         }
         
@@ -964,11 +1388,23 @@ ipcMain.handle('run-translation', async (_event, params) => {
       });
       
       pythonProcess.on('close', (code) => {
-        clearTimeout(timeout);
+        cleanup();
         console.log('Translation process closed with code:', code);
         
-        if (code === 0 && !hasError) {
-          resolve({ success: true });
+        if (code === 0 && lastStatus !== 'error') {
+          resolve({ success: true, warnings });
+        } else if (timedOut) {
+          resolve({ 
+            success: false, 
+            cancelled: wasCancelled,
+            error: 'Translation timed out. This may happen with very long texts or API rate limits.' 
+          });
+        } else if (wasCancelled) {
+          resolve({ 
+            success: false, 
+            cancelled: true,
+            error: 'Translation cancelled. The finished translations were saved and are reused when you run it again.' 
+          });
         } else {
           resolve({ 
             success: false, 
@@ -978,7 +1414,7 @@ ipcMain.handle('run-translation', async (_event, params) => {
       });
       
       pythonProcess.on('error', (error) => {
-        clearTimeout(timeout);
+        cleanup();
         console.error('Failed to start translation process:', error);
         resolve({ 
           success: false, 
@@ -993,5 +1429,325 @@ ipcMain.handle('run-translation', async (_event, params) => {
   }
 });
 
+// Pause, resume or cancel the running transcription or translation at its next chunk/request boundary
+ipcMain.handle('control-job', async (_event, { job, command }) => {
+  if (!['pause', 'resume', 'cancel'].includes(command)) {
+    return { success: false, error: `Unknown command: ${command}` };
+  }
+
+  const entry = activeJobs.get(job);
+  if (!entry) {
+    return { success: false, error: `No ${job} is running` };
+  }
+
+  entry.control(command);
+  return { success: true };
+});
+
+// Extract, transcribe and translate one video in a single streaming process
+ipcMain.handle('run-pipeline', async (_event, params) => {
+  try {
+    const {
+      videoPath,
+      audioPath,
+      transcriptionPath,
+      translationPath,
+      corrections,
+      correctionsPath,
+      language = 'he',
+      modelSize = 'medium',
+      chunkSeconds = 'auto',
+      overlapSeconds = 1,
+      backend = 'whisper',
+      memoryBudgetMb,
+      apiKey,
+      systemPrompt,
+      sourceLanguage = 'he',
+      targetLanguage = 'en',
+      model = 'gpt-4',
+      concurrency = 8,
+      batchSize = 10
+    } = params;
+
+    // Handle relative project paths
+    const resolvePath = (p) => (p && p.startsWith('projects/') ? path.join(__dirname, '..', p) : p);
+    const absoluteVideoPath = resolvePath(videoPath);
+
+    // Verify input file exists
+    if (!fs.existsSync(absoluteVideoPath)) {
+      return { success: false, error: `Input file does not exist: ${absoluteVideoPath}` };
+    }
+
+    // Without an API key and prompt the pipeline stops after transcription
+    const translate = Boolean(apiKey && apiKey.trim() && systemPrompt && systemPrompt.trim() && translationPath);
+
+    const job = {
+      videoPath: absoluteVideoPath,
+      audioPath: resolvePath(audioPath),
+      transcriptionPath: resolvePath(transcriptionPath),
+      translationPath: translate ? resolvePath(translationPath) : null,
+      corrections,
+      correctionsPath: resolvePath(correctionsPath),
+      language,
+      modelSize,
+      chunkSeconds,
+      overlapSeconds,
+      backend,
+      memoryBudgetMb,
+      apiKey: translate ? apiKey : null,
+      systemPrompt,
+      sourceLanguage,
+      targetLanguage,
+      model,
+      concurrency,
+      batchSize
+    };
+
+    for (const outputPath of [job.audioPath, job.transcriptionPath, job.translationPath]) {
+      if (outputPath) {
+        fs.mkdirSync(path.dirname(outputPath), { recursive: true });
+      }
+    }
+
+    const pythonCommand = getPythonCommand();
+    const pythonScript = path.join(__dirname, 'python', 'run_pipeline.py');
+
+    console.log('Pipeline details:');
+    console.log('Script path:', pythonScript);
+    console.log('Video path:', absoluteVideoPath);
+    console.log('Model size:', modelSize, 'Translate:', translate);
+
+    return new Promise((resolve) => {
+      // The job travels over stdin so the API key and prompt stay off the command line
+      const pythonProcess = spawn(pythonCommand, [pythonScript, '--job', '-'], {
+        stdio: ['pipe', 'pipe', 'pipe'],
+        env: {
+          ...process.env,
+          PYTHONUNBUFFERED: '1'
+        }
+      });
+      pythonProcess.stdin.write(JSON.stringify(job) + '\n');
+      pythonProcess.stdin.end();
+
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
+      let errorMessage = '';
+      const warnings = [];
+      let timedOut = false;
+
+      // Set up timeout (60 minutes for the whole pipeline). The result is reported once the
+      // process has exited, so a following run never races the one being stopped.
+      const timeout = createJobTimeout(60 * 60 * 1000, () => {
+        console.log('Pipeline timeout reached, killing process...');
+        timedOut = true;
+        pythonProcess.kill('SIGTERM');
+
+        setTimeout(() => {
+          if (pythonProcess.exitCode === null) {
+            console.log('Force killing pipeline process...');
+            pythonProcess.kill('SIGKILL');
+          }
+        }, 5000);
+      });
+
+      lines.on('line', (line) => {
+        const trimmedLine = line.trim();
+        if (!trimmedLine) return;
+
+        if (trimmedLine.startsWith('PROGRESS:')) {
+          try {
+            const progressData = JSON.parse(trimmedLine.substring(9));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('pipeline-progress', progressData);
+            }
+          } catch (e) {
+            console.error('Error parsing pipeline progress data:', e);
+          }
+        } else if (trimmedLine.startsWith('STATUS:')) {
+          try {
+            const statusData = JSON.parse(trimmedLine.substring(7));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('pipeline-status', statusData);
+            }
+
+            // A failed chunk or segment is reported and skipped; the exit code decides the run
+            if (statusData.status === 'error') {
+              errorMessage = statusData.message;
+              warnings.push(statusData.message);
+            }
+          } catch (e) {
+            console.error('Error parsing pipeline status data:', e);
+          }
+        } else {
+          console.log('Pipeline output:', trimmedLine);
+        }
+      });
+
+      pythonProcess.stderr.on('data', (data) => {
+        // Whisper and ffmpeg write warnings here; only the exit code and STATUS errors fail the run
+        console.error('Pipeline stderr:', data.toString().trim());
+      });
+
+      pythonProcess.on('close', (code) => {
+        timeout.clear();
+        console.log('Pipeline process closed with code:', code);
+
+        if (timedOut) {
+          resolve({ success: false, error: 'Pipeline timed out.' });
+        } else if (code === 0) {
+          resolve({ success: true, translated: translate, warnings });
+        } else {
+          resolve({
+            success: false,
+            error: errorMessage || `Pipeline process exited with code ${code}`
+          });
+        }
+      });
+
+      pythonProcess.on('error', (error) => {
+        timeout.clear();
+        resolve({
+          success: false,
+          error: `Failed to start pipeline process: ${error.message}`
+        });
+      });
+    });
+
+  } catch (error) {
+    console.error('Error in pipeline:', error);
+    return { success: false, error: error.message };
+  }
+});
+
+// Batch mode - a persistent queue of videos processed with overlapping stages
+ipcMain.handle('run-batch', async (_event, params) => {
+  try {
+    const { projectDir, videos = [], folder, transcription = {}, translation = {}, pools, retryFailed = false } = params;
+
+    const resolvePath = (p) => (p && p.startsWith('projects/') ? path.join(__dirname, '..', p) : p);
+    const absoluteProjectDir = resolvePath(projectDir);
+
+    if (!fs.existsSync(absoluteProjectDir)) {
+      return { success: false, error: `Project directory does not exist: ${absoluteProjectDir}` };
+    }
+
+    const job = {
+      projectDir: absoluteProjectDir,
+      videos: videos.map(resolvePath),
+      folder: resolvePath(folder),
+      transcription: { ...transcription, correctionsPath: resolvePath(transcription.correctionsPath) },
+      translation,
+      pools,
+      retryFailed
+    };
+
+    const pythonCommand = getPythonCommand();
+    const pythonScript = path.join(__dirname, 'python', 'batch_scheduler.py');
+
+    console.log('Batch details:');
+    console.log('Project dir:', absoluteProjectDir);
+    console.log('Videos:', videos.length, 'Folder:', folder || '-');
+
+    return new Promise((resolve) => {
+      // The job travels over stdin so the API key and prompt stay off the command line
+      const pythonProcess = spawn(pythonCommand, [pythonScript, '--job', '-'], {
+        stdio: ['pipe', 'pipe', 'pipe'],
+        env: {
+          ...process.env,
+          PYTHONUNBUFFERED: '1',
+          SLIDER_CACHE_DIR: getCacheDir()
+        }
+      });
+      pythonProcess.stdin.write(JSON.stringify(job) + '\n');
+      pythonProcess.stdin.end();
+
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
+      let summary = '';
+
+      lines.on('line', (line) => {
+        const trimmedLine = line.trim();
+        if (!trimmedLine) return;
+
+        // Lines carry job, video and stage fields to tell the videos apart
+        if (trimmedLine.startsWith('PROGRESS:')) {
+          try {
+            const progressData = JSON.parse(trimmedLine.substring(9));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('batch-progress', progressData);
+            }
+          } catch (e) {
+            console.error('Error parsing batch progress data:', e);
+          }
+        } else if (trimmedLine.startsWith('STATUS:')) {
+          try {
+            const statusData = JSON.parse(trimmedLine.substring(7));
+            if (mainWindow && mainWindow.webContents) {
+              mainWindow.webContents.send('batch-status', statusData);
+            }
+            if (statusData.job === undefined) {
+              summary = statusData.message;
+            }
+          } catch (e) {
+            console.error('Error parsing batch status data:', e);
+          }
+        } else {
+          console.log('Batch output:', trimmedLine);
+        }
+      });
+
+      pythonProcess.stderr.on('data', (data) => {
+        console.error('Batch stderr:', data.toString().trim());
+      });
+
+      pythonProcess.on('close', (code) => {
+        console.log('Batch process closed with code:', code);
+        // Individual job failures are recorded in the queue; only a scheduler failure fails the call
+        if (code === 0) {
+          resolve({ success: true, summary });
+        } else {
+          resolve({ success: false, error: summary || `Batch process exited with code ${code}` });
+        }
+      });
+
+      pythonProcess.on('error', (error) => {
+        resolve({
+          success: false,
+          error: `Failed to start batch process: ${error.message}`
+        });
+      });
+    });
+
+  } catch (error) {
+    console.error('Error in batch run:', error);
+    return { success: false, error: error.message };
+  }
+});
+
+// Jobs of a project's batch queue, for showing per-video state
+ipcMain.handle('get-batch-queue', async (_event, projectDir) => {
+  const absoluteProjectDir = projectDir.startsWith('projects/') ? path.join(__dirname, '..', projectDir) : projectDir;
+  const pythonScript = path.join(__dirname, 'python', 'batch_scheduler.py');
+
+  return new Promise((resolve) => {
+    const pythonProcess = spawn(getPythonCommand(), [pythonScript, '--list', absoluteProjectDir]);
+    let output = '';
+
+    pythonProcess.stdout.on('data', (data) => {
+      output += data.toString();
+    });
+
+    pythonProcess.on('close', (code) => {
+      try {
+        resolve({ success: code === 0, jobs: code === 0 ? JSON.parse(output) : [] });
+      } catch (e) {
+        resolve({ success: false, jobs: [], error: e.message });
+      }
+    });
+
+    pythonProcess.on('error', (error) => {
+      resolve({ success: false, jobs: [], error: error.message });
+    });
+  });
+});
+
 // Export the setMainWindow function so you can call it from your main.js
 module.exports = { setMainWindow };
\ No newline at end of file
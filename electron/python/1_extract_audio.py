@@ -1,8 +1,30 @@
 import os
+import re
 import sys
 import subprocess
-import re
 import json
+import shutil
+import tempfile
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from artifact_cache import ArtifactCache, content_fingerprint
+from telemetry import ProgressCoalescer, Telemetry, pop_profile_flag, profiling
+
+SAMPLE_RATE = 16000
+
+# Everything besides the input file that determines the extracted audio
+EXTRACTION_PARAMS = {"codec": "pcm_s16le", "sample_rate": SAMPLE_RATE, "channels": 1}
+
+# Segmented extraction: each range starts decoding this much early so the resampler has settled at the seam
+PREROLL_SECONDS = 1.0
+# "auto" splits recordings longer than this into one range per ~10 minutes, up to the core count
+AUTO_MIN_SECONDS = 20 * 60
+AUTO_SECONDS_PER_SEGMENT = 10 * 60
+MAX_SEGMENTS = 8
+
+# The header ffmpeg prints for every input, e.g. "  Duration: 01:02:03.45, start: ..."
+DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
 
 def log(msg):
     print(msg)
@@ -26,7 +48,191 @@ def log_status(status, message):
     print(f"STATUS:{json.dumps(status_data)}")
     sys.stdout.flush()
 
-def extract_audio(input_path, output_path):
+def probe_duration(input_path):
+    """Duration of the input in seconds according to ffprobe, or None if it can't tell
+
+    Installations with only ffmpeg on PATH fall back to the Duration line of `ffmpeg -i`.
+    """
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", input_path],
+            capture_output=True, text=True, check=True
+        )
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (OSError, subprocess.CalledProcessError, KeyError, ValueError):
+        pass
+
+    try:
+        # Without an output file ffmpeg prints the input header and exits with an error
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-i", input_path], capture_output=True, text=True)
+    except OSError:
+        return None
+    match = DURATION_PATTERN.search(result.stderr)
+    if not match:
+        return None  # "Duration: N/A" for streams without a known length
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def run_ffmpeg(command, on_progress=None):
+    """Run ffmpeg with -progress pipe:1 and report the output position in seconds as it advances
+
+    Returns (return code, error output).
+    """
+    process = subprocess.Popen(
+        ["ffmpeg", "-y", "-nostats", "-loglevel", "error", "-progress", "pipe:1"] + command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1
+    )
+
+    # With -loglevel error stderr stays small, but drain it anyway so ffmpeg can never block on it
+    errors = []
+    stderr_thread = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+    stderr_thread.start()
+
+    # -progress writes key=value blocks; out_time_us (out_time_ms in older builds, also microseconds)
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        if key in ("out_time_us", "out_time_ms") and on_progress:
+            try:
+                on_progress(int(value) / 1_000_000)
+            except ValueError:
+                pass  # N/A before the first frame
+
+    process.wait()
+    stderr_thread.join()
+    return process.returncode, "".join(errors).strip()
+
+def choose_segments(segments, duration):
+    """Resolve the segments setting ("auto" or a count) for a recording of this duration"""
+    if duration is None:
+        return 1
+    if segments == "auto":
+        if duration < AUTO_MIN_SECONDS:
+            return 1
+        segments = min(os.cpu_count() or 1, MAX_SEGMENTS, int(duration // AUTO_SECONDS_PER_SEGMENT))
+    return max(1, min(int(segments), int(duration // 60) or 1))
+
+def extract_single(input_path, output_path, duration):
+    # ffmpeg reports its position a few times per second; only forward changed percentages
+    progress = ProgressCoalescer(log_progress)
+    last_percent = [-1]
+
+    def on_progress(seconds):
+        if duration:
+            percent = min(int(seconds / duration * 100), 99)
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                progress.update(percent)
+
+    returncode, errors = run_ffmpeg([
+        "-i", input_path,
+        "-vn",  # No video
+        "-acodec", "pcm_s16le",  # Audio codec
+        "-ar", str(SAMPLE_RATE),  # Sample rate
+        "-ac", "1",  # Mono
+        output_path
+    ], on_progress)
+    progress.flush()
+
+    if returncode != 0:
+        raise RuntimeError(errors or "ffmpeg failed to extract audio")
+
+def extract_segmented(input_path, output_path, duration, segments):
+    """Decode `segments` time ranges in parallel and join them into one sample-exact WAV
+
+    Range boundaries are fixed in output samples. Every worker seeks a little before its
+    range and trims to exactly its samples after resampling; any remaining off-by-a-few
+    difference is trimmed or zero-padded so the pieces line up.
+    """
+    total_samples = int(round(duration * SAMPLE_RATE))
+    bounds = [total_samples * n // segments for n in range(segments + 1)]
+    positions = [0.0] * segments
+    lock = threading.Lock()
+    last_percent = [-1]
+    # Every range reports on its own, so coalesce them into a few updates per second
+    progress = ProgressCoalescer(log_progress)
+
+    def report(index, seconds):
+        with lock:
+            positions[index] = min(seconds, (bounds[index + 1] - bounds[index]) / SAMPLE_RATE)
+            percent = min(int(sum(positions) / duration * 100), 99)
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                # Under the lock, so updates from different ranges can't go out of order
+                progress.update(percent)
+
+    work_dir = tempfile.mkdtemp(prefix="extract-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        def extract_range(index):
+            start, end = bounds[index], bounds[index + 1]
+            seek = max(0.0, start / SAMPLE_RATE - PREROLL_SECONDS)
+            skip = start - int(round(seek * SAMPLE_RATE))
+            last = index == segments - 1
+
+            # atrim counts samples after the seek, so the pre-roll is cut off exactly
+            trim = f"atrim=start_sample={skip}" + ("" if last else f":end_sample={skip + end - start}")
+            # Even "-ss 0" changes how the decoder's priming samples are dropped, so only seek when needed
+            command = (["-ss", f"{seek:.6f}"] if seek > 0 else []) + ["-i", input_path]
+            if not last:
+                command += ["-t", f"{(end - start) / SAMPLE_RATE + PREROLL_SECONDS + 1:.6f}"]
+            part_path = os.path.join(work_dir, f"part-{index:03d}.raw")
+            command += [
+                "-vn",
+                "-af", f"aresample={SAMPLE_RATE},{trim}",
+                "-acodec", "pcm_s16le",
+                "-ar", str(SAMPLE_RATE),
+                "-ac", "1",
+                "-f", "s16le",
+                part_path
+            ]
+
+            returncode, errors = run_ffmpeg(command, lambda seconds: report(index, seconds))
+            if returncode != 0:
+                raise RuntimeError(errors or f"ffmpeg failed on range {index + 1}")
+            return part_path
+
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            parts = list(pool.map(extract_range, range(segments)))
+        progress.flush()
+
+        tmp_path = f"{output_path}.partial"
+        with wave.open(tmp_path, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(SAMPLE_RATE)
+
+            for index, part_path in enumerate(parts):
+                size = os.path.getsize(part_path)
+                expected = None if index == segments - 1 else (bounds[index + 1] - bounds[index]) * 2
+                written = 0
+                with open(part_path, "rb") as f:
+                    while True:
+                        block = f.read(1 << 20)
+                        if expected is not None:
+                            block = block[:expected - written]
+                        if not block:
+                            break
+                        out.writeframes(block)
+                        written += len(block)
+                if expected is not None and written < expected:
+                    out.writeframes(b"\0" * (expected - written))
+                if expected is not None and size != expected:
+                    log_status("info", f"Range {index + 1}: adjusted by {(expected - size) // 2} samples at the seam")
+                os.remove(part_path)
+
+        os.replace(tmp_path, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def extract_audio(input_path, output_path, segments=1):
+    """Extract 16 kHz mono PCM audio; segments > 1 (or "auto") decodes ranges in parallel
+
+    A timing report is written next to the output as <output>.timing.json.
+    """
+    telemetry = Telemetry("extract")
+
     if not os.path.exists(input_path):
         log_status("error", f"Input file does not exist: {input_path}")
         sys.exit(1)
@@ -36,58 +242,44 @@ def extract_audio(input_path, output_path):
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    log_status("info", "Starting audio extraction...")
+    # An unchanged video extracted with the same settings is copied from the artifact cache
+    cache = None
+    cache_key = None
+    try:
+        with telemetry.span("cache_lookup"):
+            cache = ArtifactCache()
+            cache_key = ArtifactCache.make_key("extract", content_fingerprint(input_path), EXTRACTION_PARAMS)
+            hit = cache.fetch(cache_key, output_path)
+        if hit:
+            telemetry.count("cache_hits")
+            telemetry.write_report(output_path)
+            log_status("success", f"Audio reused from cache! Output size: {os.path.getsize(output_path)} bytes")
+            log_progress(100)
+            return
+    except Exception as e:
+        log_status("info", f"Artifact cache unavailable: {str(e)}")
+        cache = None
 
-    command = [
-        "ffmpeg",
-        "-y",  # Overwrite output file
-        "-i", input_path,
-        "-vn",  # No video
-        "-acodec", "pcm_s16le",  # Audio codec
-        "-ar", "16000",  # Sample rate
-        "-ac", "1",  # Mono
-        output_path
-    ]
+    log_status("info", "Starting audio extraction...")
 
     try:
-        process = subprocess.Popen(
-            command,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
-            text=True,
-            bufsize=1
-        )
+        # Probe once up front instead of scraping the duration out of ffmpeg's log
+        with telemetry.span("probe"):
+            duration = probe_duration(input_path)
+        telemetry.set("input_seconds", duration)
+        if duration:
+            log_status("info", f"Duration: {duration:.2f} seconds")
+        else:
+            log_status("info", "Could not determine the duration; progress will not be reported")
 
-        duration = None
-        time_pattern = re.compile(r'time=(\d+):(\d+):(\d+)\.(\d+)')
-        duration_pattern = re.compile(r'Duration: (\d+):(\d+):(\d+)\.(\d+)')
-
-        for line in process.stderr:
-            line = line.strip()
-
-            # Extract total duration once
-            if duration is None:
-                match = duration_pattern.search(line)
-                if match:
-                    h, m, s, ms = map(int, match.groups())
-                    duration = h * 3600 + m * 60 + s + ms / 100
-                    log_status("info", f"Duration: {duration:.2f} seconds")
-                    continue
-
-            # Extract current time and calculate progress
-            if duration:
-                match = time_pattern.search(line)
-                if match:
-                    h, m, s, ms = map(int, match.groups())
-                    current = h * 3600 + m * 60 + s + ms / 100
-                    percent = min(int((current / duration) * 100), 100)
-                    log_progress(percent)
-
-        process.wait()
-
-        if process.returncode != 0:
-            log_status("error", "ffmpeg failed to extract audio")
-            sys.exit(1)
+        segments = choose_segments(segments, duration)
+        telemetry.count("ranges", segments)
+        with telemetry.span("extract"):
+            if segments > 1:
+                log_status("info", f"Extracting {segments} ranges in parallel")
+                extract_segmented(input_path, output_path, duration, segments)
+            else:
+                extract_single(input_path, output_path, duration)
 
         # Verify output file exists
         if not os.path.exists(output_path):
@@ -95,25 +287,47 @@ def extract_audio(input_path, output_path):
             sys.exit(1)
 
         file_size = os.path.getsize(output_path)
+        if cache:
+            try:
+                with telemetry.span("cache_store"):
+                    cache.store(cache_key, output_path)
+            except Exception as e:
+                log_status("info", f"Could not cache extracted audio: {str(e)}")
+        telemetry.write_report(output_path)
+        log_status("info", telemetry.summary())
         log_status("success", f"Audio extracted successfully! Output size: {file_size} bytes")
         log_progress(100)
 
     except FileNotFoundError:
         log_status("error", "ffmpeg not found. Please install ffmpeg and add it to your PATH")
         sys.exit(1)
+    except RuntimeError as e:
+        log_status("error", f"ffmpeg failed to extract audio: {str(e)}")
+        sys.exit(1)
     except Exception as e:
         log_status("error", f"Unexpected error: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        log_status("error", "Usage: python extract_audio.py <input_video> <output_audio>")
+    # --profile[=py-spy] profiles the whole run (see telemetry.py)
+    sys.argv, profile = pop_profile_flag(sys.argv)
+
+    if len(sys.argv) not in (3, 4):
+        log_status("error", "Usage: python extract_audio.py <input_video> <output_audio> [segments|auto] [--profile[=py-spy]]")
         sys.exit(1)
 
     input_path = sys.argv[1]
     output_path = sys.argv[2]
-    
+    segments = sys.argv[3] if len(sys.argv) > 3 else 1
+    if segments != "auto":
+        try:
+            segments = int(segments)
+        except ValueError:
+            log_status("error", f"Invalid segments value: {segments}")
+            sys.exit(1)
+
     log_status("info", f"Input: {input_path}")
     log_status("info", f"Output: {output_path}")
-    
-    extract_audio(input_path, output_path)
\ No newline at end of file
+
+    with profiling(profile, output_path, log_status):
+        extract_audio(input_path, output_path, segments)
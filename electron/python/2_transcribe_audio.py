@@ -1,13 +1,23 @@
-import whisper
+import contextlib
 import json
 import os
 import sys
 import warnings
-import torch
 import gc
-from pydub import AudioSegment
-import tempfile
-import shutil
+import time
+from artifact_cache import ArtifactCache, content_fingerprint
+from audio_chunks import SAMPLE_RATE, PcmAudio, SegmentStitcher, open_pcm_audio, plan_chunks
+from checkpoint import CheckpointJournal
+from chunk_pool import threads_per_worker, transcribe_chunks_parallel
+from memory_budget import collect_if_needed, plan_transcription, rss_mb, set_watermark
+import memory_budget
+from transcription_backends import load_backend
+from segment_store import save_segments
+from stages import read_job
+from telemetry import Telemetry, pop_profile_flag, profiling
+from corrections import load_corrections, load_engine as load_corrections_engine
+import job_control
+from job_control import CANCELLED, CANCELLED_EXIT_CODE, JobCancelled, JobControl
 
 def log_status(status, message):
     status_data = {
@@ -24,113 +34,55 @@ def log_progress(percent):
     }
     print(f"PROGRESS:{json.dumps(progress_data)}", flush=True)
 
+# torch and whisper take seconds to import, so they are only imported once a run needs them;
+# argument errors and unreadable inputs are reported before either is loaded
+
+def gpu_available():
+    """Whether a CUDA device can be used (the faster-whisper backend runs without torch)"""
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+def set_torch_threads(threads):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
 def force_garbage_collection():
-    """Aggressive garbage collection and memory cleanup"""
+    """Aggressive garbage collection and memory cleanup - for model unloads and failures, not per chunk"""
     gc.collect()
-    if torch.cuda.is_available():
+    # Only touch torch if a backend already imported it
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
         torch.cuda.empty_cache()
         torch.cuda.synchronize()
 
-def get_audio_duration(audio_path):
-    """Get audio duration in seconds"""
+def load_audio(audio_path):
+    """Open audio for windowed access - memory-maps 16 kHz PCM, decodes anything else once"""
     try:
-        audio = AudioSegment.from_file(audio_path)
-        duration = len(audio) / 1000.0  # Convert to seconds
-        del audio  # Explicitly delete to free memory
-        force_garbage_collection()
-        return duration
-    except Exception as e:
-        log_status("error", f"Could not get audio duration: {str(e)}")
-        return 0
+        return open_pcm_audio(audio_path)
+    except ValueError as e:
+        log_status("info", f"{str(e)} - decoding with ffmpeg instead")
+        import whisper
+        return PcmAudio(whisper.load_audio(audio_path), SAMPLE_RATE)
 
-def split_audio_into_chunks(audio_path, max_chunk_minutes=3):
-    """Split audio into chunks of maximum 3 minutes each"""
-    try:
-        log_status("info", "Loading audio file for splitting...")
-        audio = AudioSegment.from_file(audio_path)
-        
-        total_duration_minutes = len(audio) / (1000 * 60)  # Total duration in minutes
-        max_chunk_ms = max_chunk_minutes * 60 * 1000  # 3 minutes in milliseconds
-        
-        log_status("info", f"Total audio duration: {total_duration_minutes:.1f} minutes")
-        
-        chunks = []
-        chunk_count = 0
-        
-        # Split into 3-minute chunks
-        for i in range(0, len(audio), max_chunk_ms):
-            chunk = audio[i:i + max_chunk_ms]
-            chunk_duration_minutes = len(chunk) / (1000 * 60)
-            chunks.append(chunk)
-            chunk_count += 1
-            
-            log_status("info", f"Created chunk {chunk_count}: {chunk_duration_minutes:.1f} minutes")
-            
-            # Force cleanup every few chunks
-            if chunk_count % 3 == 0:
-                force_garbage_collection()
-        
-        log_status("info", f"Split into {len(chunks)} chunks of max {max_chunk_minutes} minutes each")
-        
-        del audio  # Delete original audio from memory
-        force_garbage_collection()
-        return chunks
-    except Exception as e:
-        log_status("error", f"Could not split audio: {str(e)}")
-        return []
-
-def transcribe_chunk_with_retry(model, chunk_path, language, time_offset, max_retries=2):
-    """Transcribe a chunk with retry logic and memory cleanup"""
+def transcribe_chunk_with_retry(model, audio, language, max_retries=2):
+    """Transcribe a chunk with retry logic and memory cleanup (timestamps are relative to the chunk)"""
     for attempt in range(max_retries + 1):
         try:
-            # Force cleanup before each attempt
-            force_garbage_collection()
-            
-            # Redirect stderr to suppress Whisper's internal output
-            original_stderr = sys.stderr
-            sys.stderr = open(os.devnull, 'w')
+            # Collect only when memory is above the watermark (see memory_budget)
+            collect_if_needed()
             
-            # Use minimal settings for memory efficiency
-            result = model.transcribe(
-                chunk_path, 
-                language=language, 
-                word_timestamps=False,  # Disable word timestamps to save memory
-                verbose=False,
-                temperature=0.0,
-                best_of=1,
-                beam_size=1,
-                patience=1.0,
-                length_penalty=1.0,
-                suppress_tokens=[-1],
-                initial_prompt=None,
-                condition_on_previous_text=False,  # Disable to save memory
-                fp16=True,  # Use FP16 for memory efficiency
-                compression_ratio_threshold=2.4,
-                logprob_threshold=-1.0,
-                no_speech_threshold=0.6
-            )
-            
-            # Restore stderr
-            sys.stderr.close()
-            sys.stderr = original_stderr
-            
-            # Adjust timestamps with offset
-            segments = result['segments']
-            for seg in segments:
-                if time_offset > 0:
-                    seg['start'] += time_offset
-                    seg['end'] += time_offset
-            
-            # Force cleanup after successful transcription
-            del result
-            force_garbage_collection()
-            
-            return segments
+            # Redirect stderr to suppress Whisper's internal output; restored and closed even if it raises
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+                # Greedy decoding without cross-window conditioning keeps memory flat (see transcription_backends)
+                return model.transcribe(audio, language)
             
         except Exception as e:
-            # Restore stderr in case of error
-            sys.stderr = original_stderr
-            
             if attempt < max_retries:
                 log_status("info", f"Transcription attempt {attempt + 1} failed, retrying... ({str(e)})")
                 force_garbage_collection()
@@ -138,7 +90,127 @@ def transcribe_chunk_with_retry(model, chunk_path, language, time_offset, max_re
             else:
                 raise e
 
-def transcribe_audio(audio_path, output_path, corrections_json=None, language="he", model_size="medium"):
+def load_model(model_size, backend="whisper", threads=0):
+    """Load a transcription backend, placing it on the GPU when one is available"""
+    device = "cuda" if gpu_available() else "cpu"
+    return load_backend(backend, model_size, device=device, threads=threads)
+
+def transcribe_chunks_sequential(model, audio, chunks, language, control):
+    """Transcribe chunks one after another on a single model, yielding (chunk, segments, error, seconds)
+
+    Stops before the next chunk once the job is cancelled, and waits there while it is paused.
+    """
+    for chunk in chunks:
+        if not control.wait():
+            return
+        log_status("info", f"Processing chunk {chunk.index+1}/{len(chunks)} ({chunk.duration / 60:.1f} min)")
+
+        started = time.perf_counter()
+        # Only this window is read from the memory-mapped file and converted to float32
+        samples = audio.window(chunk.start_sample, chunk.end_sample)
+        try:
+            segments = transcribe_chunk_with_retry(model, samples, language)
+            result = (chunk, segments, None, time.perf_counter() - started)
+        except Exception as e:
+            result = (chunk, None, str(e), time.perf_counter() - started)
+        finally:
+            del samples
+        yield result
+
+def format_timestamp(seconds):
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+def log_segment(index, segment):
+    """Report one finished segment; index is its position in the final output file"""
+    segment_data = {
+        "type": "segment",
+        "index": index,
+        **segment
+    }
+    print(f"SEGMENT:{json.dumps(segment_data)}", flush=True)
+
+def load_corrections_for(output_path, corrections_json=None, corrections_path=None):
+    """Compile the corrections dictionary (if any), or return None to continue without corrections"""
+    # A file path avoids passing big dictionaries around as strings
+    if not (corrections_path or (corrections_json and corrections_json.strip())):
+        log_status("info", "No text corrections provided")
+        return None
+
+    try:
+        if corrections_path:
+            corrections = load_corrections(corrections_path)
+        else:
+            corrections = json.loads(corrections_json)
+        log_status("info", f"Applying {len(corrections)} text corrections...")
+
+        # All rules are matched in a single pass per segment (longest match wins)
+        return load_corrections_engine(corrections, os.path.join(os.path.dirname(output_path) or ".", ".cache"))
+
+    except (json.JSONDecodeError, ValueError) as e:
+        log_status("error", f"Invalid corrections JSON format: {str(e)}")
+    except Exception as e:
+        log_status("error", f"Error applying corrections: {str(e)}")
+    log_status("info", "Continuing without corrections...")
+    return None
+
+class SegmentStream:
+    """Cleans and corrects segments as they settle and reports each one as a SEGMENT line
+
+    Keeps both the uncorrected segments (what the artifact cache stores) and the corrected
+    ones (what is written to the output file), so the streamed segments are exactly the saved ones.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.raw = []
+        self.output = []
+
+    def add(self, segments):
+        for seg in segments:
+            text = seg['text'].strip()
+            if not text or len(text) <= 1:  # Only keep non-empty text with more than 1 character
+                continue
+
+            raw = {"text": text, "start": seg.get('start', 0), "end": seg.get('end', 0)}
+            segment = dict(raw, text=self.engine.apply(text)) if self.engine else raw
+            self.raw.append(raw)
+            self.output.append(segment)
+            log_segment(len(self.output) - 1, segment)
+
+def save_stream(stream, output_path, telemetry):
+    if stream.engine:
+        log_status("info", stream.engine.summary())
+
+    log_progress(95)
+
+    # Save to the segment store and its JSON export
+    with telemetry.span("save"):
+        save_segments(output_path, stream.output)
+
+    telemetry.count("segments", len(stream.output))
+    telemetry.write_report(output_path)
+    log_status("info", telemetry.summary())
+
+def transcribe_audio(audio_path, output_path, corrections_json=None, language="he", model_size="medium",
+                     model_loader=None, chunk_seconds="auto", overlap_seconds=1.0, workers=1, resume=False,
+                     corrections_path=None, stats=None, use_cache=True, backend="whisper", memory_budget_mb=None,
+                     control=None):
+    """Transcribe audio_path to a JSON segments file at output_path
+
+    When a stats dict is passed it is filled with timings (model load, per-chunk decode)
+    for the benchmark harness. use_cache=False bypasses the artifact cache. backend selects
+    the inference engine (see transcription_backends.BACKENDS). chunk_seconds and workers
+    may be "auto" to fit them into memory_budget_mb (default: most of the free memory).
+    A timing report is written next to the output as <output>.timing.json.
+
+    A JobControl (see job_control) pauses or cancels the run between chunks; a cancelled run
+    saves the segments of the chunks finished so far, keeps the journal and raises JobCancelled.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"load_seconds": 0.0, "chunks": []})
+    telemetry = Telemetry("transcribe")
+    control = control or JobControl(log_status)
+
     if not os.path.exists(audio_path):
         log_status("error", f"Audio file does not exist: {audio_path}")
         sys.exit(1)
@@ -148,16 +220,76 @@ def transcribe_audio(audio_path, output_path, corrections_json=None, language="h
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Check audio duration and determine strategy
-    duration = get_audio_duration(audio_path)
+    # Check audio duration and determine strategy (read from the WAV header, no decode)
+    try:
+        with telemetry.span("open_audio"):
+            audio = load_audio(audio_path)
+    except Exception as e:
+        log_status("error", f"Could not open audio: {str(e)}")
+        sys.exit(1)
+    duration = audio.duration
+    telemetry.set("audio_seconds", duration)
     log_status("info", f"Audio duration: {duration:.2f} seconds ({duration/60:.2f} minutes)")
     
-    # Always split for files longer than 3 minutes
-    should_split = duration > 180  # Split if longer than 3 minutes
+    # Chunk length and worker count are fitted to the memory budget before anything is loaded
+    gpu = gpu_available()
+    if gpu and workers != "auto" and int(workers) > 1:
+        log_status("info", "GPU available - ignoring parallel workers and using a single process")
+    plan = plan_transcription(backend, model_size, duration, chunk_seconds, workers, memory_budget_mb, gpu)
+    for note in plan["notes"]:
+        log_status("info", note)
+    chunk_seconds = plan["chunk_seconds"]
+    workers = plan["workers"]
+    set_watermark(plan["watermark_mb"])
+    log_status("info", f"Memory budget {plan['budget_mb']} MB: {workers} worker(s), {chunk_seconds / 60:.1f} minute chunks")
+    stats["memory"] = {key: plan[key] for key in ("budget_mb", "workers", "chunk_seconds", "watermark_mb")}
+    telemetry.set("memory", stats["memory"])
+    telemetry.set("backend", backend)
+    telemetry.set("model_size", model_size)
+    
+    # Corrections are applied as segments are produced, so the streamed segments are final
+    stream = SegmentStream(load_corrections_for(output_path, corrections_json, corrections_path))
+    
+    # Unchanged audio transcribed with the same settings is served from the artifact cache
+    cache = None
+    cache_key = None
+    if use_cache:
+        try:
+            with telemetry.span("cache_lookup"):
+                cache = ArtifactCache()
+                cache_key = ArtifactCache.make_key("transcribe", content_fingerprint(audio_path), {
+                    "backend": backend,
+                    "model_size": model_size,
+                    "language": language,
+                    "chunk_seconds": chunk_seconds,
+                    "overlap_seconds": overlap_seconds
+                })
+                cached = cache.fetch_json(cache_key)
+        except Exception as e:
+            log_status("info", f"Artifact cache unavailable: {str(e)}")
+            cache = None
+            cached = None
+        
+        if cached is not None:
+            cache.close()
+            del audio
+            log_status("info", f"Reusing cached transcription ({len(cached)} segments)")
+            telemetry.count("cache_hits")
+            stream.add(cached)
+            log_progress(90)
+            save_stream(stream, output_path, telemetry)
+            stats["duration"] = duration
+            stats["segments"] = len(stream.output)
+            log_progress(100)
+            log_status("success", f"Transcription reused from cache! Saved {len(stream.output)} segments to {os.path.basename(output_path)}")
+            return
+    
+    # Always split for files longer than one chunk
+    should_split = duration > chunk_seconds
     
     if should_split:
-        estimated_chunks = int((duration / 60) / 3) + 1  # Estimate number of 3-minute chunks
-        log_status("info", f"Audio will be split into approximately {estimated_chunks} chunks of 3 minutes each")
+        estimated_chunks = int(duration / chunk_seconds) + 1
+        log_status("info", f"Audio will be split into approximately {estimated_chunks} chunks of {chunk_seconds / 60:.1f} minutes each")
     
     # Recommend smaller model for very long files
     if duration > 900:  # 15 minutes
@@ -165,144 +297,255 @@ def transcribe_audio(audio_path, output_path, corrections_json=None, language="h
     elif duration > 600:  # 10 minutes
         log_status("info", f"Long file detected ({duration/60:.1f} min). Consider using 'base' model for better memory management.")
     
-    log_status("info", "Loading Whisper model...")
-    log_progress(5)
+    # Parallel workers each hold a model on the CPU; a single GPU is better served by one process
+    use_pool = should_split and workers > 1
     
     try:
         # Suppress warnings to reduce noise
         warnings.filterwarnings("ignore", category=UserWarning)
         
-        # Load Whisper model with memory optimization
-        model = whisper.load_model(model_size)
-        log_status("info", f"Loaded Whisper model: {model_size}")
-        log_progress(10)
-        
-        # Force cleanup after loading model
-        force_garbage_collection()
+        if use_pool:
+            log_status("info", f"Starting {workers} transcription workers ({threads_per_worker(workers)} threads each)...")
+            log_progress(5)
+            model = None
+        else:
+            log_status("info", f"Loading {backend} model...")
+            log_progress(5)
+            
+            # Load Whisper model with memory optimization (a long-lived worker passes its own cached loader)
+            load_started = time.perf_counter()
+            rss_before = rss_mb()
+            model = (model_loader or load_model)(model_size, backend)
+            stats["load_seconds"] = time.perf_counter() - load_started
+            telemetry.add_span("load_model", stats["load_seconds"])
+            rss_after = rss_mb()
+            if rss_before is not None and rss_after is not None:
+                stats["memory"]["model_mb"] = round(rss_after - rss_before)
+                log_status("info", f"Loaded {backend} model: {model_size} (+{rss_after - rss_before:.0f} MB resident)")
+            else:
+                log_status("info", f"Loaded {backend} model: {model_size}")
+            log_progress(10)
         
-        all_segments = []
+        journal = None
+        failed_chunks = []
         
         if should_split:
-            log_status("info", "Audio is longer than 3 minutes, splitting into 3-minute chunks...")
-            chunks = split_audio_into_chunks(audio_path, max_chunk_minutes=3)
-            log_status("info", f"Created {len(chunks)} chunks for processing")
-            
-            # Create temporary directory for chunks
-            temp_dir = tempfile.mkdtemp()
-            
-            try:
-                for i, chunk in enumerate(chunks):
-                    chunk_path = os.path.join(temp_dir, f"chunk_{i:03d}.wav")
-                    
-                    # Export chunk to file with optimized settings
-                    chunk.export(
-                        chunk_path, 
-                        format="wav", 
-                        parameters=["-ar", "16000", "-ac", "1", "-acodec", "pcm_s16le"]
-                    )
-                    
-                    chunk_duration = len(chunk) / (1000 * 60)  # Duration in minutes
-                    log_status("info", f"Processing chunk {i+1}/{len(chunks)} ({chunk_duration:.1f} min)")
-                    
-                    # Calculate time offset for this chunk (3 minutes per chunk)
-                    time_offset = i * 3 * 60  # 3 minutes per chunk in seconds
-                    
-                    # Transcribe chunk with retry
-                    try:
-                        chunk_result = transcribe_chunk_with_retry(model, chunk_path, language, time_offset)
-                        all_segments.extend(chunk_result)
-                        log_status("info", f"Chunk {i+1} completed successfully")
-                    except Exception as e:
-                        log_status("error", f"Failed to transcribe chunk {i+1}: {str(e)}")
-                        # Continue with next chunk instead of failing completely
-                        continue
-                    
-                    # Update progress
-                    progress = 10 + int((i + 1) / len(chunks) * 70)
-                    log_progress(progress)
-                    
-                    # Clean up chunk from memory and disk immediately
-                    del chunk
-                    if os.path.exists(chunk_path):
-                        os.remove(chunk_path)
-                    force_garbage_collection()
-                    
-            finally:
-                # Clean up temporary directory
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                
+            log_status("info", f"Audio is longer than {chunk_seconds / 60:.1f} minutes, planning chunk boundaries at silences...")
+            with telemetry.span("plan_chunks"):
+                chunks = plan_chunks(audio, target_seconds=chunk_seconds, overlap_seconds=overlap_seconds)
+            telemetry.count("chunks", len(chunks))
+            log_status("info", f"Planned {len(chunks)} chunks for processing")
+
+            # Every finished chunk is journaled so an interrupted run can pick up where it stopped
+            journal = CheckpointJournal(output_path, {
+                "audio": content_fingerprint(audio_path),
+                "backend": backend,
+                "model_size": model_size,
+                "language": language,
+                "chunk_seconds": chunk_seconds,
+                "overlap_seconds": overlap_seconds
+            })
+            done = {record["chunk"]: record["segments"] for record in journal.open(resume)}
+
+            pending = [chunk for chunk in chunks if chunk.index not in done]
+
+            if done:
+                telemetry.count("resumed_chunks", len(done))
+                log_status("info", f"Resuming: {len(done)}/{len(chunks)} chunks already transcribed")
+
+            # Chunks finish out of order in the pool; they are stitched in index order as soon as the
+            # next one is available, placing segments on the global timeline and dropping duplicates
+            # from the overlaps. Settled segments are streamed right away.
+            stitcher = SegmentStitcher()
+            finished = dict(done)
+            journaled = len(done)
+            next_index = 0
+
+            def release():
+                nonlocal next_index
+                while next_index < len(chunks) and next_index in finished:
+                    stream.add(stitcher.add(chunks[next_index], finished.pop(next_index)))
+                    next_index += 1
+
+            release()
+
+            if not pending:
+                results = []
+            elif use_pool:
+                results = transcribe_chunks_parallel(audio_path, pending, model_size, language, workers, backend,
+                                                     plan["watermark_mb"], control)
+            else:
+                results = transcribe_chunks_sequential(model, audio, pending, language, control)
+
+            completed = len(done)
+            for chunk, segments, error, seconds in results:
+                if error == CANCELLED:
+                    # Never started - left for a resumed run
+                    continue
+                completed += 1
+                stats["chunks"].append({
+                    "index": chunk.index,
+                    "audio_seconds": chunk.duration,
+                    "decode_seconds": seconds,
+                    "failed": error is not None
+                })
+                # Pool workers decode in parallel, so the decode total can exceed the wall time
+                telemetry.add_span("decode", seconds)
+                if error is None:
+                    segments = [{"text": seg["text"], "start": seg["start"], "end": seg["end"]} for seg in segments]
+                    journal.append({"chunk": chunk.index, "segments": segments})
+                    journaled += 1
+                    finished[chunk.index] = segments
+                    log_status("info", f"Chunk {chunk.index+1} completed successfully ({completed}/{len(chunks)} done)")
+                else:
+                    # Continue with the other chunks instead of failing completely
+                    log_status("error", f"Failed to transcribe chunk {chunk.index+1}: {error}")
+                    failed_chunks.append(chunk)
+                    telemetry.count("failed_chunks")
+                    finished[chunk.index] = []
+                with telemetry.span("stitch"):
+                    release()
+
+                # Update progress
+                progress = 10 + int(completed / len(chunks) * 70)
+                log_progress(progress)
+
+            # Chunks a cancel kept from running (a cancel after the last chunk still completes the transcript)
+            skipped = len(chunks) - completed
+            if skipped:
+                # Stitch everything that finished, skipping over the chunks that never ran
+                for index in sorted(finished):
+                    stream.add(stitcher.add(chunks[index], finished.pop(index)))
+                stream.add(stitcher.finish())
+                del audio
+                del model
+                force_garbage_collection()
+
+                telemetry.set("cancelled", True)
+                save_stream(stream, output_path, telemetry)
+                # The journal stays, so resuming the same job only transcribes the missing chunks
+                journal.close()
+                log_status("cancelled", f"Transcription cancelled after {journaled}/{len(chunks)} chunks; saved {len(stream.output)} segments to {os.path.basename(output_path)}. Run it again with resume to finish.")
+                raise JobCancelled()
+
+            stream.add(stitcher.finish())
+
+            if failed_chunks:
+                failed_chunks.sort(key=lambda c: c.index)
+                missing = ", ".join(
+                    f"{format_timestamp(c.keep_start)}-{format_timestamp(min(c.keep_end, duration))}" for c in failed_chunks
+                )
+                log_status("warning", f"{len(failed_chunks)} chunk(s) could not be transcribed; missing audio: {missing}")
+
         else:
             # Process entire audio file at once for shorter files
             log_status("info", "Processing entire audio file...")
             try:
-                all_segments = transcribe_chunk_with_retry(model, audio_path, language, time_offset=0)
+                decode_started = time.perf_counter()
+                segments = transcribe_chunk_with_retry(model, audio.window(0, audio.num_samples), language)
+                stats["chunks"].append({
+                    "index": 0,
+                    "audio_seconds": duration,
+                    "decode_seconds": time.perf_counter() - decode_started,
+                    "failed": False
+                })
+                telemetry.add_span("decode", stats["chunks"][-1]["decode_seconds"])
+                telemetry.count("chunks")
             except Exception as e:
                 log_status("error", f"Transcription failed: {str(e)}")
                 sys.exit(1)
+            stream.add(segments)
             log_progress(80)
         
+        # Release the memory map before writing results
+        del audio
+
         # Clean up model from memory
         del model
         force_garbage_collection()
         
-        log_progress(85)
-        log_status("info", "Processing transcription results...")
-        
-        # Filter and clean segments
-        output = []
-        for seg in all_segments:
-            text = seg['text'].strip()
-            if text and len(text) > 1:  # Only add non-empty text with more than 1 character
-                output.append({
-                    "text": text,
-                    "start": seg.get('start', 0),
-                    "end": seg.get('end', 0)
-                })
-        
         log_progress(90)
         
-        # Apply corrections if provided
-        if corrections_json and corrections_json.strip():
+        # Keep the uncorrected segments, so re-running with different corrections still hits the cache
+        if cache and not failed_chunks:
             try:
-                corrections = json.loads(corrections_json)
-                log_status("info", f"Applying {len(corrections)} text corrections...")
-                
-                corrections_applied = 0
-                for seg in output:
-                    original_text = seg["text"]
-                    for wrong, correct in corrections.items():
-                        if wrong in seg["text"]:
-                            seg["text"] = seg["text"].replace(wrong, correct)
-                            corrections_applied += 1
-                            log_status("info", f"Applied correction: '{wrong}' → '{correct}'")
-                
-                log_status("info", f"Applied {corrections_applied} text corrections to segments")
-                        
-            except json.JSONDecodeError as e:
-                log_status("error", f"Invalid corrections JSON format: {str(e)}")
-                log_status("info", "Continuing without corrections...")
+                with telemetry.span("cache_store"):
+                    cache.store_json(cache_key, stream.raw)
             except Exception as e:
-                log_status("error", f"Error applying corrections: {str(e)}")
-                log_status("info", "Continuing without corrections...")
-        else:
-            log_status("info", "No text corrections provided")
+                log_status("info", f"Could not cache transcription: {str(e)}")
+        
+        telemetry.count("gc_collections", memory_budget.collections)
+        save_stream(stream, output_path, telemetry)
         
-        log_progress(95)
+        if journal:
+            journal.finish()
         
-        # Save to JSON
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        stats["duration"] = duration
+        stats["segments"] = len(stream.output)
+        stats["memory"]["collections"] = memory_budget.collections
         
         log_progress(100)
-        log_status("success", f"Transcription completed successfully! Processed {duration/60:.2f} minutes, saved {len(output)} segments to {os.path.basename(output_path)}")
+        log_status("success", f"Transcription completed successfully! Processed {duration/60:.2f} minutes, saved {len(stream.output)} segments to {os.path.basename(output_path)}")
         
+    except JobCancelled:
+        raise
     except Exception as e:
         log_status("error", f"Transcription failed: {str(e)}")
         sys.exit(1)
+    finally:
+        # Failed chunks, cancellations and errors too - the long-lived worker would pile up connections
+        if cache:
+            cache.close()
+
+def transcribe_job(job, model_loader=None, profile=None, control=None):
+    """Run transcribe_audio from a job document (the format Electron sends)"""
+    with profiling(job.get("profile", profile), job["outputPath"], log_status):
+        transcribe_audio(
+            job["audioPath"],
+            job["outputPath"],
+            job.get("corrections"),
+            job.get("language", "he"),
+            job.get("modelSize", "medium"),
+            model_loader=model_loader,
+            chunk_seconds=job.get("chunkSeconds", "auto"),
+            overlap_seconds=job.get("overlapSeconds", 1.0),
+            workers=job.get("workers", 1),
+            resume=job.get("resume", False),
+            corrections_path=job.get("correctionsPath"),
+            use_cache=job.get("useCache", True),
+            backend=job.get("backend", "whisper"),
+            memory_budget_mb=job.get("memoryBudgetMb"),
+            control=control
+        )
 
 if __name__ == "__main__":
+    # --profile[=py-spy] profiles the whole run (see telemetry.py)
+    sys.argv, profile = pop_profile_flag(sys.argv)
+
+    # --job <file|-> takes every setting from a JSON job document instead of the command line
+    if len(sys.argv) == 3 and sys.argv[1] == "--job":
+        try:
+            job = read_job(sys.argv[2])
+        except (OSError, ValueError) as e:
+            log_status("error", f"Could not read job document: {str(e)}")
+            sys.exit(1)
+        log_status("info", f"Audio: {os.path.basename(job['audioPath'])}")
+        log_status("info", f"Output: {os.path.basename(job['outputPath'])}")
+        # pause/resume/cancel lines may follow the job on stdin (see job_control)
+        control = job_control.start(log_status)
+        try:
+            transcribe_job(job, profile=profile, control=control)
+        except JobCancelled:
+            sys.exit(CANCELLED_EXIT_CODE)
+        sys.exit(0)
+
+    # --resume continues from the checkpoint journal of an interrupted run
+    resume = "--resume" in sys.argv
+    sys.argv = [arg for arg in sys.argv if arg != "--resume"]
+
     if len(sys.argv) < 3:
-        log_status("error", "Usage: python transcribe_audio.py <audio_file> <output_file> [corrections_json] [language] [model_size]")
+        log_status("error", "Usage: python transcribe_audio.py <audio_file> <output_file> [corrections_json] [language] [model_size] [workers|auto] [backend] [--resume] [--profile[=py-spy]]")
+        log_status("error", "   or: python transcribe_audio.py --job <job_file|->")
         sys.exit(1)
 
     audio_path = sys.argv[1]
@@ -310,10 +553,22 @@ if __name__ == "__main__":
     corrections_json = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] != "null" else None
     language = sys.argv[4] if len(sys.argv) > 4 else "he"
     model_size = sys.argv[5] if len(sys.argv) > 5 else "medium"
+    workers = sys.argv[6] if len(sys.argv) > 6 else 1
+    if workers != "auto":
+        workers = int(workers)
+    backend = sys.argv[7] if len(sys.argv) > 7 else "whisper"
     
     log_status("info", f"Audio: {os.path.basename(audio_path)}")
     log_status("info", f"Output: {os.path.basename(output_path)}")
     log_status("info", f"Language: {language}")
     log_status("info", f"Model: {model_size}")
+    log_status("info", f"Workers: {workers}")
+    log_status("info", f"Backend: {backend}")
     
-    transcribe_audio(audio_path, output_path, corrections_json, language, model_size)
\ No newline at end of file
+    control = job_control.start(log_status)
+    try:
+        with profiling(profile, output_path, log_status):
+            transcribe_audio(audio_path, output_path, corrections_json, language, model_size, workers=workers, resume=resume,
+                             backend=backend, control=control)
+    except JobCancelled:
+        sys.exit(CANCELLED_EXIT_CODE)
\ No newline at end of file
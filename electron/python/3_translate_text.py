@@ -1,37 +1,74 @@
+import asyncio
+import hashlib
 import json
 import sys
 import os
-from openai import OpenAI
+from artifact_cache import content_fingerprint, default_cache_dir
+from checkpoint import CheckpointJournal
+import job_control
+from job_control import CANCELLED_EXIT_CODE, JobCancelled, JobControl
+from segment_store import load_segments, save_segments
+from stages import read_job
+from telemetry import ProgressCoalescer, Telemetry, pop_profile_flag, profiling
+from translation_cache import TranslationCache, translation_settings, write_settings
+from translation_memory import REUSE_SIMILARITY, load_memory
 
-def log_status(status, message):
+# Signatures of the translation memory sources, shared by every project (see translation_memory)
+MEMORY_FILE = "translation_memory.sqlite"
+
+def log_status(status, message, **fields):
     """Log status messages that can be captured by Electron"""
     status_data = {
         "type": "status",
         "status": status,
-        "message": message
+        "message": message,
+        **fields
     }
     print(f"STATUS:{json.dumps(status_data)}", flush=True)
 
-def translate_segments(input_file, output_file, api_key, system_prompt, source_lang="he", target_lang="en", model="gpt-4"):
-    """Translate segments using OpenAI API"""
+def translate_segments(input_file, output_file, api_key, system_prompt, source_lang="he", target_lang="en", model="gpt-4",
+                       concurrency=8, batch_size=10, requests_per_minute=500, base_url=None, cache_path=None,
+                       resume=False, control=None, memory_paths=None):
+    """Translate segments using OpenAI API
+
+    Requests run concurrently and pack up to batch_size segments each; base_url points the
+    client at any OpenAI-compatible server (defaults to OPENAI_BASE_URL or the OpenAI API).
+    Translations are cached in cache_path (translation_cache.sqlite next to the output by default),
+    and journaled as they finish so resume=True can continue an interrupted run.
+    A timing report is written next to the output as <output>.timing.json.
+
+    memory_paths (segments files, or folders of project folders) feed a fuzzy translation
+    memory of projects translated with the same languages and prompt: near-identical sentences
+    reuse their earlier, possibly hand-corrected translation without an API call, similar ones
+    are sent to the model as examples.
+
+    A JobControl (see job_control) pauses or cancels the run between requests; a cancelled
+    run saves the translations finished so far, keeps the journal and raises JobCancelled.
+    """
+    telemetry = Telemetry("translate")
+    control = control or JobControl(log_status)
     
     try:
-        # Initialize OpenAI client
         if not api_key or api_key.strip() == "":
             log_status("error", "OpenAI API key is required")
             return False
-            
-        client = OpenAI(api_key=api_key.strip())
         
         # Check if input file exists
         if not os.path.exists(input_file):
             log_status("error", f"Input file does not exist: {input_file}")
             return False
         
+        # The openai package is slow to import, so it is only loaded once the job is known to be valid
+        from openai import AsyncOpenAI
+        from translation_engine import TranslationEngine
+        
+        # Initialize OpenAI client; retries are handled by the engine so they share its backoff and rate limit
+        client = AsyncOpenAI(api_key=api_key.strip(), base_url=base_url, max_retries=0)
+        
         # Load segments
         log_status("info", f"Loading segments from {os.path.basename(input_file)}")
-        with open(input_file, "r", encoding="utf-8") as f:
-            segments = json.load(f)
+        with telemetry.span("load_segments"):
+            segments = load_segments(input_file)
         
         if not isinstance(segments, list):
             log_status("error", "Input file must contain a JSON array of segments")
@@ -44,21 +81,14 @@ def translate_segments(input_file, output_file, api_key, system_prompt, source_l
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
         
-        # Process each segment and create new output format
+        # Build the output segments, skipping empty ones
         translated_segments = []
-        translated_count = 0
-        error_count = 0
-        
         for i, seg in enumerate(segments):
-            # Progress update
-            progress_percent = int((i / len(segments)) * 100)
-            log_status("progress", f"Translating segment {i+1}/{len(segments)} ({progress_percent}%)")
-            
             source_text = seg.get("text", "").strip()
             
             # Skip empty segments
             if not source_text:
-                log_status("info", f"Segment {i+1}: Skipped empty segment")
+                telemetry.count("skipped_empty")
                 continue
             
             # Create new segment with required output format
@@ -70,37 +100,152 @@ def translate_segments(input_file, output_file, api_key, system_prompt, source_l
                 "delayStartSeconds": 0,
                 "delayEndSeconds": 0
             }
-            
-            # Translate using OpenAI
-            try:
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": source_text}
-                    ],
-                    temperature=0.3,  # Lower temperature for more consistent translations
-                    max_tokens=500    # Reasonable limit for segment translations
+            # Audio times let 4_detect_slides.py assign slides from the video
+            if "start" in seg:
+                new_segment["start"] = seg["start"]
+                new_segment["end"] = seg.get("end", seg["start"])
+            translated_segments.append(new_segment)
+        
+        if telemetry.counters["skipped_empty"]:
+            log_status("info", f"Skipped {telemetry.counters['skipped_empty']} empty segments")
+        
+        # Reuse cached translations for identical text, prompt, languages and model
+        with telemetry.span("cache_lookup"):
+            cache = TranslationCache(cache_path or os.path.join(output_dir, "translation_cache.sqlite"))
+            keys = [
+                TranslationCache.make_key(seg["text"], system_prompt, source_lang, target_lang, model)
+                for seg in translated_segments
+            ]
+            cached = cache.get_many(keys)
+        telemetry.count("cache_hits", cache.hits)
+        telemetry.count("cache_misses", cache.misses)
+        log_status("info", f"Translation cache: {cache.hits} hits, {cache.misses} misses")
+        
+        settings = translation_settings(system_prompt, source_lang, target_lang)
+        memory_matches = [[] for _ in translated_segments]
+        if memory_paths:
+            with telemetry.span("memory_lookup"):
+                # This job's own files are not memory, or re-translating would just copy the old output
+                memory, source_count = load_memory(
+                    memory_paths, os.path.join(default_cache_dir(), MEMORY_FILE), settings, exclude=(input_file, output_file)
                 )
-                
-                translation = response.choices[0].message.content.strip()
+                memory_matches = [memory.lookup(seg["text"]) for seg in translated_segments]
+            telemetry.set("memory_pairs", len(memory))
+        # Human translations win over the machine cache; "chapter 3" never reuses "chapter 4"
+        reused = {
+            i: matches[0].translation for i, matches in enumerate(memory_matches)
+            if matches and matches[0].similarity >= REUSE_SIMILARITY and matches[0].same_numbers
+        }
+        
+        # Segments finished by an interrupted run are read back from the checkpoint journal
+        journal = CheckpointJournal(output_file, {
+            "input": content_fingerprint(input_file),
+            "system_prompt": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "model": model
+        })
+        journaled = {record["id"]: record["translation"] for record in journal.open(resume)}
+        telemetry.count("resumed", len(journaled))
+        if journaled:
+            log_status("info", f"Resuming: {len(journaled)} segments already translated")
+        
+        results = [
+            (reused[i], None) if i in reused else
+            (cached[key], None) if key in cached else
+            (journaled[seg["id"]], None) if seg["id"] in journaled else None
+            for i, (seg, key) in enumerate(zip(translated_segments, keys))
+        ]
+        pending = [i for i, result in enumerate(results) if result is None]
+        total = len(pending)
+        hints = [[(match.text, match.translation) for match in memory_matches[i]] for i in pending]
+        
+        if memory_paths:
+            telemetry.count("memory_reused", len(reused))
+            telemetry.count("memory_hints", sum(1 for pairs in hints if pairs))
+            log_status("info", f"Translation memory: {len(memory)} pairs from {source_count} projects; "
+                               f"reused {len(reused)}, examples for {telemetry.counters['memory_hints']}")
+        
+        def record_result(n, translation, error):
+            if error is None:
+                journal.append({"id": translated_segments[pending[n]]["id"], "translation": translation})
+        
+        def emit_progress(completed):
+            progress_percent = int((completed / total) * 100) if total else 100
+            log_status("progress", f"Translated {completed}/{total} segments ({progress_percent}%)", percent=progress_percent)
+        
+        # Segments finish in bursts; a few updates per second is all the UI can show anyway
+        progress = ProgressCoalescer(emit_progress)
+        
+        def report_progress(completed):
+            progress.update(completed, final=completed == total)
+        
+        engine = TranslationEngine(
+            client,
+            model,
+            system_prompt,
+            concurrency=concurrency,
+            requests_per_minute=requests_per_minute,
+            batch_size=batch_size,
+            on_progress=report_progress,
+            on_result=record_result,
+            log=log_status,
+            telemetry=telemetry,
+            control=control
+        )
+        
+        if pending:
+            log_status("info", f"Translating {total} segments ({concurrency} concurrent requests, up to {batch_size} segments per request)")
+            with telemetry.span("translate"):
+                fresh = asyncio.run(engine.translate_all([translated_segments[i]["text"] for i in pending], hints))
+            progress.flush()
+            for i, result in zip(pending, fresh):
+                results[i] = result
+            
+            # Only successful translations go into the cache
+            cache.put_many([(keys[i], result[0]) for i, result in zip(pending, fresh) if result and result[1] is None])
+        cache.close()
+        
+        translated_count = 0
+        error_count = 0
+        untranslated_count = 0
+        for new_segment, result in zip(translated_segments, results):
+            if result is None:
+                # Never sent because the job was cancelled - left empty for a resumed run
+                untranslated_count += 1
+                continue
+            translation, error = result
+            if error is None:
                 new_segment["translation"] = translation
                 translated_count += 1
-                
-                log_status("info", f"Segment {i+1}: '{source_text[:50]}...' → '{translation[:50]}...'")
-                
-            except Exception as e:
+            else:
                 new_segment["translation"] = "[translation_error]"
                 error_count += 1
-                log_status("error", f"Segment {i+1}: Translation failed - {str(e)}")
-            
-            # Add the new segment to output
-            translated_segments.append(new_segment)
+                log_status("error", f"Segment {new_segment['id']}: Translation failed - {error}")
         
         # Save translated segments in new format
         log_status("info", f"Saving translations to {os.path.basename(output_file)}")
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(translated_segments, f, ensure_ascii=False, indent=2)
+        with telemetry.span("save"):
+            save_segments(output_file, translated_segments)
+            # Lets later projects with the same languages and prompt use these translations as memory
+            write_settings(output_file, settings)
+        
+        telemetry.count("segments", len(translated_segments))
+        telemetry.count("translated", translated_count)
+        telemetry.count("errors", error_count)
+        
+        if untranslated_count:
+            # The journal stays, so resuming the same job only translates the rest
+            journal.close()
+            telemetry.set("cancelled", True)
+            telemetry.write_report(output_file)
+            log_status("info", telemetry.summary())
+            log_status("cancelled", f"Translation cancelled; saved {translated_count} translated segments, {untranslated_count} left untranslated. Run it again with resume to finish.")
+            raise JobCancelled()
+        
+        journal.finish()
+        telemetry.write_report(output_file)
+        log_status("info", telemetry.summary())
         
         # Final status
         if error_count > 0:
@@ -110,6 +255,8 @@ def translate_segments(input_file, output_file, api_key, system_prompt, source_l
         
         return True
         
+    except JobCancelled:
+        raise
     except Exception as e:
         log_status("error", f"Translation process failed: {str(e)}")
         return False
@@ -117,35 +264,79 @@ def translate_segments(input_file, output_file, api_key, system_prompt, source_l
 def main():
     """Main function that processes command line arguments"""
     
-    if len(sys.argv) < 6:
-        log_status("error", "Usage: python translate.py <input_file> <output_file> <api_key> <system_prompt> <source_lang> [target_lang] [model]")
-        sys.exit(1)
+    # --profile[=py-spy] profiles the whole run (see telemetry.py)
+    sys.argv, profile = pop_profile_flag(sys.argv)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    api_key = sys.argv[3]
-    system_prompt = sys.argv[4]
-    source_lang = sys.argv[5]
-    target_lang = sys.argv[6] if len(sys.argv) > 6 else "en"
-    model = sys.argv[7] if len(sys.argv) > 7 else "gpt-4"
+    # --job <file|-> takes every setting from a JSON job document instead of the command line
+    if len(sys.argv) == 3 and sys.argv[1] == "--job":
+        try:
+            job = read_job(sys.argv[2])
+        except (OSError, ValueError) as e:
+            log_status("error", f"Could not read job document: {str(e)}")
+            sys.exit(1)
+        
+        input_file = job["inputPath"]
+        output_file = job["outputPath"]
+        api_key = job.get("apiKey", "")
+        system_prompt = job.get("systemPrompt", "")
+        source_lang = job.get("sourceLanguage", "he")
+        target_lang = job.get("targetLanguage", "en")
+        model = job.get("model", "gpt-4")
+        concurrency = job.get("concurrency", 8)
+        batch_size = job.get("batchSize", 10)
+        resume = job.get("resume", False)
+        memory_paths = job.get("memoryPaths", [])
+        profile = job.get("profile", profile)
+    else:
+        # --resume continues from the checkpoint journal of an interrupted run
+        resume = "--resume" in sys.argv
+        sys.argv = [arg for arg in sys.argv if arg != "--resume"]
+        memory_paths = []
+        
+        if len(sys.argv) < 6:
+            log_status("error", "Usage: python translate.py <input_file> <output_file> <api_key> <system_prompt> <source_lang> [target_lang] [model] [concurrency] [batch_size] [--resume] [--profile[=py-spy]]")
+            log_status("error", "   or: python translate.py --job <job_file|->")
+            sys.exit(1)
+        
+        input_file = sys.argv[1]
+        output_file = sys.argv[2]
+        api_key = sys.argv[3]
+        system_prompt = sys.argv[4]
+        source_lang = sys.argv[5]
+        target_lang = sys.argv[6] if len(sys.argv) > 6 else "en"
+        model = sys.argv[7] if len(sys.argv) > 7 else "gpt-4"
+        concurrency = int(sys.argv[8]) if len(sys.argv) > 8 else 8
+        batch_size = int(sys.argv[9]) if len(sys.argv) > 9 else 10
     
     log_status("info", f"Starting translation: {source_lang} → {target_lang}")
     log_status("info", f"Model: {model}")
     log_status("info", f"Input: {os.path.basename(input_file)}")
     log_status("info", f"Output: {os.path.basename(output_file)}")
     
-    success = translate_segments(
-        input_file=input_file,
-        output_file=output_file,
-        api_key=api_key,
-        system_prompt=system_prompt,
-        source_lang=source_lang,
-        target_lang=target_lang,
-        model=model
-    )
+    # pause/resume/cancel lines may follow the job on stdin (see job_control)
+    control = job_control.start(log_status)
+    
+    try:
+        with profiling(profile, output_file, log_status):
+            success = translate_segments(
+                input_file=input_file,
+                output_file=output_file,
+                api_key=api_key,
+                system_prompt=system_prompt,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                model=model,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                resume=resume,
+                control=control,
+                memory_paths=memory_paths
+            )
+    except JobCancelled:
+        sys.exit(CANCELLED_EXIT_CODE)
     
     if not success:
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
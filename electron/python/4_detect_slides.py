@@ -0,0 +1,375 @@
+"""Detect slide changes in a lecture video and pre-assign segment slide numbers
+
+ffmpeg samples the video at a low frame rate and scales every frame down to a 72x64 grayscale
+thumbnail before it reaches Python, so a 90-minute 1080p recording streams through as a few
+megabytes of pixels. Thumbnails are hashed in batches (dHash over 8x8 pixel blocks); a slide
+change is a frame whose hash or pixels differ from the current slide and then stay put for a
+couple of seconds, which skips fades, animations and brief camera cuts.
+
+Every segment gets the slide it overlaps most. With imported slide images each detected slide
+is matched to the nearest image, so numbers follow the editor's slide order and revisited
+slides get their original number; without them, slides are numbered by first appearance.
+Segments that already have a slide keep it unless overwrite is set.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from segment_store import load_segments, save_segments, segment_times
+from stages import load_stage, read_job
+from telemetry import ProgressCoalescer, Telemetry, pop_profile_flag, profiling
+
+# Thumbnails are 9x8 blocks of 8x8 pixels: block means give the hash, pixels the frame difference
+BLOCK = 8
+THUMB_WIDTH = 9 * BLOCK
+THUMB_HEIGHT = 8 * BLOCK
+FRAME_BYTES = THUMB_WIDTH * THUMB_HEIGHT
+FRAMES_PER_BATCH = 256
+
+DEFAULT_FPS = 1.0
+# A frame shows a different slide when this many of the 64 hash bits differ, or when its pixels
+# differ this much on average (0-255) - the pixel test catches a bullet point appearing
+HASH_THRESHOLD = 10
+PIXEL_THRESHOLD = 6.0
+# Neighbouring blocks must differ by this many gray levels to set a hash bit; without the dead
+# zone the flat background of a text slide flips bits on compression noise alone
+HASH_MARGIN = 2.0
+# ...and the new slide counts once it has stayed unchanged this long
+MIN_STABLE_SECONDS = 2.0
+# Largest hash distance at which a detected slide is considered one of the imported images;
+# images within MATCH_SLACK of the closest hash are told apart by their pixels
+MATCH_THRESHOLD = 18
+MATCH_SLACK = 4
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp")
+
+def log_status(status, message):
+    status_data = {
+        "type": "status",
+        "status": status,
+        "message": message
+    }
+    print(f"STATUS:{json.dumps(status_data)}", flush=True)
+
+def log_progress(percent):
+    progress_data = {
+        "type": "progress",
+        "percent": percent
+    }
+    print(f"PROGRESS:{json.dumps(progress_data)}", flush=True)
+
+def thumbnail_args(fps=None):
+    """ffmpeg output options producing raw 8-bit grayscale thumbnails (area-averaged), optionally resampled to fps"""
+    scale = f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:flags=area,format=gray"
+    return ["-vf", f"fps={fps},{scale}" if fps else scale, "-f", "rawvideo", "-pix_fmt", "gray"]
+
+def stream_frames(video_path, fps):
+    """Yield (times, frames) batches of thumbnails; frames is a (n, 64, 72) uint8 array"""
+    process = subprocess.Popen(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", video_path, "-an", "-sn"] + thumbnail_args(fps) + ["pipe:1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    # Drain stderr so ffmpeg can never block on it
+    errors = []
+    stderr_thread = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    stderr_thread.start()
+
+    count = 0
+    try:
+        while True:
+            data = process.stdout.read(FRAME_BYTES * FRAMES_PER_BATCH)
+            n = len(data) // FRAME_BYTES
+            if n == 0:
+                break
+            frames = np.frombuffer(data, dtype=np.uint8, count=n * FRAME_BYTES).reshape(n, THUMB_HEIGHT, THUMB_WIDTH)
+            yield (count + np.arange(n)) / fps, frames
+            count += n
+    finally:
+        process.stdout.close()
+        process.wait()
+        stderr_thread.join()
+
+    if process.returncode != 0:
+        raise RuntimeError(b"".join(errors).decode("utf-8", "replace").strip() or "ffmpeg failed to decode the video")
+
+def dhash(frames):
+    """64-bit difference hashes of (n, 64, 72) thumbnails: is each 8x8 block brighter than its left neighbour"""
+    blocks = frames.reshape(len(frames), 8, BLOCK, 9, BLOCK).mean(axis=(2, 4))
+    bits = blocks[:, :, 1:] > blocks[:, :, :-1] + HASH_MARGIN
+    return np.packbits(bits.reshape(len(frames), 64), axis=1).view(">u8")[:, 0].astype(np.uint64)
+
+def hamming(a, b):
+    """Bit distance between uint64 hash arrays (broadcasting)"""
+    x = np.bitwise_xor(a, b)
+    return np.unpackbits(np.ascontiguousarray(x).view(np.uint8).reshape(*x.shape, 8), axis=-1).sum(axis=-1)
+
+class SlideDetector:
+    """Finds slide changes in a stream of thumbnail batches
+
+    Each detected slide is {"start", "group"}; frames showing the same picture again (a
+    revisited slide) share a group, and groups keep a representative hash and thumbnail.
+    """
+
+    def __init__(self, fps=DEFAULT_FPS, min_stable_seconds=MIN_STABLE_SECONDS):
+        self.min_stable = max(1, int(round(min_stable_seconds * fps)))
+        self.slides = []
+        self.group_hashes = []
+        self.group_frames = []
+        self.reference = None  # (hash, frame) of the slide being shown
+        self.candidate = None  # (time, hash, frame) of a possible new slide
+        self.stable = 0
+
+    @staticmethod
+    def _differs(hashes, frames, reference):
+        ref_hash, ref_frame = reference
+        pixels = np.abs(frames.astype(np.int16) - ref_frame).mean(axis=(1, 2))
+        return (hamming(hashes, ref_hash) >= HASH_THRESHOLD) | (pixels >= PIXEL_THRESHOLD)
+
+    def _group(self, frame_hash, frame):
+        """Group of an earlier slide showing the same picture, or a new group"""
+        if self.group_hashes:
+            candidates = np.flatnonzero(hamming(np.array(self.group_hashes), frame_hash) < HASH_THRESHOLD)
+            for group in candidates:
+                if not self._differs(np.array([frame_hash]), frame[None], (self.group_hashes[group], self.group_frames[group]))[0]:
+                    return int(group)
+        self.group_hashes.append(frame_hash)
+        self.group_frames.append(frame.astype(np.int16))
+        return len(self.group_hashes) - 1
+
+    def _start_slide(self, time, frame_hash, frame):
+        group = self._group(frame_hash, frame)
+        if not self.slides or self.slides[-1]["group"] != group:
+            self.slides.append({"start": float(time), "group": group})
+        self.reference = (frame_hash, frame.astype(np.int16))
+
+    def feed(self, times, frames):
+        hashes = dhash(frames)
+        i = 0
+        if self.reference is None:
+            self._start_slide(times[0], hashes[0], frames[0])
+            i = 1
+
+        while i < len(frames):
+            if self.candidate is None:
+                # Skip ahead to the first frame that no longer shows the current slide
+                changed = np.flatnonzero(self._differs(hashes[i:], frames[i:], self.reference))
+                if not len(changed):
+                    return
+                i += int(changed[0])
+                self.candidate = (times[i], hashes[i], frames[i].astype(np.int16))
+                self.stable = 1
+                i += 1
+                continue
+
+            # How many of the following frames still show the candidate
+            same = ~self._differs(hashes[i:], frames[i:], self.candidate[1:])
+            run = len(same) if same.all() else int(np.argmin(same))
+            needed = self.min_stable - self.stable
+            if run >= needed:
+                self._start_slide(*self.candidate)
+                self.candidate = None
+                i += needed
+            elif run == len(same):
+                self.stable += run
+                return
+            else:
+                # Only a transition; look at the frame that broke the run against the current slide again
+                self.candidate = None
+                i += run
+
+        if self.candidate is not None and self.stable >= self.min_stable:
+            self._start_slide(*self.candidate)
+            self.candidate = None
+
+def image_sort_key(file_name):
+    """The editor's slide order: by the first number in the file name (0 when there is none)"""
+    match = re.search(r"\d+", file_name)
+    return int(match.group()) if match else 0
+
+def list_slide_images(slides_dir):
+    names = sorted(name for name in os.listdir(slides_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(slides_dir, name) for name in sorted(names, key=image_sort_key)]
+
+def image_thumbnail(image_path):
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", image_path, "-frames:v", "1"] + thumbnail_args() + ["pipe:1"],
+        capture_output=True
+    )
+    if result.returncode != 0 or len(result.stdout) < FRAME_BYTES:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or f"Could not read {image_path}")
+    return np.frombuffer(result.stdout[:FRAME_BYTES], dtype=np.uint8).reshape(THUMB_HEIGHT, THUMB_WIDTH)
+
+def match_images(detector, image_paths):
+    """Slide number (image index + 1, or 0 when nothing is close) for every detected group"""
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+        thumbnails = np.stack(list(pool.map(image_thumbnail, image_paths)))
+    image_hashes = dhash(thumbnails)
+    distances = hamming(np.array(detector.group_hashes)[:, None], image_hashes[None, :])
+
+    numbers = []
+    for group, row in enumerate(distances):
+        # Hashes of mostly flat text slides differ in few bits, so near ties go to the closest pixels
+        best = np.flatnonzero(row <= row.min() + MATCH_SLACK)
+        pixels = np.abs(thumbnails[best].astype(np.int16) - detector.group_frames[group]).mean(axis=(1, 2))
+        image = int(best[np.argmin(pixels)])
+        numbers.append(image + 1 if row[image] <= MATCH_THRESHOLD else 0)
+    return numbers
+
+def assign_slides(segments, starts, numbers):
+    """Slide number for each segment: the slide it overlaps most (starts are sorted slide start times)"""
+    assigned = []
+    for segment in segments:
+        start, end = segment_times(segment)
+        first = max(0, bisect_right(starts, start) - 1)
+        last = max(first, bisect_left(starts, end) - 1)
+        best, best_overlap = first, -1.0
+        for k in range(first, last + 1):
+            slide_end = starts[k + 1] if k + 1 < len(starts) else float("inf")
+            overlap = min(end, slide_end) - max(start, starts[k])
+            if overlap > best_overlap:
+                best, best_overlap = k, overlap
+        assigned.append(numbers[best])
+    return assigned
+
+def detect_slides(video_path, segments_path, slides_dir=None, times_path=None, fps=DEFAULT_FPS, overwrite=False):
+    """Detect slide changes in video_path and write slide numbers into the segments file
+
+    times_path is a transcription file to take segment times from when the segments have none
+    (translations made before they carried start/end): segment id n gets the times of entry n-1,
+    and keeps them in the saved file.
+    The detected slides are written next to the segments as <segments>.slides.json.
+    """
+    telemetry = Telemetry("slides")
+
+    for path, label in ((video_path, "Video"), (segments_path, "Segments file")):
+        if not os.path.exists(path):
+            log_status("error", f"{label} does not exist: {path}")
+            return False
+
+    try:
+        segments = load_segments(segments_path)
+        if times_path:
+            times = load_segments(times_path)
+            for segment in segments:
+                index = segment.get("id", 0) - 1
+                if "start" not in segment and 0 <= index < len(times):
+                    segment["start"], segment["end"] = segment_times(times[index])
+        if not any("start" in segment or "startTime" in segment for segment in segments):
+            log_status("error", "The segments have no times; pass the transcription file to take them from")
+            return False
+
+        duration = load_stage("1_extract_audio.py", "extract_audio").probe_duration(video_path)
+        log_status("info", f"Sampling {os.path.basename(video_path)} at {fps:g} frames per second...")
+
+        progress = ProgressCoalescer(log_progress, min_interval=0.5)
+        detector = SlideDetector(fps)
+        with telemetry.span("detect"):
+            for times, frames in stream_frames(video_path, fps):
+                telemetry.count("frames", len(frames))
+                detector.feed(times, frames)
+                if duration:
+                    progress.update(min(int(times[-1] / duration * 90), 90))
+        progress.flush()
+
+        if not detector.slides:
+            log_status("error", "No frames could be read from the video")
+            return False
+        log_status("info", f"Detected {len(detector.slides)} slide changes ({len(detector.group_hashes)} distinct slides)")
+
+        image_paths = list_slide_images(slides_dir) if slides_dir and os.path.isdir(slides_dir) else []
+        if image_paths:
+            with telemetry.span("match_images"):
+                group_numbers = match_images(detector, image_paths)
+            matched = sum(1 for number in group_numbers if number)
+            log_status("info", f"Matched {matched}/{len(group_numbers)} distinct slides to {len(image_paths)} imported images")
+        else:
+            group_numbers = [group + 1 for group in range(len(detector.group_hashes))]
+
+        starts = [slide["start"] for slide in detector.slides]
+        numbers = [group_numbers[slide["group"]] for slide in detector.slides]
+        assigned = 0
+        for segment, number in zip(segments, assign_slides(segments, starts, numbers)):
+            if number and (overwrite or not segment.get("slide")):
+                segment["slide"] = number
+                assigned += 1
+
+        with telemetry.span("save"):
+            save_segments(segments_path, segments)
+            with open(f"{segments_path}.slides.json", "w", encoding="utf-8") as f:
+                json.dump([
+                    {
+                        "slide": number,
+                        "start": start,
+                        "end": starts[k + 1] if k + 1 < len(starts) else duration,
+                        "image": os.path.basename(image_paths[number - 1]) if image_paths and number else None
+                    }
+                    for k, (start, number) in enumerate(zip(starts, numbers))
+                ], f, indent=2)
+
+        telemetry.count("slides", len(starts))
+        telemetry.count("assigned", assigned)
+        telemetry.write_report(segments_path)
+        log_status("info", telemetry.summary())
+        log_progress(100)
+        log_status("success", f"Assigned slides to {assigned} of {len(segments)} segments")
+        return True
+
+    except FileNotFoundError:
+        log_status("error", "ffmpeg not found. Please install ffmpeg and add it to your PATH")
+    except Exception as e:
+        log_status("error", f"Slide detection failed: {str(e)}")
+    return False
+
+def main():
+    # --profile[=py-spy] profiles the whole run (see telemetry.py)
+    sys.argv, profile = pop_profile_flag(sys.argv)
+
+    # --job <file|-> takes every setting from a JSON job document instead of the command line
+    if len(sys.argv) == 3 and sys.argv[1] == "--job":
+        try:
+            job = read_job(sys.argv[2])
+        except (OSError, ValueError) as e:
+            log_status("error", f"Could not read job document: {str(e)}")
+            sys.exit(1)
+        profile = job.get("profile", profile)
+    else:
+        # --overwrite also replaces slides that were already assigned
+        overwrite = "--overwrite" in sys.argv
+        sys.argv = [arg for arg in sys.argv if arg != "--overwrite"]
+
+        if len(sys.argv) < 3:
+            log_status("error", "Usage: python detect_slides.py <video> <segments_json> [slides_dir] [transcription_json] [fps] [--overwrite] [--profile[=py-spy]]")
+            log_status("error", "   or: python detect_slides.py --job <job_file|->")
+            sys.exit(1)
+
+        job = {
+            "videoPath": sys.argv[1],
+            "segmentsPath": sys.argv[2],
+            "slidesDir": sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None,
+            "timesPath": sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else None,
+            "fps": float(sys.argv[5]) if len(sys.argv) > 5 else DEFAULT_FPS,
+            "overwrite": overwrite
+        }
+
+    with profiling(profile, job["segmentsPath"], log_status):
+        success = detect_slides(
+            job["videoPath"],
+            job["segmentsPath"],
+            slides_dir=job.get("slidesDir"),
+            times_path=job.get("timesPath"),
+            fps=job.get("fps", DEFAULT_FPS),
+            overwrite=job.get("overwrite", False)
+        )
+
+    if not success:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 256 * 1024
+
+def default_cache_dir():
+    """SLIDER_CACHE_DIR (set by Electron to the app's data directory) or ~/.cache/slider"""
+    return os.environ.get("SLIDER_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "slider")
+
+def sampled_hash(path, blocks=SAMPLE_BLOCKS, block_size=SAMPLE_BLOCK_SIZE):
+    """Hash evenly spaced blocks of a file (always including the first and last) instead of all of it
+
+    Multi-gigabyte videos are fingerprinted in milliseconds; size and mtime in content_fingerprint
+    cover the edits that a sample could miss.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode("ascii"), digest_size=20)
+
+    with open(path, "rb") as f:
+        if size <= blocks * block_size:
+            digest.update(f.read())
+        else:
+            step = (size - block_size) / (blocks - 1)
+            for n in range(blocks):
+                f.seek(int(n * step))
+                digest.update(f.read(block_size))
+
+    return digest.hexdigest()
+
+def content_fingerprint(path):
+    """Identify a file by a sampled content hash, size and modification time"""
+    stat = os.stat(path)
+    return {"hash": sampled_hash(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+class ArtifactCache:
+    """Size-capped cache of stage outputs keyed by input fingerprint and stage parameters
+
+    Artifacts are files in cache_dir, indexed in SQLite; the least recently used ones are
+    evicted once their total size exceeds max_bytes. Hits are copied with their modification
+    time preserved, so an artifact fetched from the cache fingerprints the same as when it
+    was stored and the next stage can hit too.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.dir = os.path.join(cache_dir or default_cache_dir(), "artifacts")
+        self.max_bytes = max_bytes
+        os.makedirs(self.dir, exist_ok=True)
+
+        # Batch runs extract several videos at once, so wait for the index lock instead of failing
+        self.conn = sqlite3.connect(os.path.join(self.dir, "index.sqlite"), timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "key TEXT PRIMARY KEY, file TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS artifacts_last_used ON artifacts (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(stage, fingerprint, params):
+        payload = json.dumps([stage, fingerprint, params], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key):
+        row = self.conn.execute("SELECT file FROM artifacts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        path = os.path.join(self.dir, row[0])
+        if not os.path.exists(path):
+            self.conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+
+        self.conn.execute("UPDATE artifacts SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return path
+
+    def fetch(self, key, dest_path):
+        """Copy a cached artifact to dest_path; returns False on a miss"""
+        path = self._lookup(key)
+        if path is None:
+            return False
+        tmp_path = f"{dest_path}.partial"
+        shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return True
+
+    def fetch_json(self, key):
+        path = self._lookup(key)
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def store(self, key, src_path):
+        """Copy src_path into the cache under key and evict beyond the size cap"""
+        file_name = key + os.path.splitext(src_path)[1]
+        tmp_path = os.path.join(self.dir, file_name + ".partial")
+        shutil.copy2(src_path, tmp_path)
+        os.replace(tmp_path, os.path.join(self.dir, file_name))
+        self._index(key, file_name)
+
+    def store_json(self, key, data):
+        file_name = key + ".json"
+        tmp_path = os.path.join(self.dir, file_name + ".partial")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.dir, file_name))
+        self._index(key, file_name)
+
+    def _index(self, key, file_name):
+        size = os.path.getsize(os.path.join(self.dir, file_name))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO artifacts (key, file, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, file_name, size, time.time())
+        )
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        """Delete least recently used artifacts until the total size fits max_bytes"""
+        (total,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+
+        for key, file_name, size in self.conn.execute(
+            "SELECT key, file, size FROM artifacts ORDER BY last_used ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.dir, file_name))
+            except FileNotFoundError:
+                pass
+            self.conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,258 @@
+import os
+import struct
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper's native rate, also what 1_extract_audio.py writes
+
+class PcmAudio:
+    """Mono 16-bit PCM audio exposed as a read-only memory map over the WAV data chunk"""
+
+    def __init__(self, samples, sample_rate=SAMPLE_RATE):
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @property
+    def num_samples(self):
+        return len(self.samples)
+
+    @property
+    def duration(self):
+        return self.num_samples / self.sample_rate
+
+    def window(self, start_sample, end_sample):
+        """Return float32 samples in [-1, 1) for one window - only this window is read into memory"""
+        view = self.samples[max(0, start_sample):min(end_sample, self.num_samples)]
+        if view.dtype == np.float32:
+            return view
+        return view.astype(np.float32) / 32768.0
+
+def _find_data_chunk(f, file_size):
+    """Walk the RIFF chunks and return (fmt fields, data offset, data size)"""
+    header = f.read(12)
+    if len(header) < 12 or header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("WAV file has no data chunk")
+
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            fmt_data = f.read(chunk_size)
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt_data[:16])
+            fmt = (audio_format, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            data_offset = f.tell()
+            # Streamed writers may leave a placeholder size, so never trust it past the end of file
+            data_size = min(chunk_size, file_size - data_offset)
+            return fmt, data_offset, data_size
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+def open_pcm_audio(audio_path):
+    """Memory-map a 16 kHz mono s16le WAV without decoding it
+
+    Raises ValueError for any other layout so callers can fall back to a full decode.
+    """
+    file_size = os.path.getsize(audio_path)
+    with open(audio_path, "rb") as f:
+        fmt, data_offset, data_size = _find_data_chunk(f, file_size)
+
+    if fmt is None:
+        raise ValueError("WAV file has no fmt chunk")
+
+    audio_format, channels, sample_rate, bits = fmt
+    if audio_format != 1 or channels != 1 or bits != 16 or sample_rate != SAMPLE_RATE:
+        raise ValueError(
+            f"Unsupported WAV layout (format={audio_format}, channels={channels}, "
+            f"rate={sample_rate}, bits={bits}); expected 16 kHz mono PCM s16le"
+        )
+
+    num_samples = data_size // 2
+    if num_samples == 0:
+        return PcmAudio(np.zeros(0, dtype=np.int16), sample_rate)
+
+    samples = np.memmap(audio_path, dtype="<i2", mode="r", offset=data_offset, shape=(num_samples,))
+    return PcmAudio(samples, sample_rate)
+
+class Chunk:
+    """A planned transcription window
+
+    start/end are the samples handed to the model (including overlap); keep_start/keep_end
+    are the boundaries in seconds that decide which chunk owns a segment when stitching.
+    """
+
+    def __init__(self, index, start_sample, end_sample, keep_start, keep_end, sample_rate=SAMPLE_RATE):
+        self.index = index
+        self.start_sample = start_sample
+        self.end_sample = end_sample
+        self.keep_start = keep_start
+        self.keep_end = keep_end
+        self.sample_rate = sample_rate
+
+    @property
+    def offset(self):
+        return self.start_sample / self.sample_rate
+
+    @property
+    def duration(self):
+        return (self.end_sample - self.start_sample) / self.sample_rate
+
+def _quietest_sample(audio, search_start, search_end, frame_seconds, min_silence_seconds):
+    """Return the sample at the centre of the lowest-energy stretch in [search_start, search_end)"""
+    frame = max(1, int(frame_seconds * audio.sample_rate))
+    num_frames = (search_end - search_start) // frame
+    if num_frames < 1:
+        return (search_start + search_end) // 2
+
+    window = audio.window(search_start, search_start + num_frames * frame)
+    energy = np.sqrt(np.mean(np.square(window.reshape(num_frames, frame)), axis=1))
+
+    # Smooth over the minimum silence length so a single quiet frame inside a word doesn't win
+    smooth = max(1, int(min_silence_seconds / frame_seconds))
+    if smooth > 1 and num_frames > smooth:
+        energy = np.convolve(energy, np.ones(smooth) / smooth, mode="same")
+
+    # Cut in the middle of the quiet stretch rather than at its first frame
+    best = int(np.argmin(energy))
+    quiet = energy <= energy[best] * 1.1 + 1e-6
+    left = best
+    while left > 0 and quiet[left - 1]:
+        left -= 1
+    right = best
+    while right < num_frames - 1 and quiet[right + 1]:
+        right += 1
+
+    return search_start + ((left + right) // 2) * frame + frame // 2
+
+class ChunkPlanner:
+    """Plans chunks of roughly target_seconds that start and end in silence
+
+    Each cut is placed at the quietest point within +/- search_seconds of the target length
+    (at most half the target, so short chunks never cut before the previous cut), and every chunk is widened by overlap_seconds on both sides for the stitcher to resolve.
+    Audio may still be arriving: ready_chunks() only hands out chunks whose audio is complete,
+    and plans exactly the chunks plan_chunks() would once called with final=True.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, target_seconds=180, search_seconds=15, overlap_seconds=1.0,
+                 frame_seconds=0.03, min_silence_seconds=0.3):
+        if target_seconds <= 0:
+            raise ValueError(f"Chunk length must be positive, got {target_seconds} seconds")
+        self.sample_rate = sample_rate
+        self.target = max(1, int(target_seconds * sample_rate))
+        self.search = min(int(search_seconds * sample_rate), self.target // 2)
+        self.overlap = int(overlap_seconds * sample_rate)
+        self.frame_seconds = frame_seconds
+        self.min_silence_seconds = min_silence_seconds
+        self.cut = 0
+        self.index = 0
+        self.done = False
+
+    def _chunk(self, next_cut, num_samples, last):
+        sr = self.sample_rate
+        chunk = Chunk(
+            self.index,
+            max(0, self.cut - self.overlap),
+            min(num_samples, next_cut + self.overlap),
+            self.cut / sr,
+            # The last chunk owns anything the model timestamps past the end of the audio
+            float("inf") if last else next_cut / sr,
+            sr
+        )
+        self.index += 1
+        self.cut = next_cut
+        return chunk
+
+    def ready_chunks(self, audio, final=False):
+        """Return the chunks that can be planned from the audio received so far
+
+        audio is indexed from the start of the recording but only has to hold the samples from
+        cut - overlap on, since nothing earlier is read again; final=True means no more will arrive.
+        """
+        if self.done:
+            return []
+
+        # Until the end is known, a cut also needs its overlap and the whole search window available
+        margin = 0 if final else self.overlap
+        chunks = []
+        while audio.num_samples - self.cut > self.target + self.search + margin:
+            desired = self.cut + self.target
+            next_cut = _quietest_sample(audio, max(self.cut + 1, desired - self.search), desired + self.search,
+                                        self.frame_seconds, self.min_silence_seconds)
+            chunks.append(self._chunk(next_cut, audio.num_samples, last=False))
+
+        if final:
+            chunks.append(self._chunk(audio.num_samples, audio.num_samples, last=True))
+            self.done = True
+        return chunks
+
+def plan_chunks(audio, target_seconds=180, search_seconds=15, overlap_seconds=1.0,
+                frame_seconds=0.03, min_silence_seconds=0.3):
+    """Plan chunks of roughly target_seconds that start and end in silence (see ChunkPlanner)"""
+    planner = ChunkPlanner(audio.sample_rate, target_seconds, search_seconds, overlap_seconds,
+                           frame_seconds, min_silence_seconds)
+    return planner.ready_chunks(audio, final=True)
+
+def _normalize_text(text):
+    return " ".join(text.lower().split())
+
+class SegmentStitcher:
+    """Merges per-chunk segments (timestamps relative to the chunk) into one timeline
+
+    A segment belongs to the chunk whose keep range contains its midpoint, which drops the
+    copies transcribed twice inside overlaps. Identical text repeated across a seam is also
+    collapsed. Chunks must be added in index order.
+    """
+
+    def __init__(self, duplicate_gap=0.5):
+        self.duplicate_gap = duplicate_gap
+        self.stitched = []
+        self.settled = 0
+
+    def add(self, chunk, segments):
+        """Stitch one chunk and return the segments that can no longer change
+
+        The newest segment is held back, since a repeat at the start of the next chunk may
+        still extend its end.
+        """
+        for seg in segments:
+            start = seg.get("start", 0) + chunk.offset
+            end = seg.get("end", 0) + chunk.offset
+            midpoint = (start + end) / 2
+
+            if midpoint < chunk.keep_start or midpoint >= chunk.keep_end:
+                continue
+
+            if self.stitched:
+                previous = self.stitched[-1]
+                if (start < previous["end"] + self.duplicate_gap and
+                        _normalize_text(seg["text"]) == _normalize_text(previous["text"])):
+                    previous["end"] = max(previous["end"], end)
+                    continue
+
+            self.stitched.append({**seg, "start": start, "end": end})
+
+        return self._take(len(self.stitched) - 1)
+
+    def finish(self):
+        """Return the segments still held back once the last chunk has been added"""
+        return self._take(len(self.stitched))
+
+    def _take(self, upto):
+        if upto <= self.settled:
+            return []
+        settled = self.stitched[self.settled:upto]
+        self.settled = upto
+        return settled
+
+def stitch_segments(chunk_results, duplicate_gap=0.5):
+    """Merge per-chunk segments into one timeline (see SegmentStitcher)
+
+    chunk_results is an iterable of (chunk, segments) in any order.
+    """
+    stitcher = SegmentStitcher(duplicate_gap)
+    for chunk, segments in sorted(chunk_results, key=lambda item: item[0].index):
+        stitcher.add(chunk, segments)
+    return stitcher.stitched
@@ -0,0 +1,262 @@
+"""Batch mode: run a whole lecture series through extract -> transcribe -> translate
+
+Videos are kept in a persistent job queue (batch_queue.sqlite in the project directory) and
+every stage has its own pool, so video N+1 extracts while video N transcribes and video N-1
+translates. Each stage runs the existing stage script; their STATUS/PROGRESS lines are passed
+through tagged with the job id, video name and stage.
+
+    python batch_scheduler.py --job <job_file|->
+    python batch_scheduler.py --list <project_dir>
+"""
+import collections
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from job_queue import STAGES, JobQueue
+from stages import read_job
+
+PYTHON_DIR = os.path.dirname(os.path.abspath(__file__))
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4v")
+
+# Extraction is I/O bound, transcription saturates the CPU, translation waits on the network
+DEFAULT_POOLS = {"extract": 2, "transcribe": 1, "translate": 2}
+
+QUEUE_FILE = "batch_queue.sqlite"
+# Lines of a stage's stderr kept for the error of a job whose stage crashed without reporting one
+STDERR_TAIL_LINES = 20
+
+_print_lock = threading.Lock()
+
+def emit(kind, data):
+    with _print_lock:
+        print(f"{kind}:{json.dumps(data, ensure_ascii=False)}", flush=True)
+
+def log_status(status, message, **tags):
+    emit("STATUS", {"type": "status", "status": status, "message": message, **tags})
+
+def job_files(job):
+    """The per-video files, named like the single-video workflow names them"""
+    output_dir = job["output_dir"]
+    return {
+        "audio": os.path.join(output_dir, "audio.wav"),
+        "transcription": os.path.join(output_dir, "audio_segments.json"),
+        "translation": os.path.join(output_dir, "segments.json")
+    }
+
+def list_videos(folder):
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(VIDEO_EXTENSIONS) and os.path.isfile(os.path.join(folder, name))
+    )
+
+class BatchScheduler:
+    def __init__(self, queue, settings):
+        self.queue = queue
+        self.transcription = settings.get("transcription", {})
+        self.translation = settings.get("translation", {})
+        self.pools = {**DEFAULT_POOLS, **settings.get("pools", {})}
+
+        # The API key is never stored in the queue, so the translate pool only starts when one is
+        # given; without it jobs stay pending at the translate stage for a later run
+        self.stages = STAGES if self.translation.get("apiKey") else STAGES[:-1]
+        self.stop = threading.Event()
+
+    def next_stage(self, stage):
+        index = STAGES.index(stage)
+        return STAGES[index + 1] if index + 1 < len(STAGES) else None
+
+    def stage_command(self, stage, job):
+        """Return (argv, stdin job document or None) for one stage of one job"""
+        files = job_files(job)
+        if stage == "extract":
+            return [os.path.join(PYTHON_DIR, "1_extract_audio.py"), job["video_path"], files["audio"], "auto"], None
+
+        if stage == "transcribe":
+            t = self.transcription
+            return [os.path.join(PYTHON_DIR, "2_transcribe_audio.py"), "--job", "-"], {
+                "audioPath": files["audio"],
+                "outputPath": files["transcription"],
+                "corrections": t.get("corrections"),
+                "correctionsPath": t.get("correctionsPath"),
+                "language": t.get("language", "he"),
+                "modelSize": t.get("modelSize", "medium"),
+                "backend": t.get("backend", "whisper"),
+                "chunkSeconds": t.get("chunkSeconds", "auto"),
+                "memoryBudgetMb": t.get("memoryBudgetMb"),
+                "overlapSeconds": t.get("overlapSeconds", 1.0),
+                "workers": t.get("workers", 1),
+                "resume": True
+            }
+
+        t = self.translation
+        return [os.path.join(PYTHON_DIR, "3_translate_text.py"), "--job", "-"], {
+            "inputPath": files["transcription"],
+            "outputPath": files["translation"],
+            "apiKey": t["apiKey"],
+            "systemPrompt": t.get("systemPrompt", ""),
+            "sourceLanguage": t.get("sourceLanguage", "he"),
+            "targetLanguage": t.get("targetLanguage", "en"),
+            "model": t.get("model", "gpt-4"),
+            "concurrency": t.get("concurrency", 8),
+            "batchSize": t.get("batchSize", 10),
+            "resume": True
+        }
+
+    def run_stage(self, stage, job):
+        """Run one stage script for a job, relaying its output; returns an error message or None"""
+        argv, document = self.stage_command(stage, job)
+        tags = {"job": job["id"], "video": os.path.basename(job["video_path"]), "stage": stage}
+        error = None
+
+        process = subprocess.Popen(
+            [sys.executable] + argv,
+            stdin=subprocess.PIPE if document else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"}
+        )
+        # Drained on its own thread so a chatty stderr can't block the stage while stdout is read
+        stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_tail.extend(line.rstrip() for line in process.stderr if line.strip()), daemon=True
+        )
+        stderr_reader.start()
+
+        if document:
+            process.stdin.write(json.dumps(document) + "\n")
+            process.stdin.close()
+
+        for line in process.stdout:
+            line = line.strip()
+            kind, _, payload = line.partition(":")
+            if kind not in ("STATUS", "PROGRESS"):
+                continue
+            try:
+                data = json.loads(payload)
+            except json.JSONDecodeError:
+                continue
+            if data.get("status") == "error":
+                error = data.get("message")
+            emit(kind, {**data, **tags})
+
+        process.wait()
+        stderr_reader.join()
+        if process.returncode != 0:
+            # A crash before the first STATUS line (import error, traceback) only shows on stderr
+            return error or "\n".join(stderr_tail) or f"{stage} exited with code {process.returncode}"
+        return None
+
+    def pool_worker(self, stage):
+        while not self.stop.is_set():
+            job = self.queue.claim(stage)
+            if job is None:
+                # Nothing left that could still reach this stage
+                if self.queue.active_through(stage) == 0:
+                    return
+                self.stop.wait(0.5)
+                continue
+
+            tags = {"job": job["id"], "video": os.path.basename(job["video_path"]), "stage": stage}
+            log_status("info", f"Starting {stage}", **tags)
+            os.makedirs(job["output_dir"], exist_ok=True)
+
+            try:
+                error = self.run_stage(stage, job)
+            except Exception as e:
+                error = str(e)
+
+            if error:
+                self.queue.fail(job["id"], error)
+                log_status("error", f"{stage} failed: {error}", **tags)
+            else:
+                next_stage = self.next_stage(stage)
+                self.queue.advance(job["id"], next_stage)
+                if next_stage is None:
+                    log_status("success", "Job completed", **tags)
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.pool_worker, args=(stage,), daemon=True)
+            for stage in self.stages
+            for _ in range(max(1, self.pools.get(stage, 1)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+def add_videos(queue, project_dir, videos):
+    """Queue new videos, each with its own output directory under <project>/batch"""
+    used = {job["output_dir"] for job in queue.jobs()}
+    added = 0
+    for video in videos:
+        stem = os.path.splitext(os.path.basename(video))[0]
+        output_dir = os.path.join(project_dir, "batch", stem)
+        suffix = 2
+        while output_dir in used:
+            output_dir = os.path.join(project_dir, "batch", f"{stem}-{suffix}")
+            suffix += 1
+        if queue.add(video, output_dir):
+            used.add(output_dir)
+            added += 1
+    return added
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--list":
+        queue = JobQueue(os.path.join(sys.argv[2], QUEUE_FILE))
+        print(json.dumps(queue.jobs(), ensure_ascii=False))
+        queue.close()
+        return
+
+    if len(sys.argv) != 3 or sys.argv[1] != "--job":
+        log_status("error", "Usage: python batch_scheduler.py --job <job_file|->")
+        log_status("error", "   or: python batch_scheduler.py --list <project_dir>")
+        sys.exit(1)
+
+    try:
+        settings = read_job(sys.argv[2])
+    except (OSError, ValueError) as e:
+        log_status("error", f"Could not read job document: {str(e)}")
+        sys.exit(1)
+
+    project_dir = settings["projectDir"]
+    os.makedirs(project_dir, exist_ok=True)
+    queue = JobQueue(os.path.join(project_dir, QUEUE_FILE))
+
+    videos = list(settings.get("videos", []))
+    if settings.get("folder"):
+        videos += list_videos(settings["folder"])
+    missing = [video for video in videos if not os.path.exists(video)]
+    for video in missing:
+        log_status("warning", f"Skipping missing video: {video}")
+
+    added = add_videos(queue, project_dir, [video for video in videos if video not in missing])
+    recovered = queue.recover()
+    retried = queue.retry_failed() if settings.get("retryFailed") else 0
+    log_status("info", f"Batch queue: {added} videos added, {recovered} interrupted jobs resumed, {retried} failed jobs retried")
+
+    scheduler = BatchScheduler(queue, settings)
+    if len(scheduler.stages) < len(STAGES):
+        log_status("info", "No API key provided - translation jobs will wait in the queue")
+
+    started = time.time()
+    scheduler.run()
+
+    jobs = queue.jobs()
+    queue.close()
+    done = sum(1 for job in jobs if job["state"] == "done")
+    failed = sum(1 for job in jobs if job["state"] == "failed")
+    waiting = len(jobs) - done - failed
+
+    summary = f"Batch finished in {(time.time() - started) / 60:.1f} minutes: {done} done, {failed} failed, {waiting} waiting"
+    log_status("warning" if failed else "success", summary)
+
+if __name__ == "__main__":
+    main()
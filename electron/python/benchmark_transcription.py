@@ -0,0 +1,245 @@
+"""Transcription benchmark: real-time factor, load time, per-chunk decode time and peak memory
+
+Sweeps backends x model sizes x chunk lengths x thread counts x worker counts over one audio file and
+writes a JSON report. Every configuration runs in a fresh Python process so model caches,
+allocator state and thread pools of one run can't flatter the next.
+
+    python benchmark_transcription.py --models tiny,base --chunk-seconds 60,180 --threads 2,4
+    python benchmark_transcription.py --backends whisper,faster-whisper --models small
+    python benchmark_transcription.py --audio lecture.wav --compare previous-report.json
+
+Without --audio a deterministic synthetic 16 kHz WAV is generated, which is enough to compare
+decode speed between commits; use a real recording to compare transcription behaviour.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+
+import numpy as np
+
+PYTHON_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_RATE = 16000
+
+def generate_audio(path, seconds, seed=0):
+    """Write a reproducible mono 16 kHz WAV of tone bursts separated by pauses"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+    pos = 0
+    while pos < len(samples):
+        burst = int(rng.uniform(1.5, 6.0) * SAMPLE_RATE)
+        pause = int(rng.uniform(0.3, 1.2) * SAMPLE_RATE)
+        t = np.arange(min(burst, len(samples) - pos)) / SAMPLE_RATE
+        freq = rng.uniform(120, 300)
+        # A few harmonics with a slow amplitude envelope, loosely voice-like
+        tone = sum(np.sin(2 * np.pi * freq * k * t) / k for k in range(1, 5))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t)
+        samples[pos:pos + len(t)] = 0.2 * tone * envelope
+        pos += burst + pause
+
+    samples += rng.normal(0, 0.003, len(samples)).astype(np.float32)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of its largest child (pool workers), in MB"""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+def run_one(config):
+    """Transcribe once with the given configuration and return its measurements"""
+    sys.path.insert(0, PYTHON_DIR)
+    from stages import load_transcriber
+
+    transcriber = load_transcriber()
+    threads = config["threads"]
+    # Each engine has its own thread pool: torch's for whisper, CTranslate2's cpu_threads for faster-whisper
+    if config["backend"] == "whisper":
+        transcriber.set_torch_threads(threads)
+
+    def load_model(model_size, backend):
+        return transcriber.load_model(model_size, backend, threads)
+
+    stats = {}
+    started = time.perf_counter()
+    transcriber.transcribe_audio(
+        config["audio"],
+        config["output"],
+        language=config["language"],
+        model_size=config["model"],
+        chunk_seconds=config["chunk_seconds"],
+        workers=config["workers"],
+        model_loader=load_model,
+        stats=stats,
+        use_cache=False,
+        backend=config["backend"]
+    )
+    total = time.perf_counter() - started
+
+    own_rss, children_rss = peak_rss_mb()
+    decode_seconds = [c["decode_seconds"] for c in stats["chunks"]]
+    return {
+        "duration": stats["duration"],
+        "total_seconds": round(total, 3),
+        "load_seconds": round(stats["load_seconds"], 3),
+        "rtf": round(total / stats["duration"], 4),
+        "segments": stats["segments"],
+        "segments_per_second": round(stats["segments"] / total, 3),
+        "chunks": [dict(c, decode_seconds=round(c["decode_seconds"], 3)) for c in stats["chunks"]],
+        "mean_chunk_decode_seconds": round(sum(decode_seconds) / len(decode_seconds), 3) if decode_seconds else None,
+        "peak_rss_mb": own_rss,
+        "peak_worker_rss_mb": children_rss
+    }
+
+def run_isolated(config):
+    """Run one configuration in a fresh interpreter and return its measurements"""
+    env = dict(os.environ)
+    # Pin the native thread pools before torch is imported in the child
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        env[var] = str(config["threads"])
+
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-one", json.dumps(config)],
+        capture_output=True, text=True, env=env
+    )
+
+    result = None
+    error = None
+    for line in process.stdout.splitlines():
+        if line.startswith("RESULT:"):
+            result = json.loads(line[7:])
+        elif line.startswith("STATUS:"):
+            status = json.loads(line[7:])
+            if status.get("status") == "error":
+                error = status.get("message")
+
+    if result is None:
+        raise RuntimeError(error or process.stderr.strip()[-500:] or f"exited with code {process.returncode}")
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PYTHON_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def config_key(run):
+    # Reports from before backends were benchmarked all used whisper
+    return (run.get("backend", "whisper"), run["model"], run["chunk_seconds"], run["threads"], run["workers"])
+
+def describe(run):
+    return f"{run.get('backend', 'whisper'):>14} {run['model']:>8} chunk={run['chunk_seconds']:>4}s threads={run['threads']:>2} workers={run['workers']}"
+
+def print_comparison(report, previous):
+    """Print RTF, load time and peak memory deltas against an earlier report"""
+    before = {config_key(run): run for run in previous["runs"] if "rtf" in run}
+    print(f"\nCompared with {previous.get('commit') or 'previous report'} ({previous.get('created')}):")
+
+    for run in report["runs"]:
+        old = before.get(config_key(run))
+        if "rtf" not in run or old is None:
+            continue
+        rtf_change = (run["rtf"] - old["rtf"]) / old["rtf"] * 100
+        load_change = run["load_seconds"] - old["load_seconds"]
+        line = f"  {describe(run)}  RTF {old['rtf']:.3f} -> {run['rtf']:.3f} ({rtf_change:+.1f}%)  load {load_change:+.2f}s"
+        if run.get("peak_rss_mb") is not None and old.get("peak_rss_mb") is not None:
+            line += f"  RSS {run['peak_rss_mb'] - old['peak_rss_mb']:+.0f} MB"
+        print(line)
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcription speed and memory")
+    parser.add_argument("--audio", help="WAV file to transcribe (default: generated synthetic audio)")
+    parser.add_argument("--minutes", type=float, default=3.0, help="Length of the generated audio")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated audio")
+    parser.add_argument("--backends", default="whisper", help="Comma-separated transcription backends")
+    parser.add_argument("--models", default="tiny", help="Comma-separated model sizes")
+    parser.add_argument("--chunk-seconds", default="180", help="Comma-separated chunk lengths")
+    parser.add_argument("--threads", default=str(os.cpu_count() or 1), help="Comma-separated thread counts (torch threads for whisper, cpu_threads for faster-whisper)")
+    parser.add_argument("--workers", default="1", help="Comma-separated parallel worker counts")
+    parser.add_argument("--language", default="he")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per configuration; the fastest is kept")
+    parser.add_argument("--output", default="transcription-benchmark.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Earlier report to print deltas against")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Child mode: keep the stage's STATUS/PROGRESS lines, end with one RESULT line
+        result = run_one(json.loads(args.run_one))
+        print(f"RESULT:{json.dumps(result)}", flush=True)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="slider-benchmark-") as work_dir:
+        audio_path = args.audio
+        if not audio_path:
+            audio_path = os.path.join(work_dir, "synthetic.wav")
+            generate_audio(audio_path, args.minutes * 60, args.seed)
+
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "audio": os.path.abspath(args.audio) if args.audio else f"synthetic:{args.minutes}min:seed{args.seed}",
+            "runs": []
+        }
+
+        sweep = itertools.product(
+            parse_list(args.backends),
+            parse_list(args.models),
+            parse_list(args.chunk_seconds, int),
+            parse_list(args.threads, int),
+            parse_list(args.workers, int)
+        )
+        for backend, model, chunk_seconds, threads, workers in sweep:
+            run = {"backend": backend, "model": model, "chunk_seconds": chunk_seconds, "threads": threads, "workers": workers}
+            config = dict(run, audio=audio_path, output=os.path.join(work_dir, "segments.json"), language=args.language)
+
+            try:
+                attempts = [run_isolated(config) for _ in range(max(1, args.repeat))]
+                run.update(min(attempts, key=lambda a: a["total_seconds"]))
+                print(f"{describe(run)}  RTF {run['rtf']:.3f}  load {run['load_seconds']:.2f}s  "
+                      f"peak RSS {run['peak_rss_mb']} MB", flush=True)
+            except Exception as e:
+                run["error"] = str(e)
+                print(f"{describe(run)}  failed: {str(e)}", flush=True)
+
+            report["runs"].append(run)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import json
+import os
+
+class CheckpointJournal:
+    """Append-only JSONL journal of completed work units, kept next to the output file
+
+    The first line records a fingerprint of the job's inputs and settings; a journal whose
+    fingerprint doesn't match the current job is discarded rather than resumed.
+    """
+
+    def __init__(self, output_path, fingerprint):
+        self.path = f"{output_path}.journal.jsonl"
+        self.fingerprint = fingerprint
+        self.file = None
+
+    def _read_records(self):
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        if not lines:
+            return None
+
+        try:
+            header = json.loads(lines[0])
+        except json.JSONDecodeError:
+            return None
+        if header.get("fingerprint") != self.fingerprint:
+            return None
+
+        records = []
+        for line in lines[1:]:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A crash mid-write leaves a partial last line; everything before it is valid
+                break
+        return records
+
+    def open(self, resume=False):
+        """Open the journal for appending and return the records of work already done"""
+        records = self._read_records() if resume else None
+
+        if records is None:
+            records = []
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.file.write(json.dumps({"fingerprint": self.fingerprint}, ensure_ascii=False) + "\n")
+            self.file.flush()
+        else:
+            self.file = open(self.path, "a", encoding="utf-8")
+
+        return records
+
+    def append(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def finish(self):
+        """The output file has been written - the journal is no longer needed"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from job_control import CANCELLED, JobControl
+from memory_budget import set_watermark
+from stages import load_transcriber
+
+# Per-process state, set up once by the pool initializer
+_transcriber = None
+_model = None
+_audio = None
+_language = None
+_cancelled = None
+_running = None
+
+def threads_per_worker(workers):
+    """Split the machine's cores evenly so workers don't oversubscribe each other"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+def _init_worker(audio_path, model_size, language, threads, backend, watermark_mb, cancelled, running):
+    global _transcriber, _model, _audio, _language, _cancelled, _running
+
+    # Workers talk to the parent only through return values; keep their stdout off the protocol
+    sys.stdout = open(os.devnull, "w")
+    # Ctrl+C reaches the whole process group - the parent decides how to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _cancelled, _running = cancelled, running
+
+    _transcriber = load_transcriber()
+    _transcriber.set_torch_threads(threads)
+    _transcriber.warnings.filterwarnings("ignore", category=UserWarning)
+
+    _model = _transcriber.load_model(model_size, backend, threads)
+    _audio = _transcriber.load_audio(audio_path)
+    _language = language
+    set_watermark(watermark_mb)
+
+def _transcribe_chunk(chunk):
+    # Pause and cancel take effect between chunks; the chunk being decoded is always finished
+    _running.wait()
+    if _cancelled.is_set():
+        return chunk, None, CANCELLED, 0.0
+
+    started = time.perf_counter()
+    samples = _audio.window(chunk.start_sample, chunk.end_sample)
+    try:
+        segments = _transcriber.transcribe_chunk_with_retry(_model, samples, _language)
+        return chunk, segments, None, time.perf_counter() - started
+    except Exception as e:
+        return chunk, None, str(e), time.perf_counter() - started
+    finally:
+        del samples
+
+def transcribe_chunks_parallel(audio_path, chunks, model_size, language, workers, backend="whisper",
+                               watermark_mb=None, control=None):
+    """Transcribe chunks on a pool of processes, each holding its own model
+
+    Yields (chunk, segments, error, seconds) as chunks finish, which may be out of order -
+    the stitcher puts them back on the timeline. Each worker collects garbage only above
+    watermark_mb of resident memory. With a JobControl, workers pause before starting a
+    chunk, and once cancelled the chunks not yet started come back with error CANCELLED.
+    """
+    threads = threads_per_worker(workers)
+    # spawn keeps torch's thread pools and CUDA state out of the children
+    context = multiprocessing.get_context("spawn")
+    control = control or JobControl()
+    cancelled, running = control.share(context)
+
+    with context.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(audio_path, model_size, language, threads, backend, watermark_mb, cancelled, running)
+    ) as pool:
+        # Hand out one chunk at a time so a slow chunk doesn't hold a batch of others hostage
+        results = pool.imap_unordered(_transcribe_chunk, chunks, chunksize=1)
+        for _ in chunks:
+            # Wake up regularly to report pauses while the workers sit idle
+            while True:
+                try:
+                    result = results.next(timeout=0.5)
+                    break
+                except multiprocessing.TimeoutError:
+                    control.announce()
+            yield result
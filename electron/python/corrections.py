@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter, OrderedDict
+from segment_store import load_segments, save_segments
+
+# Compiled engines of this process, so a long-lived worker compiles each dictionary once.
+# Only the most recently used few are kept; an edited dictionary is a new entry every time.
+MAX_ENGINES = 4
+_engines = OrderedDict()
+
+def log_status(status, message):
+    status_data = {
+        "type": "status",
+        "status": status,
+        "message": message
+    }
+    print(f"STATUS:{json.dumps(status_data)}", flush=True)
+
+def iter_object_items(f, chunk_size=65536):
+    """Yield the (key, value) pairs of a top-level JSON object, reading the file in chunks
+
+    Big dictionaries are parsed incrementally instead of holding the whole document text
+    and a second full parse tree in memory at once.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {pos} of the current block")
+        pos += 1
+        return buf[pos - 1]
+
+    def decode_value():
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(buf) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    fill()
+    expect("{")
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == "}":
+        return
+
+    while True:
+        key = decode_value()
+        expect(":")
+        value = decode_value()
+        yield key, value
+        if expect(",}") == "}":
+            return
+
+def load_corrections(path):
+    """Load a {wrong: correct} corrections dictionary from a JSON file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(iter_object_items(f))
+
+def dictionary_hash(corrections):
+    payload = json.dumps(corrections, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def build_pattern(words):
+    """Build a trie-shaped regex that matches any of the words, preferring the longest
+
+    Shared prefixes are factored out, so the regex engine walks one trie instead of trying
+    thousands of alternatives at every position.
+    """
+    trie = {}
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True  # End-of-word marker
+
+    def render(node):
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ends here but longer ones continue - the greedy optional tries the longer match first
+        return f"(?:{body})?" if "" in node else body
+
+    return render(trie)
+
+class CorrectionsEngine:
+    """Applies a whole corrections dictionary in one left-to-right pass per text"""
+
+    def __init__(self, corrections, pattern_source):
+        self.corrections = corrections
+        self.pattern = re.compile(pattern_source) if pattern_source else None
+        self.counts = Counter()
+
+    def _replace(self, match):
+        wrong = match.group(0)
+        self.counts[wrong] += 1
+        return self.corrections[wrong]
+
+    def apply(self, text):
+        if not self.pattern:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def summary(self, top=10):
+        """One-line per-rule report of the most frequently applied corrections"""
+        total = sum(self.counts.values())
+        if not total:
+            return "Applied 0 text corrections to segments"
+
+        most_common = ", ".join(
+            f"'{wrong}' → '{self.corrections[wrong]}' ×{count}" for wrong, count in self.counts.most_common(top)
+        )
+        remaining = len(self.counts) - top
+        more = f" and {remaining} more rules" if remaining > 0 else ""
+        return f"Applied {total} text corrections using {len(self.counts)} rules: {most_common}{more}"
+
+def load_engine(corrections, cache_dir=None):
+    """Return a compiled engine for the dictionary, reusing cached patterns by dictionary hash"""
+    key = dictionary_hash(corrections)
+    if key in _engines:
+        _engines.move_to_end(key)
+        engine = _engines[key]
+        engine.counts = Counter()
+        return engine
+
+    cache_path = os.path.join(cache_dir, f"corrections-{key[:16]}.regex") if cache_dir else None
+    pattern_source = None
+
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            pattern_source = f.read()
+
+    if pattern_source is None:
+        pattern_source = build_pattern(corrections.keys())
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                f.write(pattern_source)
+
+    engine = CorrectionsEngine(corrections, pattern_source)
+    _engines[key] = engine
+    while len(_engines) > MAX_ENGINES:
+        _engines.popitem(last=False)
+    return engine
+
+def apply_corrections(segments, engine):
+    """Correct the text of every segment in place"""
+    for seg in segments:
+        seg["text"] = engine.apply(seg.get("text", ""))
+    return segments
+
+def main():
+    """Re-apply a corrections dictionary to an existing segments file without re-transcribing"""
+    if len(sys.argv) < 3:
+        log_status("error", "Usage: python corrections.py <segments_file> <corrections_file> [output_file]")
+        sys.exit(1)
+
+    segments_path = sys.argv[1]
+    corrections_path = sys.argv[2]
+    output_path = sys.argv[3] if len(sys.argv) > 3 else segments_path
+
+    try:
+        segments = load_segments(segments_path)
+        corrections = load_corrections(corrections_path)
+
+        if not isinstance(segments, list):
+            log_status("error", "Segments file must contain a JSON array of segments")
+            sys.exit(1)
+
+        log_status("info", f"Applying {len(corrections)} text corrections to {len(segments)} segments...")
+
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), ".cache")
+        engine = load_engine(corrections, cache_dir)
+        apply_corrections(segments, engine)
+
+        save_segments(output_path, segments)
+
+        log_status("success", engine.summary())
+
+    except Exception as e:
+        log_status("error", f"Error applying corrections: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Cooperative pause, resume and cancel for long-running stages
+
+A JobControl is checked at natural boundaries (before each transcription chunk, before each
+translation request), so work in flight is finished and journaled instead of thrown away.
+Commands arrive on stdin after the job document - one per line, either a bare word or
+{"command": "pause"|"resume"|"cancel", "id": <job id>} - or as signals: SIGINT/SIGTERM cancel
+(a second one terminates right away), SIGUSR1 pauses and SIGUSR2 resumes where available.
+
+A cancelled stage saves what it has finished, keeps its checkpoint journal for a later
+resume, and raises JobCancelled.
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+COMMANDS = ("pause", "resume", "cancel")
+CANCELLED = "cancelled"
+# What a shell reports for a process stopped with Ctrl+C
+CANCELLED_EXIT_CODE = 130
+
+class JobCancelled(Exception):
+    """Raised once a cancelled job has flushed its partial results"""
+
+class JobControl:
+    """Pause/cancel state shared between the command listener and the working thread
+
+    Pauses and cancellations only take effect where the working thread calls wait().
+    log(status, message) is only called from the working thread, announcing pauses and resumes.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or (lambda status, message: None)
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._shared = []
+        self._announced_pause = False
+        # Reentrant: signal handlers apply commands on the thread that may already hold it
+        self.lock = threading.RLock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def apply(self, command):
+        """Apply a command from COMMANDS; returns False for anything else"""
+        if command not in COMMANDS:
+            return False
+        with self.lock:
+            if command == "cancel":
+                self._cancelled.set()
+                # Wake anything waiting in a pause so it can see the cancellation
+                self._running.set()
+            elif command == "pause" and not self.cancelled:
+                self._running.clear()
+            elif command == "resume":
+                self._running.set()
+            for cancelled, running in self._shared:
+                _mirror(cancelled, self._cancelled)
+                _mirror(running, self._running)
+        return True
+
+    def cancel(self):
+        self.apply("cancel")
+
+    def share(self, context):
+        """(cancelled, running) events for child processes of a multiprocessing context, kept in sync"""
+        with self.lock:
+            events = (context.Event(), context.Event())
+            _mirror(events[0], self._cancelled)
+            _mirror(events[1], self._running)
+            self._shared.append(events)
+        return events
+
+    def announce(self):
+        """Report a pause or resume that happened since the last call"""
+        if self.paused and not self._announced_pause:
+            self._announced_pause = True
+            self.log("paused", "Paused - work in progress finishes first, send resume to continue")
+        elif not self.paused and self._announced_pause:
+            self._announced_pause = False
+            if not self.cancelled:
+                self.log("info", "Resumed")
+
+    def wait(self):
+        """Block while paused; returns False once the job is cancelled"""
+        self.announce()
+        while not self._running.wait(0.5):
+            pass
+        self.announce()
+        return not self.cancelled
+
+    async def wait_async(self):
+        """wait() for coroutines - polls instead of blocking the event loop"""
+        self.announce()
+        while self.paused:
+            await asyncio.sleep(0.2)
+        self.announce()
+        return not self.cancelled
+
+def _mirror(target, source):
+    if source.is_set():
+        target.set()
+    else:
+        target.clear()
+
+def parse_command(line):
+    """(command, job id or None) from a control line, or None if the line is not a command"""
+    line = line.strip()
+    if line in COMMANDS:
+        return line, None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and data.get("command") in COMMANDS:
+        return data["command"], data.get("id")
+    return None
+
+def listen_stdin(control):
+    """Apply control commands from the rest of stdin on a daemon thread (the job line is already read)
+
+    Anything that isn't a command is ignored; stdout belongs to the working thread.
+    """
+    def read():
+        for line in sys.stdin:
+            parsed = parse_command(line)
+            if parsed:
+                control.apply(parsed[0])
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    return thread
+
+def handle_signals(get_control):
+    """Map signals onto the current job's control; get_control() returns None between jobs
+
+    The first SIGINT/SIGTERM cancels the running job. Another one, or one arriving between
+    jobs, terminates the process the way the signal normally would.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def stop(signum, frame):
+        control = get_control()
+        if control is None or control.cancelled:
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+            # Windows has no default action to fall back on
+            time.sleep(1)
+            sys.exit(CANCELLED_EXIT_CODE)
+        control.cancel()
+
+    def command(name):
+        def handler(signum, frame):
+            control = get_control()
+            if control is not None:
+                control.apply(name)
+        return handler
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, command("pause"))
+        signal.signal(signal.SIGUSR2, command("resume"))
+
+def start(log=None, stdin=True):
+    """A JobControl for a one-shot stage script, listening to signals and (optionally) stdin"""
+    control = JobControl(log)
+    handle_signals(lambda: control)
+    if stdin:
+        listen_stdin(control)
+    return control
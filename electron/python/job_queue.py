@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+import time
+
+STAGES = ["extract", "transcribe", "translate"]
+
+class JobQueue:
+    """Persistent multi-video job queue, one SQLite file in the project directory
+
+    Every job sits in one stage (extract, transcribe, translate or done) with a state of
+    pending, running or failed. Jobs that were running when the app quit are put back to
+    pending on open, and the stage scripts' own checkpoints let them resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # Stage pools share one connection; the lock serialises them
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, video_path TEXT NOT NULL UNIQUE, output_dir TEXT NOT NULL, "
+            "stage TEXT NOT NULL, state TEXT NOT NULL, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_stage_state ON jobs (stage, state)")
+        self.conn.commit()
+
+    def add(self, video_path, output_dir):
+        """Queue a video unless it is already queued; returns True if it was added"""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (video_path, output_dir, stage, state, created, updated) "
+                "VALUES (?, ?, ?, 'pending', ?, ?)",
+                (os.path.abspath(video_path), output_dir, STAGES[0], now, now)
+            )
+            self.conn.commit()
+            return cursor.rowcount > 0
+
+    def recover(self):
+        """Put jobs interrupted by a crash or app restart back in line; returns how many"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = 'pending', updated = ? WHERE state = 'running'", (time.time(),)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def retry_failed(self):
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = 'pending', error = NULL, updated = ? WHERE state = 'failed'", (time.time(),)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def claim(self, stage):
+        """Mark the oldest pending job of a stage as running and return it, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE stage = ? AND state = 'pending' ORDER BY id LIMIT 1", (stage,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE jobs SET state = 'running', updated = ? WHERE id = ?", (time.time(), row["id"]))
+            self.conn.commit()
+            return dict(row, state="running")
+
+    def advance(self, job_id, next_stage):
+        """Move a finished job on to next_stage, or to done when next_stage is None"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET stage = ?, state = ?, error = NULL, updated = ? WHERE id = ?",
+                (next_stage or "done", "pending" if next_stage else "done", time.time(), job_id)
+            )
+            self.conn.commit()
+
+    def fail(self, job_id, error):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, updated = ? WHERE id = ?", (error, time.time(), job_id)
+            )
+            self.conn.commit()
+
+    def active_through(self, stage):
+        """Number of pending or running jobs at this stage or an earlier one"""
+        earlier = STAGES[:STAGES.index(stage) + 1]
+        placeholders = ",".join("?" * len(earlier))
+        with self.lock:
+            (count,) = self.conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'running') AND stage IN ({placeholders})", earlier
+            ).fetchone()
+            return count
+
+    def jobs(self):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,197 @@
+"""Fit transcription chunk length and worker count into a memory budget
+
+The budget defaults to what the process already uses plus most of the memory the OS reports
+as available at startup. plan_transcription() picks the number of pool workers and the chunk
+length that fit it, so a big server runs long chunks on many workers and a small laptop falls
+back to short chunks on one. During the run, collect_if_needed() only collects garbage once
+resident memory passes the watermark instead of after every chunk.
+"""
+import gc
+import os
+import sys
+
+# Resident size of a loaded model on CPU, in MB (GPU runs keep the weights in VRAM instead)
+MODEL_FOOTPRINT_MB = {
+    "whisper": {"tiny": 450, "base": 600, "small": 1200, "medium": 2800, "large": 5200},
+    "faster-whisper": {"tiny": 200, "base": 300, "small": 600, "medium": 1300, "large": 2400}
+}
+# Python, torch and the audio memory map in a freshly spawned pool worker
+WORKER_OVERHEAD_MB = 350
+# Decode working set per second of chunk audio: float32 samples, padded copy, STFT and mel spectrogram
+CHUNK_MB_PER_SECOND = 0.5
+
+# Share of the available memory the default budget may take
+DEFAULT_BUDGET_FRACTION = 0.75
+# Collect once resident memory passes this share of a process's budget
+WATERMARK_FRACTION = 0.85
+
+# Chunk lengths are picked from fixed steps so small changes in free memory don't change the
+# chunk boundaries (and with them the cache key and resume journal)
+CHUNK_STEPS = (60, 120, 180, 300, 450, 600, 900, 1200)
+MAX_AUTO_WORKERS = 8
+
+def available_mb():
+    """Memory the OS can hand out without swapping, in MB, or None if it can't be determined"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    if sys.platform == "win32":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("length", ctypes.c_ulong), ("load", ctypes.c_ulong),
+                        ("total_phys", ctypes.c_ulonglong), ("avail_phys", ctypes.c_ulonglong),
+                        ("total_page", ctypes.c_ulonglong), ("avail_page", ctypes.c_ulonglong),
+                        ("total_virtual", ctypes.c_ulonglong), ("avail_virtual", ctypes.c_ulonglong),
+                        ("avail_extended", ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.length = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.avail_phys / (1024 * 1024)
+        return None
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def rss_mb():
+    """Current resident memory of this process in MB, or None if it can't be determined"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # macOS without psutil: only the peak is known (lifetime_peak_rss_mb), and a peak
+        # above the watermark would make collect_if_needed() collect after every chunk
+        return None
+
+def lifetime_peak_rss_mb():
+    """Highest resident memory of this process so far in MB, or None where getrusage is missing"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is bytes on macOS, KB elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def model_footprint_mb(backend, model_size):
+    sizes = MODEL_FOOTPRINT_MB.get(backend, MODEL_FOOTPRINT_MB["whisper"])
+    # Variants like "large-v3" or "medium.en" are sized like their family
+    family = next((name for name in sizes if model_size.startswith(name)), "medium")
+    return sizes[family]
+
+def _fit_chunk_seconds(memory_mb):
+    """Longest chunk step whose working set fits in memory_mb (the shortest step if none does)"""
+    fitting = [step for step in CHUNK_STEPS if step * CHUNK_MB_PER_SECOND <= memory_mb]
+    return fitting[-1] if fitting else CHUNK_STEPS[0]
+
+def plan_transcription(backend, model_size, duration=None, chunk_seconds="auto", workers=1,
+                       budget_mb=None, gpu=False):
+    """Pick chunk length and worker count for the budget
+
+    chunk_seconds and workers are either "auto" or explicit values; explicit worker counts
+    that don't fit the budget are lowered. Returns a dict with budget_mb, workers,
+    chunk_seconds, watermark_mb (per process) and notes explaining any adjustment.
+    """
+    notes = []
+    current = rss_mb() or 0
+    if budget_mb is None:
+        available = available_mb()
+        if available is None:
+            # Unknown machine: assume a modest laptop rather than an unlimited server
+            available = 4096
+            notes.append("Could not measure available memory; assuming 4 GB")
+        budget_mb = current + available * DEFAULT_BUDGET_FRACTION
+
+    model_mb = 0 if gpu else model_footprint_mb(backend, model_size)
+    minimum_chunk_mb = CHUNK_STEPS[0] * CHUNK_MB_PER_SECOND
+
+    # The parent keeps its own memory; each worker needs interpreter, model and one chunk
+    if gpu:
+        max_workers = 1
+    elif workers == "auto":
+        max_workers = max(1, min(MAX_AUTO_WORKERS, (os.cpu_count() or 1) // 2))
+    else:
+        max_workers = max(1, int(workers))
+
+    chosen = 1
+    for candidate in range(max_workers, 0, -1):
+        per_worker = (budget_mb - current) / candidate
+        if candidate == 1 or per_worker >= WORKER_OVERHEAD_MB + model_mb + minimum_chunk_mb:
+            chosen = candidate
+            break
+    if workers != "auto" and chosen < max_workers:
+        notes.append(f"Lowered workers from {max_workers} to {chosen} to stay within {budget_mb:.0f} MB")
+
+    if chosen > 1:
+        per_process = (budget_mb - current) / chosen
+        chunk_memory = per_process - WORKER_OVERHEAD_MB - model_mb
+    else:
+        per_process = budget_mb
+        chunk_memory = budget_mb - current - model_mb
+        if chunk_memory < minimum_chunk_mb:
+            notes.append(f"The {model_size} model leaves little room in {budget_mb:.0f} MB; consider a smaller model")
+
+    if chunk_seconds == "auto":
+        chunk_seconds = _fit_chunk_seconds(chunk_memory)
+        # Enough chunks for every worker to get one
+        if duration and chosen > 1:
+            chunk_seconds = min(chunk_seconds, max(CHUNK_STEPS[0], _step_at_most(duration / chosen)))
+    else:
+        chunk_seconds = int(chunk_seconds)
+
+    return {
+        "budget_mb": round(budget_mb),
+        "workers": chosen,
+        "chunk_seconds": chunk_seconds,
+        "watermark_mb": round(per_process * WATERMARK_FRACTION),
+        "notes": notes
+    }
+
+def _step_at_most(seconds):
+    fitting = [step for step in CHUNK_STEPS if step <= seconds]
+    return fitting[-1] if fitting else CHUNK_STEPS[0]
+
+# Per-process watermark, set by the transcription stage or a pool worker's initializer
+_watermark_mb = None
+collections = 0
+
+def set_watermark(watermark_mb):
+    global _watermark_mb
+    _watermark_mb = watermark_mb
+
+def collect_if_needed():
+    """Collect garbage (and release cached GPU memory) only above the watermark; returns whether it did"""
+    global collections
+    if _watermark_mb is None:
+        return False
+    current = rss_mb()
+    if current is None or current < _watermark_mb:
+        return False
+
+    gc.collect()
+    # Only touch torch if the stage already imported it
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    collections += 1
+    return True
@@ -0,0 +1,122 @@
+"""Report what this Python environment can run, without importing any heavy package
+
+Electron used to answer "is Whisper installed?" with `import whisper`, which loads all of torch
+and takes seconds. Packages are looked up here by import spec and installed metadata instead,
+so nothing is executed and the probe returns in milliseconds. The package report is cached per
+interpreter, keyed by its path and the modification times of its site-packages and other import
+directories (pip touches them on every install or uninstall). Tools on PATH are looked up every run.
+
+Prints one JSON object. --refresh ignores the cache.
+"""
+import importlib.metadata
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import sys
+from artifact_cache import default_cache_dir
+
+CACHE_FILE = "environment.json"
+CACHE_VERSION = 1
+
+# Import name -> distribution name, for the version lookup
+PACKAGES = {
+    "whisper": "openai-whisper",
+    "faster_whisper": "faster-whisper",
+    "torch": "torch",
+    "numpy": "numpy",
+    "openai": "openai",
+    "psutil": "psutil"
+}
+# Which packages each transcription backend (see transcription_backends) needs
+BACKEND_PACKAGES = {
+    "whisper": ("whisper", "torch", "numpy"),
+    "faster-whisper": ("faster_whisper", "numpy")
+}
+TOOLS = ("ffmpeg", "ffprobe", "py-spy")
+
+def search_directories():
+    """The venv plus every directory imports are searched in (site-packages, PYTHONPATH entries)"""
+    # sys.path[0] is this script's own directory
+    directories = [sys.prefix] + sys.path[1:]
+    return [directory for directory in dict.fromkeys(directories) if directory and os.path.isdir(directory)]
+
+def environment_key():
+    """Interpreter path plus search directory mtimes - changes whenever packages are installed or removed"""
+    return {
+        "version": CACHE_VERSION,
+        "executable": os.path.realpath(sys.executable),
+        "mtimes": {directory: os.stat(directory).st_mtime_ns for directory in search_directories()}
+    }
+
+def package_info(module, distribution):
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return {"installed": False, "version": None}
+    try:
+        version = importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return {"installed": True, "version": version}
+
+def probe_packages():
+    packages = {module: package_info(module, distribution) for module, distribution in PACKAGES.items()}
+    backends = [
+        name for name, required in BACKEND_PACKAGES.items()
+        if all(packages[module]["installed"] for module in required)
+    ]
+    return {
+        "python": {
+            "executable": sys.executable,
+            "version": platform.python_version(),
+            "prefix": sys.prefix,
+            "venv": sys.prefix != sys.base_prefix,
+            "path": sys.path[1:]
+        },
+        "packages": packages,
+        "backends": backends
+    }
+
+def read_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_cache(path, cache):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # A read-only data directory only costs the next probe a few milliseconds
+
+def probe_environment(cache_dir=None, refresh=False):
+    """The package report (cached) plus the tools found on PATH"""
+    path = os.path.join(cache_dir or default_cache_dir(), CACHE_FILE)
+    key = environment_key()
+    cache = read_cache(path)
+    entry = cache.get(key["executable"])
+
+    if not refresh and isinstance(entry, dict) and entry.get("key") == key:
+        report = dict(entry["report"], cached=True)
+    else:
+        report = probe_packages()
+        cache[key["executable"]] = {"key": key, "report": report}
+        write_cache(path, cache)
+        report = dict(report, cached=False)
+
+    report["tools"] = {tool: shutil.which(tool) for tool in TOOLS}
+    # Ready to run the pipeline: a transcription backend and ffmpeg for extraction
+    report["ready"] = bool(report["backends"]) and report["tools"]["ffmpeg"] is not None
+    return report
+
+if __name__ == "__main__":
+    print(json.dumps(probe_environment(refresh="--refresh" in sys.argv)), flush=True)
@@ -0,0 +1,522 @@
+"""Streaming extract -> transcribe -> translate pipeline for one video
+
+The three stages run concurrently, connected by bounded queues: ffmpeg decodes audio into
+memory (and the WAV file) while Whisper transcribes every chunk as soon as its audio is
+complete, and settled segments go on to the translator while later chunks are still being
+transcribed. Wall-clock time approaches the slowest stage instead of the sum of all three.
+
+Writes the same audio, transcription and translation files as the three stage scripts.
+"""
+import asyncio
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import warnings
+import wave
+
+import numpy as np
+
+from audio_chunks import SAMPLE_RATE, ChunkPlanner, SegmentStitcher
+from corrections import load_corrections, load_engine as load_corrections_engine
+from memory_budget import plan_transcription, set_watermark
+from segment_store import save_segments
+from stages import load_transcriber, read_job
+
+# One second of s16le mono audio per read from ffmpeg
+READ_BYTES = SAMPLE_RATE * 2
+
+# Stage-to-stage backpressure: chunks waiting for Whisper, segments waiting for translation
+CHUNK_QUEUE_SIZE = 2
+SEGMENT_QUEUE_SIZE = 200
+
+_DONE = object()
+
+def log_status(status, message, stage=None):
+    status_data = {
+        "type": "status",
+        "status": status,
+        "message": message
+    }
+    if stage:
+        status_data["stage"] = stage
+    print(f"STATUS:{json.dumps(status_data)}", flush=True)
+
+class GrowingAudio:
+    """Int16 audio that ffmpeg keeps appending to, indexed from the start of the recording
+
+    Reads like PcmAudio for the chunk planner. Samples before release() are dropped, so only
+    the audio the planner can still cut into is held, not the whole recording.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.buffer = np.zeros(sample_rate * 60, dtype=np.int16)
+        self.start = 0  # Recording sample held at buffer[0]
+        self.length = 0  # Samples received so far
+
+    @property
+    def num_samples(self):
+        return self.length
+
+    def append(self, samples):
+        held = self.length - self.start
+        needed = held + len(samples)
+        if needed > len(self.buffer):
+            grown = np.zeros(max(needed, len(self.buffer) * 2), dtype=np.int16)
+            grown[:held] = self.buffer[:held]
+            self.buffer = grown
+        self.buffer[held:needed] = samples
+        self.length += len(samples)
+
+    def release(self, before):
+        """Drop the samples before this one; the buffer keeps its size for the audio still to come"""
+        drop = min(before, self.length) - self.start
+        if drop <= 0:
+            return
+        held = self.length - self.start - drop
+        self.buffer[:held] = self.buffer[drop:drop + held]
+        self.start += drop
+
+    def window(self, start_sample, end_sample):
+        """Float32 copy of one window, like PcmAudio.window"""
+        if start_sample < self.start:
+            raise ValueError(f"Sample {start_sample} was already released (holding from {self.start})")
+        view = self.buffer[start_sample - self.start:min(end_sample, self.length) - self.start]
+        return view.astype(np.float32) / 32768.0
+
+class Pipeline:
+    def __init__(self, job):
+        self.job = job
+        self.error = None
+        self.abort = threading.Event()
+        self.lock = threading.Lock()
+
+        self.chunks = queue.Queue(maxsize=CHUNK_QUEUE_SIZE)
+        self.segments = queue.Queue(maxsize=SEGMENT_QUEUE_SIZE)
+
+        self.translate = bool(job.get("apiKey") and job.get("translationPath"))
+        self.duration = None
+        self.extracted_seconds = 0.0
+        self.transcribed_seconds = 0.0
+        self.transcribed = []
+        self.translated = 0
+        self.last_percent = -1
+
+    # Shared state
+
+    def fail(self, stage, error):
+        with self.lock:
+            if self.error is None:
+                self.error = f"{stage} failed: {error}"
+                log_status("error", self.error, stage)
+        self.abort.set()
+
+    def put(self, q, item):
+        """Blocking put that gives up when another stage has failed"""
+        while not self.abort.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q):
+        while not self.abort.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def report_progress(self):
+        """Overall progress is the mean of the three stages; translation counts only finished segments"""
+        with self.lock:
+            extract = min(1.0, self.extracted_seconds / self.duration) if self.duration else 0.0
+            transcribe = min(1.0, self.transcribed_seconds / self.duration) if self.duration else 0.0
+            stages = {"extract": int(extract * 100), "transcribe": int(transcribe * 100)}
+            fractions = [extract, transcribe]
+
+            if self.translate:
+                translate = transcribe * (self.translated / len(self.transcribed)) if self.transcribed else 0.0
+                stages["translate"] = int(translate * 100)
+                fractions.append(translate)
+
+            percent = int(sum(fractions) / len(fractions) * 100)
+            if percent == self.last_percent:
+                return
+            self.last_percent = percent
+
+        progress_data = {
+            "type": "progress",
+            "percent": percent,
+            "stages": stages
+        }
+        print(f"PROGRESS:{json.dumps(progress_data)}", flush=True)
+
+    # Stage 1: ffmpeg -> memory and WAV file, planned chunks -> transcriber
+
+    def extract(self):
+        job = self.job
+        # One model in this process; the duration isn't known yet, so only the chunk length is fitted
+        plan = plan_transcription(job.get("backend", "whisper"), job.get("modelSize", "medium"),
+                                  chunk_seconds=job.get("chunkSeconds", "auto"),
+                                  budget_mb=job.get("memoryBudgetMb"))
+        set_watermark(plan["watermark_mb"])
+        log_status("info", f"Memory budget {plan['budget_mb']} MB: {plan['chunk_seconds'] / 60:.1f} minute chunks", "extract")
+        planner = ChunkPlanner(
+            SAMPLE_RATE,
+            target_seconds=plan["chunk_seconds"],
+            overlap_seconds=job.get("overlapSeconds", 1.0)
+        )
+        audio = GrowingAudio()
+
+        command = [
+            "ffmpeg",
+            "-i", job["videoPath"],
+            "-vn",  # No video
+            "-acodec", "pcm_s16le",
+            "-ar", str(SAMPLE_RATE),
+            "-ac", "1",  # Mono
+            "-f", "s16le",
+            "-"
+        ]
+
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            self.fail("extract", "ffmpeg not found. Please install ffmpeg and add it to your PATH")
+            self.put(self.chunks, _DONE)
+            return
+
+        stderr_thread = threading.Thread(target=self._read_ffmpeg_log, args=(process,), daemon=True)
+        stderr_thread.start()
+
+        audio_dir = os.path.dirname(job["audioPath"])
+        if audio_dir:
+            os.makedirs(audio_dir, exist_ok=True)
+
+        try:
+            with wave.open(job["audioPath"], "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(SAMPLE_RATE)
+
+                pending = b""
+                while not self.abort.is_set():
+                    data = process.stdout.read(READ_BYTES)
+                    if not data:
+                        break
+                    wav.writeframes(data)
+
+                    # Keep whole samples only; an odd trailing byte waits for the next read
+                    data = pending + data
+                    usable = len(data) - len(data) % 2
+                    pending = data[usable:]
+                    audio.append(np.frombuffer(data[:usable], dtype="<i2"))
+
+                    with self.lock:
+                        self.extracted_seconds = audio.length / SAMPLE_RATE
+                    for chunk in planner.ready_chunks(audio):
+                        if not self._send_chunk(audio, chunk):
+                            break
+                    # The next chunk starts at the last cut minus its overlap; nothing before it is read again
+                    audio.release(planner.cut - planner.overlap)
+                    self.report_progress()
+
+            if self.abort.is_set():
+                process.kill()
+                return
+
+            process.wait()
+            stderr_thread.join()
+            if process.returncode != 0 or audio.length == 0:
+                self.fail("extract", "ffmpeg failed to extract audio")
+                return
+
+            with self.lock:
+                self.duration = audio.length / SAMPLE_RATE
+                self.extracted_seconds = self.duration
+            log_status("success", f"Audio extracted: {self.duration / 60:.2f} minutes", "extract")
+
+            for chunk in planner.ready_chunks(audio, final=True):
+                self._send_chunk(audio, chunk)
+        except Exception as e:
+            process.kill()
+            self.fail("extract", str(e))
+        finally:
+            self.put(self.chunks, _DONE)
+
+    def _send_chunk(self, audio, chunk):
+        # The window is copied here so the transcriber never touches the growing buffer
+        samples = audio.window(chunk.start_sample, chunk.end_sample)
+        return self.put(self.chunks, (chunk, samples))
+
+    def _read_ffmpeg_log(self, process):
+        """Drain ffmpeg's stderr (so it can't block) and pick up the input duration"""
+        duration_pattern = re.compile(r"Duration: (\d+):(\d+):(\d+)\.(\d+)")
+        for raw in process.stderr:
+            if self.duration is not None:
+                continue
+            match = duration_pattern.search(raw.decode("utf-8", errors="replace"))
+            if match:
+                h, m, s, cs = map(int, match.groups())
+                with self.lock:
+                    self.duration = h * 3600 + m * 60 + s + cs / 100
+                log_status("info", f"Duration: {self.duration:.2f} seconds", "extract")
+
+    # Stage 2: chunks -> Whisper -> settled segments -> translator
+
+    def transcribe(self):
+        job = self.job
+        try:
+            transcriber = load_transcriber()
+            warnings.filterwarnings("ignore", category=UserWarning)
+
+            # The model loads while ffmpeg is still decoding the first chunk
+            model_size = job.get("modelSize", "medium")
+            backend = job.get("backend", "whisper")
+            log_status("info", f"Loading {backend} model: {model_size}", "transcribe")
+            model = transcriber.load_model(model_size, backend)
+
+            engine = None
+            if job.get("correctionsPath") or job.get("corrections"):
+                if job.get("correctionsPath"):
+                    corrections = load_corrections(job["correctionsPath"])
+                else:
+                    corrections = json.loads(job["corrections"])
+                cache_dir = os.path.join(os.path.dirname(job["transcriptionPath"]) or ".", ".cache")
+                engine = load_corrections_engine(corrections, cache_dir)
+
+            stitcher = SegmentStitcher()
+            language = job.get("language", "he")
+            failed_chunks = []
+
+            while True:
+                item = self.get(self.chunks)
+                if item is _DONE:
+                    break
+                chunk, samples = item
+
+                log_status("info", f"Transcribing chunk {chunk.index + 1} ({chunk.offset / 60:.1f} min)", "transcribe")
+                try:
+                    segments = transcriber.transcribe_chunk_with_retry(model, samples, language)
+                except Exception as e:
+                    # Continue with the other chunks instead of failing completely, like 2_transcribe_audio.py
+                    log_status("error", f"Failed to transcribe chunk {chunk.index + 1}: {str(e)}", "transcribe")
+                    failed_chunks.append(chunk)
+                    segments = []
+                del samples
+
+                if not self._emit(stitcher.add(chunk, segments), engine):
+                    self._save_partial()
+                    return
+                with self.lock:
+                    self.transcribed_seconds = min(chunk.keep_end, chunk.end_sample / SAMPLE_RATE)
+                self.report_progress()
+
+            if self.abort.is_set():
+                self._save_partial()
+                return
+
+            self._emit(stitcher.finish(), engine)
+            del model
+            transcriber.force_garbage_collection()
+
+            save_segments(job["transcriptionPath"], self.transcribed)
+            if engine:
+                log_status("info", engine.summary(), "transcribe")
+            if failed_chunks:
+                missing = ", ".join(
+                    f"{transcriber.format_timestamp(c.keep_start)}-{transcriber.format_timestamp(min(c.keep_end, self.duration))}"
+                    for c in failed_chunks
+                )
+                log_status("warning", f"{len(failed_chunks)} chunk(s) could not be transcribed; missing audio: {missing}", "transcribe")
+            log_status("success", f"Transcription completed: {len(self.transcribed)} segments", "transcribe")
+        except Exception as e:
+            self._save_partial()
+            self.fail("transcribe", str(e))
+        finally:
+            if self.translate:
+                self.put(self.segments, _DONE)
+
+    def _save_partial(self):
+        """Keep the segments transcribed so far when the pipeline stops early"""
+        with self.lock:
+            segments = list(self.transcribed)
+        if not segments:
+            return
+        try:
+            save_segments(self.job["transcriptionPath"], segments)
+            log_status("info", f"Saved {len(segments)} segments transcribed before the pipeline stopped", "transcribe")
+        except OSError as e:
+            log_status("error", f"Could not save the partial transcription: {str(e)}", "transcribe")
+
+    def _emit(self, settled, engine):
+        """Clean up settled segments like 2_transcribe_audio.py does and pass them on"""
+        for seg in settled:
+            text = seg["text"].strip()
+            if not text or len(text) <= 1:
+                continue
+            if engine:
+                text = engine.apply(text)
+            segment = {"text": text, "start": seg.get("start", 0), "end": seg.get("end", 0)}
+
+            with self.lock:
+                self.transcribed.append(segment)
+                segment_id = len(self.transcribed)
+            if self.translate and not self.put(self.segments, (segment_id, text)):
+                return False
+        return True
+
+    # Stage 3: segments -> translation engine, in groups of whatever has arrived
+
+    def run_translation(self):
+        try:
+            asyncio.run(self._translate())
+        except Exception as e:
+            self.fail("translate", str(e))
+
+    async def _translate(self):
+        from openai import AsyncOpenAI
+        from translation_cache import TranslationCache, translation_settings, write_settings
+        from translation_engine import TranslationEngine
+
+        job = self.job
+        system_prompt = job.get("systemPrompt", "")
+        source_lang = job.get("sourceLanguage", "he")
+        target_lang = job.get("targetLanguage", "en")
+        model = job.get("model", "gpt-4")
+        concurrency = job.get("concurrency", 8)
+        batch_size = job.get("batchSize", 10)
+
+        client = AsyncOpenAI(api_key=job["apiKey"].strip(), base_url=job.get("baseUrl"), max_retries=0)
+        engine = TranslationEngine(
+            client,
+            model,
+            system_prompt,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            log=lambda status, message: log_status(status, message, "translate")
+        )
+
+        output_dir = os.path.dirname(job["translationPath"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        cache = TranslationCache(os.path.join(output_dir, "translation_cache.sqlite"))
+
+        translations = {}
+        tasks = []
+        loop = asyncio.get_running_loop()
+
+        async def translate_group(group):
+            keys = [TranslationCache.make_key(text, system_prompt, source_lang, target_lang, model) for _, text in group]
+            cached = cache.get_many(keys)
+            pending = [n for n, key in enumerate(keys) if key not in cached]
+
+            results = [(cached[key], None) if key in cached else None for key in keys]
+            if pending:
+                fresh = await engine.translate_all([group[n][1] for n in pending])
+                for n, result in zip(pending, fresh):
+                    results[n] = result
+                cache.put_many([(keys[n], result[0]) for n, result in zip(pending, fresh) if result[1] is None])
+
+            for (segment_id, _), result in zip(group, results):
+                translations[segment_id] = result
+            with self.lock:
+                self.translated += len(group)
+            self.report_progress()
+
+        finished = False
+        while not finished:
+            # Wait for the next segment, then take everything else that is already queued
+            item = await loop.run_in_executor(None, self.get, self.segments)
+            if item is _DONE:
+                break
+            group = [item]
+            while len(group) < concurrency * batch_size:
+                try:
+                    item = self.segments.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                group.append(item)
+            tasks.append(asyncio.create_task(translate_group(group)))
+
+        await asyncio.gather(*tasks)
+        cache.close()
+
+        if self.abort.is_set():
+            return
+
+        # Same output format as 3_translate_text.py
+        translated_segments = []
+        error_count = 0
+        for segment_id, segment in enumerate(self.transcribed, start=1):
+            translation, error = translations.get(segment_id, (None, "not translated"))
+            if error is not None:
+                error_count += 1
+                log_status("error", f"Segment {segment_id}: Translation failed - {error}", "translate")
+            translated_segments.append({
+                "id": segment_id,
+                "text": segment["text"],
+                "translation": translation if error is None else "[translation_error]",
+                "slide": 0,
+                "delayStartSeconds": 0,
+                "delayEndSeconds": 0,
+                "start": segment["start"],
+                "end": segment["end"]
+            })
+
+        save_segments(job["translationPath"], translated_segments)
+        write_settings(job["translationPath"], translation_settings(system_prompt, source_lang, target_lang))
+
+        if error_count > 0:
+            log_status("warning", f"Translation completed with {error_count} errors", "translate")
+        else:
+            log_status("success", f"All {len(translated_segments)} segments translated", "translate")
+
+    def run(self):
+        stages = [threading.Thread(target=self.extract), threading.Thread(target=self.transcribe)]
+        if self.translate:
+            stages.append(threading.Thread(target=self.run_translation))
+
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        return self.error is None
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "--job":
+        log_status("error", "Usage: python run_pipeline.py --job <job_file|->")
+        sys.exit(1)
+
+    try:
+        job = read_job(sys.argv[2])
+    except (OSError, ValueError) as e:
+        log_status("error", f"Could not read job document: {str(e)}")
+        sys.exit(1)
+
+    if not os.path.exists(job["videoPath"]):
+        log_status("error", f"Input file does not exist: {job['videoPath']}")
+        sys.exit(1)
+
+    log_status("info", f"Input: {os.path.basename(job['videoPath'])}")
+    if not job.get("apiKey"):
+        log_status("info", "No API key provided - running extraction and transcription only")
+
+    if not Pipeline(job).run():
+        sys.exit(1)
+
+    log_status("success", "Pipeline completed successfully!")
+
+if __name__ == "__main__":
+    main()
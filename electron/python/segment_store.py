@@ -0,0 +1,259 @@
+"""Append-only segment store kept next to a JSON segments file
+
+Saving an edit to one segment appends one line instead of re-serializing the whole file.
+The log is rewritten as a snapshot (compacted) once most of its lines are superseded.
+electron/segment-store.js reads and writes the same format:
+
+    {"format": "slider-segments", "version": 1}
+    {"op": "put", "id": 3, "segment": {...}}
+    {"op": "patch", "id": 3, "fields": {"text": "..."}}
+    {"op": "delete", "id": 3}
+    {"op": "sync", "size": 1234, "mtime": 1700000000000}
+
+Segments are keyed by their "id" field, or by position for arrays without ids. The JSON file
+stays the exchange format: a "sync" record remembers the JSON file as of the last import or
+export, and a JSON file changed by anything else is re-imported when the store is opened.
+"""
+import bisect
+import json
+import os
+
+STORE_SUFFIX = ".segments.log"
+HEADER = {"format": "slider-segments", "version": 1}
+
+# Compact once the log has this many lines and at least half of them are superseded
+COMPACT_MIN_RECORDS = 200
+
+# Fields that move a segment in the slide/time indexes
+INDEXED_FIELDS = ("slide", "start", "end", "startTime", "endTime")
+
+def store_path(json_path):
+    return os.path.splitext(json_path)[0] + STORE_SUFFIX
+
+def _first_set(*values):
+    """The first value that isn't None, like a chain of ?? in segment-store.js"""
+    return next((value for value in values if value is not None), None)
+
+def segment_times(segment):
+    """(start, end) in seconds - transcription output uses start/end, the editor model startTime/endTime"""
+    start = _first_set(segment.get("start"), segment.get("startTime"), 0)
+    end = _first_set(segment.get("end"), segment.get("endTime"), start)
+    return start, end
+
+def segment_keys(segments):
+    """Store keys for a segment array: the ids when every segment has a unique one, else positions"""
+    ids = [seg.get("id") if isinstance(seg, dict) else None for seg in segments]
+    if all(isinstance(i, int) and not isinstance(i, bool) for i in ids) and len(set(ids)) == len(ids):
+        return ids
+    return list(range(len(segments)))
+
+def file_identity(path):
+    """Size and whole-millisecond mtime, comparable with what the Electron side records"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns // 1_000_000}
+
+def _write_lines(path, records):
+    """Atomically replace path with one JSON record per line"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+class SegmentStore:
+    def __init__(self, json_path):
+        self.json_path = json_path
+        self.path = store_path(json_path)
+        self.segments = {}
+        self.records = 0
+        self.synced = None
+        self.file = None
+        self._index = None
+
+    def open(self):
+        """Load the log, importing the JSON file when it is newer than the store's view of it"""
+        self._load()
+        if os.path.exists(self.json_path):
+            if self.synced != file_identity(self.json_path):
+                with open(self.json_path, "r", encoding="utf-8") as f:
+                    segments = json.load(f)
+                if not isinstance(segments, list):
+                    raise ValueError("Segments file must contain a JSON array of segments")
+                self.replace(segments, sync=True)
+        elif not os.path.exists(self.path):
+            self.replace([])
+        return self
+
+    def _load(self):
+        self.segments = {}
+        self.records = 0
+        self.synced = None
+        self._index = None
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        valid = 0
+        for number, line in enumerate(data.splitlines(keepends=True)):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash mid-append leaves a partial last line; everything before it is valid
+                break
+            if number == 0:
+                if record.get("format") != HEADER["format"]:
+                    raise ValueError(f"Not a segment store: {self.path}")
+            else:
+                self._apply(record)
+                self.records += 1
+            valid += len(line)
+
+        if valid < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+
+    def _apply(self, record):
+        op = record.get("op")
+        if op == "put":
+            self.segments[record["id"]] = record["segment"]
+        elif op == "patch" and record["id"] in self.segments:
+            self.segments[record["id"]] = {**self.segments[record["id"]], **record["fields"]}
+        elif op == "delete":
+            self.segments.pop(record["id"], None)
+        elif op == "sync":
+            self.synced = {"size": record["size"], "mtime": record["mtime"]}
+
+    def _append(self, record):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self._apply(record)
+        self.records += 1
+
+    def _snapshot(self):
+        records = [HEADER] + [{"op": "put", "id": key, "segment": seg} for key, seg in self.segments.items()]
+        if self.synced:
+            records.append({"op": "sync", **self.synced})
+        return records
+
+    # Reads
+
+    def get(self, key):
+        return self.segments.get(key)
+
+    def all(self):
+        return list(self.segments.values())
+
+    def _build_index(self):
+        by_start = sorted((segment_times(seg)[0], key) for key, seg in self.segments.items())
+        longest = max((end - start for start, end in map(segment_times, self.segments.values())), default=0)
+        by_slide = {}
+        for key, seg in self.segments.items():
+            by_slide.setdefault(seg.get("slide", 0), []).append(key)
+        self._index = {
+            "starts": [start for start, _ in by_start],
+            "keys": [key for _, key in by_start],
+            "longest": longest,
+            "slides": by_slide
+        }
+        return self._index
+
+    def query(self, slide=None, start=None, end=None):
+        """Segments on a slide and/or overlapping the time range [start, end), in store order"""
+        index = self._index or self._build_index()
+
+        if start is None and end is None:
+            keys = index["slides"].get(slide, []) if slide is not None else list(self.segments)
+        else:
+            # Only segments starting within one segment-length before the range can overlap it
+            low = -float("inf") if start is None else start
+            high = float("inf") if end is None else end
+            first = bisect.bisect_left(index["starts"], low - index["longest"])
+            last = bisect.bisect_left(index["starts"], high)
+            keys = []
+            for key in index["keys"][first:last]:
+                seg = self.segments[key]
+                seg_start, seg_end = segment_times(seg)
+                if seg_end > low or seg_start == low:
+                    if slide is None or seg.get("slide", 0) == slide:
+                        keys.append(key)
+            order = {key: n for n, key in enumerate(self.segments)}
+            keys.sort(key=order.__getitem__)
+
+        return [self.segments[key] for key in keys]
+
+    # Writes
+
+    def put(self, key, segment):
+        self._append({"op": "put", "id": key, "segment": segment})
+        self._index = None
+        self._maybe_compact()
+
+    def patch(self, key, fields):
+        if key not in self.segments:
+            raise KeyError(f"No segment with id {key}")
+        self._append({"op": "patch", "id": key, "fields": fields})
+        if any(field in fields for field in INDEXED_FIELDS):
+            self._index = None
+        self._maybe_compact()
+
+    def delete(self, key):
+        if key in self.segments:
+            self._append({"op": "delete", "id": key})
+            self._index = None
+            self._maybe_compact()
+
+    def replace(self, segments, sync=False):
+        """Replace every segment (a JSON import); sync=True records the JSON file as up to date"""
+        self.close()
+        self.segments = dict(zip(segment_keys(segments), segments))
+        self.synced = file_identity(self.json_path) if sync else None
+        self._index = None
+        _write_lines(self.path, self._snapshot())
+        self.records = len(self.segments) + (1 if self.synced else 0)
+
+    def export(self):
+        """Write the segments to the JSON file (pretty-printed, as before the store existed)"""
+        tmp_path = f"{self.json_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.all(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.json_path)
+        self._append({"op": "sync", **file_identity(self.json_path)})
+
+    def compact(self):
+        self.close()
+        _write_lines(self.path, self._snapshot())
+        self.records = len(self.segments) + (1 if self.synced else 0)
+
+    def _maybe_compact(self):
+        if self.records >= COMPACT_MIN_RECORDS and self.records > 2 * (len(self.segments) + 1):
+            self.compact()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def load_segments(json_path):
+    """Read a segments file, including edits saved to its store since the last JSON export"""
+    if not os.path.exists(store_path(json_path)):
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    store = SegmentStore(json_path).open()
+    try:
+        return store.all()
+    finally:
+        store.close()
+
+def save_segments(json_path, segments):
+    """Write a stage's segments to the store and export them to the JSON file"""
+    store = SegmentStore(json_path)
+    try:
+        store.replace(segments)
+        store.export()
+    finally:
+        store.close()
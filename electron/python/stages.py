@@ -0,0 +1,31 @@
+import importlib.util
+import json
+import os
+import sys
+
+PYTHON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_stage(file_name, module_name):
+    """Import a numbered stage script (e.g. 2_transcribe_audio.py) under an importable name"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(PYTHON_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def load_transcriber():
+    return load_stage("2_transcribe_audio.py", "transcribe_audio")
+
+def read_job(source):
+    """Read a JSON job document from a file path, or from the first line of stdin for "-".
+
+    Keeps API keys, prompts and correction lists off the command line, where they are visible
+    to other processes and bounded by the OS argument size limit.
+    """
+    if source == "-":
+        return json.loads(sys.stdin.readline())
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
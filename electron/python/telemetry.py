@@ -0,0 +1,256 @@
+"""Per-run instrumentation shared by the stage scripts
+
+Timed spans and counters record where a run spent its time (model load vs decode vs API
+latency vs export), a background sampler tracks peak resident memory, and ProgressCoalescer
+rate-limits progress lines so Electron isn't flooded with one line per segment. At the end a
+report is written next to the output file as <output>.timing.json.
+
+Profiling is opt-in with --profile (cProfile, saved as <output>.prof for pstats/snakeviz) or
+--profile=py-spy (attaches py-spy if installed, saved as <output>.speedscope.json). py-spy is not
+available on Windows: it only writes its output when interrupted, and a Ctrl+C event there reaches
+the whole console process group, including the run being profiled.
+"""
+import json
+import os
+import platform
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+from memory_budget import lifetime_peak_rss_mb, rss_mb
+
+PROFILE_MODES = ("cprofile", "py-spy")
+
+# One sampler thread per process feeds the peak RSS of every live Telemetry
+_active = weakref.WeakSet()
+_sampler_lock = threading.Lock()
+_sampler = None
+
+def _sample_forever(interval):
+    while True:
+        time.sleep(interval)
+        if not _active:
+            continue
+        current = rss_mb()
+        if current is None:
+            continue
+        for telemetry in list(_active):
+            telemetry.observe_rss(current)
+
+def _ensure_sampler(interval=0.5):
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_forever, args=(interval,), daemon=True)
+            _sampler.start()
+
+class Telemetry:
+    def __init__(self, stage):
+        self.stage = stage
+        self.started = time.time()
+        self.started_perf = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.spans = {}
+        self.counters = Counter()
+        self.values = {}
+        self.peak_rss_mb = rss_mb() or 0
+        self.lock = threading.Lock()
+
+        _active.add(self)
+        _ensure_sampler()
+
+    def observe_rss(self, current):
+        if current > self.peak_rss_mb:
+            self.peak_rss_mb = current
+
+    @contextmanager
+    def span(self, name):
+        """Time a block; repeated spans of the same name are aggregated (count, total, max)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - started)
+
+    def add_span(self, name, seconds):
+        with self.lock:
+            span = self.spans.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            span["count"] += 1
+            span["total_seconds"] += seconds
+            span["max_seconds"] = max(span["max_seconds"], seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def report(self):
+        # Where the current RSS can't be sampled (macOS without psutil) the process peak stands in
+        current = rss_mb()
+        if current is None:
+            current = lifetime_peak_rss_mb()
+        if current is not None:
+            self.observe_rss(current)
+
+        wall = time.perf_counter() - self.started_perf
+        spans = {
+            name: {
+                "count": span["count"],
+                "total_seconds": round(span["total_seconds"], 3),
+                "max_seconds": round(span["max_seconds"], 3),
+                "mean_seconds": round(span["total_seconds"] / span["count"], 3)
+            }
+            for name, span in sorted(self.spans.items(), key=lambda item: -item[1]["total_seconds"])
+        }
+        return {
+            "stage": self.stage,
+            "started": self.started,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(time.process_time() - self.started_cpu, 3),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "spans": spans,
+            "counters": dict(self.counters),
+            "values": self.values,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        }
+
+    def write_report(self, output_path):
+        """Write the timing report next to output_path; returns its path, or None if it couldn't be written"""
+        path = f"{output_path}.timing.json"
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, indent=2)
+            return path
+        except OSError:
+            return None
+
+    def summary(self, top=4):
+        """One line naming the spans that took the most time"""
+        report = self.report()
+        parts = [f"{name} {span['total_seconds']:.1f}s" for name, span in list(report["spans"].items())[:top]]
+        return f"{self.stage} took {report['wall_seconds']:.1f}s ({', '.join(parts) or 'no spans'}), peak memory {report['peak_rss_mb']:.0f} MB"
+
+class ProgressCoalescer:
+    """Forwards at most one progress update per min_interval, always including the last one
+
+    emit is called with the arguments of the most recent update(); intermediate updates are dropped.
+    """
+
+    def __init__(self, emit, min_interval=0.25):
+        self.emit = emit
+        self.min_interval = min_interval
+        self.last_emit = 0.0
+        self.pending = None
+        self.lock = threading.Lock()
+
+    def update(self, *args, final=False):
+        with self.lock:
+            now = time.monotonic()
+            if final or now - self.last_emit >= self.min_interval:
+                self.pending = None
+                self.last_emit = now
+                send = True
+            else:
+                self.pending = args
+                send = False
+        if send:
+            self.emit(*args)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, None
+            self.last_emit = time.monotonic()
+        if pending is not None:
+            self.emit(*pending)
+
+def pop_profile_flag(argv):
+    """Strip --profile / --profile=<mode> from argv; returns (argv, mode or None)"""
+    mode = None
+    rest = []
+    for arg in argv:
+        if arg == "--profile":
+            mode = "cprofile"
+        elif arg.startswith("--profile="):
+            mode = arg.split("=", 1)[1]
+        else:
+            rest.append(arg)
+    return rest, mode
+
+class Profiler:
+    """Optional profiling of a whole run: cProfile in-process, or py-spy attached from outside"""
+
+    def __init__(self, mode, output_path):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (available: {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.output_path = output_path
+        self.profile = None
+        self.process = None
+        self.path = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            self.path = f"{self.output_path}.prof"
+            return self.path
+
+        if sys.platform == "win32":
+            raise RuntimeError("py-spy profiling is not supported on Windows, use --profile (cProfile)")
+        if not shutil.which("py-spy"):
+            raise RuntimeError("py-spy is not installed (pip install py-spy)")
+        self.path = f"{self.output_path}.speedscope.json"
+        self.process = subprocess.Popen(
+            ["py-spy", "record", "--pid", str(os.getpid()), "--format", "speedscope", "--output", self.path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        return self.path
+
+    def stop(self):
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+            self.profile = None
+        if self.process:
+            # py-spy writes its output when interrupted
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        return self.path
+
+@contextmanager
+def profiling(mode, output_path, log=None):
+    """Profile the block when mode is set; log(status, message) reports where the profile went"""
+    if not mode:
+        yield
+        return
+
+    profiler = Profiler(mode, output_path)
+    try:
+        path = profiler.start()
+    except (RuntimeError, ValueError) as e:
+        if log:
+            log("warning", f"Profiling disabled: {str(e)}")
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        profiler.stop()
+        if log:
+            log("info", f"Profile written to {os.path.basename(path)}")
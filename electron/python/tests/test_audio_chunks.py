@@ -0,0 +1,111 @@
+"""Chunk planning and stitching on synthetic audio
+
+    python -m unittest discover electron/python/tests
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_chunks import SAMPLE_RATE, ChunkPlanner, PcmAudio, plan_chunks, stitch_segments
+
+def speech(seconds, pauses=(), seed=0):
+    """Noise at speech level with silent stretches of (start, end) seconds"""
+    rng = np.random.default_rng(seed)
+    samples = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 3000).astype(np.int16)
+    for start, end in pauses:
+        samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0
+    return PcmAudio(samples, SAMPLE_RATE)
+
+def bounds(chunks):
+    return [(c.start_sample, c.end_sample, c.keep_start, c.keep_end) for c in chunks]
+
+class ChunkPlannerTest(unittest.TestCase):
+    def test_cuts_increase_for_short_targets(self):
+        audio = speech(20)
+        for target in (0.05, 0.5, 2):
+            chunks = plan_chunks(audio, target_seconds=target, search_seconds=15, overlap_seconds=0.1)
+
+            keep_starts = [c.keep_start for c in chunks]
+            self.assertEqual(keep_starts, sorted(set(keep_starts)), f"target {target}s")
+            self.assertEqual(chunks[0].keep_start, 0)
+            self.assertEqual(chunks[-1].keep_end, float("inf"))
+            # Every chunk's keep range starts where the previous one ended
+            for previous, chunk in zip(chunks, chunks[1:]):
+                self.assertEqual(previous.keep_end, chunk.keep_start)
+
+    def test_rejects_non_positive_target(self):
+        with self.assertRaises(ValueError):
+            ChunkPlanner(SAMPLE_RATE, target_seconds=0)
+
+    def test_cuts_in_silence(self):
+        audio = speech(80, pauses=[(28, 29), (61, 62)])
+        chunks = plan_chunks(audio, target_seconds=30, search_seconds=5, overlap_seconds=1)
+
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(28 <= chunks[0].keep_end <= 29)
+        self.assertTrue(61 <= chunks[1].keep_end <= 62)
+
+    def test_incremental_planning_matches_plan_chunks(self):
+        audio = speech(400, pauses=[(50, 51), (170, 170.5)])
+        expected = plan_chunks(audio, target_seconds=30, search_seconds=5, overlap_seconds=1)
+
+        # Audio arriving a second at a time, as ffmpeg delivers it to run_pipeline.py
+        planner = ChunkPlanner(SAMPLE_RATE, target_seconds=30, search_seconds=5, overlap_seconds=1)
+        chunks = []
+        for end in range(SAMPLE_RATE, audio.num_samples + 1, SAMPLE_RATE):
+            received = PcmAudio(audio.samples[:end], SAMPLE_RATE)
+            for chunk in planner.ready_chunks(received):
+                # A chunk is only handed out once all of its audio has arrived
+                self.assertLessEqual(chunk.end_sample, end)
+                chunks.append(chunk)
+        chunks += planner.ready_chunks(audio, final=True)
+
+        self.assertEqual(bounds(chunks), bounds(expected))
+        self.assertEqual(planner.ready_chunks(audio, final=True), [])
+
+class StitchSegmentsTest(unittest.TestCase):
+    def test_overlap_duplicates_collapse_across_seam(self):
+        audio = speech(60, pauses=[(29, 30)])
+        first, second = plan_chunks(audio, target_seconds=30, search_seconds=5, overlap_seconds=2)
+        seam = first.keep_end
+
+        # Each chunk places the sentence at the seam on its own side of it, so both copies are kept
+        # by ownership and only the text match removes the repeat; timestamps are chunk-relative
+        results = [
+            (second, [
+                {"text": "Across  the seam", "start": seam - 0.4 - second.offset, "end": seam + 0.8 - second.offset},
+                {"text": "after", "start": seam + 2 - second.offset, "end": seam + 4 - second.offset}
+            ]),
+            (first, [
+                {"text": "before", "start": seam - 6, "end": seam - 3},
+                {"text": "across the seam", "start": seam - 1.5, "end": seam - 0.6}
+            ])
+        ]
+        stitched = stitch_segments(results)
+
+        self.assertEqual([seg["text"] for seg in stitched], ["before", "across the seam", "after"])
+        seam_segment = stitched[1]
+        self.assertAlmostEqual(seam_segment["start"], seam - 1.5)
+        self.assertAlmostEqual(seam_segment["end"], seam + 0.8)
+
+    def test_segments_are_owned_by_one_chunk(self):
+        audio = speech(60, pauses=[(29, 30)])
+        first, second = plan_chunks(audio, target_seconds=30, search_seconds=5, overlap_seconds=2)
+        seam = first.keep_end
+
+        # The overlap is transcribed twice with different wording; only the owning chunk's copy stays
+        results = [
+            (first, [{"text": "tail as heard by the first chunk", "start": seam + 0.2, "end": seam + 1.5}]),
+            (second, [{"text": "tail as heard by the second chunk", "start": seam + 0.2 - second.offset,
+                       "end": seam + 1.5 - second.offset}])
+        ]
+        stitched = stitch_segments(results)
+
+        self.assertEqual([seg["text"] for seg in stitched], ["tail as heard by the second chunk"])
+
+if __name__ == "__main__":
+    unittest.main()
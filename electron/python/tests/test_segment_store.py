@@ -0,0 +1,100 @@
+"""Segment store round trips on disk
+
+    python -m unittest discover electron/python/tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import segment_store
+from segment_store import SegmentStore, load_segments, save_segments, segment_times, store_path
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+class SegmentStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp.name, "segments.json")
+        self.segments = [
+            {"id": n, "text": f"segment {n}", "start": n * 2.0, "end": n * 2.0 + 1.5, "slide": n // 3}
+            for n in range(1, 7)
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_edits_survive_reload_and_compaction(self):
+        save_segments(self.json_path, self.segments)
+
+        store = SegmentStore(self.json_path).open()
+        store.patch(2, {"text": "edited"})
+        store.put(7, {"id": 7, "text": "added", "start": 14.0, "end": 15.0, "slide": 2})
+        store.delete(5)
+        store.close()
+        # One appended line per edit, after the snapshot and the sync record of the export
+        self.assertEqual(len(read_lines(store_path(self.json_path))), 1 + 6 + 1 + 3)
+
+        expected = [
+            {**seg, "text": "edited"} if seg["id"] == 2 else seg for seg in self.segments if seg["id"] != 5
+        ] + [{"id": 7, "text": "added", "start": 14.0, "end": 15.0, "slide": 2}]
+        # Edits live in the store only; readers see them without a JSON export
+        self.assertEqual(load_segments(self.json_path), expected)
+
+        store = SegmentStore(self.json_path).open()
+        store.compact()
+        store.close()
+        lines = read_lines(store_path(self.json_path))
+        self.assertEqual([line.get("op") for line in lines], [None] + ["put"] * 6 + ["sync"])
+        self.assertEqual(load_segments(self.json_path), expected)
+
+    def test_partial_last_line_is_dropped(self):
+        save_segments(self.json_path, self.segments)
+        store = SegmentStore(self.json_path).open()
+        store.patch(1, {"text": "kept"})
+        store.close()
+        with open(store_path(self.json_path), "a", encoding="utf-8") as f:
+            f.write('{"op": "patch", "id": 2, "fie')
+
+        segments = load_segments(self.json_path)
+        self.assertEqual([seg["text"] for seg in segments[:2]], ["kept", "segment 2"])
+
+    def test_changed_json_is_reimported(self):
+        save_segments(self.json_path, self.segments)
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(self.segments[:2], f)
+
+        self.assertEqual(load_segments(self.json_path), self.segments[:2])
+
+    def test_compacts_when_most_lines_are_superseded(self):
+        save_segments(self.json_path, self.segments)
+        store = SegmentStore(self.json_path).open()
+        for n in range(segment_store.COMPACT_MIN_RECORDS):
+            store.patch(1, {"text": f"edit {n}"})
+        store.close()
+
+        self.assertLess(len(read_lines(store_path(self.json_path))), segment_store.COMPACT_MIN_RECORDS)
+        self.assertEqual(load_segments(self.json_path)[0]["text"], f"edit {segment_store.COMPACT_MIN_RECORDS - 1}")
+
+    def test_query_by_slide_and_time(self):
+        save_segments(self.json_path, self.segments)
+        store = SegmentStore(self.json_path).open()
+        try:
+            self.assertEqual([seg["id"] for seg in store.query(slide=1)], [3, 4, 5])
+            self.assertEqual([seg["id"] for seg in store.query(start=5.0, end=8.0)], [2, 3])
+            store.patch(6, {"start": 0.5, "end": 1.0})
+            self.assertEqual([seg["id"] for seg in store.query(start=0.0, end=1.0)], [6])
+        finally:
+            store.close()
+
+    def test_segment_times_keep_zero(self):
+        self.assertEqual(segment_times({"start": 0, "end": 0, "startTime": 5, "endTime": 6}), (0, 0))
+        self.assertEqual(segment_times({"startTime": 3, "end": None}), (3, 3))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""TranslationEngine against a local OpenAI-compatible stub server
+
+    python -m unittest discover electron/python/tests
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+from translation_engine import TranslationEngine
+
+class StubServer:
+    """Answers chat completions with "T:<text>", numbered JSON in, numbered JSON out
+
+    rate_limited: how many of the first requests get a 429 asking to retry after 10 ms
+    broken_batches: batch requests get a reply that isn't JSON
+    delay(text): seconds to wait before answering a single-text request
+    """
+
+    def __init__(self, rate_limited=0, broken_batches=False, delay=None):
+        self.rate_limited = rate_limited
+        self.broken_batches = broken_batches
+        self.delay = delay
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reply(self, messages):
+        content = messages[-1]["content"]
+        try:
+            numbered = json.loads(content)
+        except ValueError:
+            numbered = None
+        if isinstance(numbered, dict):
+            if self.broken_batches:
+                return "Sorry, here are the translations: 1. ..."
+            return json.dumps({key: f"T:{text}" for key, text in numbered.items()}, ensure_ascii=False)
+        if self.delay:
+            time.sleep(self.delay(content))
+        return f"T:{content}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body, headers=()):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append(body["messages"])
+                    limited = len(stub.requests) <= stub.rate_limited
+                if limited:
+                    self.send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                              [("retry-after", "0.01")])
+                    return
+                self.send(200, {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": stub.reply(body["messages"])}
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                })
+
+        return Handler
+
+def translate(stub, texts, **options):
+    async def run():
+        client = AsyncOpenAI(api_key="test", base_url=stub.base_url, max_retries=0)
+        engine = TranslationEngine(client, "stub-model", "Translate.", **options)
+        try:
+            return await engine.translate_all(texts)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+class TranslationEngineTest(unittest.TestCase):
+    texts = [f"segment {n}" for n in range(25)]
+
+    def test_packs_texts_into_batches(self):
+        with StubServer() as stub:
+            results = translate(stub, self.texts, batch_size=10)
+
+        self.assertEqual(results, [(f"T:{text}", None) for text in self.texts])
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual([len(json.loads(messages[-1]["content"])) for messages in stub.requests], [10, 10, 5])
+
+    def test_invalid_batch_reply_falls_back_to_single_requests(self):
+        with StubServer(broken_batches=True) as stub:
+            results = translate(stub, self.texts[:4], batch_size=4)
+
+        self.assertEqual(results, [(f"T:{text}", None) for text in self.texts[:4]])
+        # One batch that couldn't be parsed, then each text on its own
+        self.assertEqual(len(stub.requests), 5)
+
+    def test_retries_rate_limited_requests(self):
+        with StubServer(rate_limited=2) as stub:
+            results = translate(stub, self.texts[:3], batch_size=1, concurrency=1)
+
+        self.assertEqual(results, [(f"T:{text}", None) for text in self.texts[:3]])
+        self.assertEqual(len(stub.requests), 5)
+
+    def test_gives_up_after_max_retries(self):
+        with StubServer(rate_limited=100) as stub:
+            results = translate(stub, self.texts[:1], batch_size=1, max_retries=2)
+
+        translation, error = results[0]
+        self.assertIsNone(translation)
+        self.assertIn("Rate limit", error)
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_results_keep_input_order(self):
+        # Earlier texts take longest, so requests finish in reverse order
+        texts = self.texts[:8]
+        delays = {text: 0.05 * (len(texts) - n) for n, text in enumerate(texts)}
+        with StubServer(delay=delays.get) as stub:
+            results = translate(stub, texts, batch_size=1, concurrency=8)
+
+        self.assertEqual(results, [(f"T:{text}", None) for text in texts])
+
+if __name__ == "__main__":
+    unittest.main()
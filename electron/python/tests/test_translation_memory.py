@@ -0,0 +1,137 @@
+"""Translation memory lookups over earlier projects
+
+    python -m unittest discover electron/python/tests
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translation_cache import translation_settings, write_settings
+from translation_memory import REUSE_SIMILARITY, TranslationMemory, levenshtein, load_memory, normalize
+
+SENTENCES = [
+    "Today we are going to talk about the structure of the cell membrane",
+    "Please open your books to chapter 3 before we begin",
+    "The mitochondria produce most of the energy the cell needs",
+    "Any questions about the homework from last week",
+    "We will take a short break and continue in ten minutes",
+]
+
+def filler(count, seed=0):
+    """Unrelated sentences, so lookups have to find the right pair among many"""
+    rng = random.Random(seed)
+    words = ["alpha", "river", "stone", "window", "garden", "silver", "planet", "orange", "music", "ladder"]
+    return [" ".join(rng.choice(words) for _ in range(8)) + f" {n}" for n in range(count)]
+
+class LevenshteinTest(unittest.TestCase):
+    def test_known_distances(self):
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("flaw", "lawn"), 2)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("same", "same"), 0)
+
+    def test_matches_dynamic_programming(self):
+        def reference(a, b):
+            row = list(range(len(b) + 1))
+            for i, ca in enumerate(a, 1):
+                previous, row[0] = row[0], i
+                for j, cb in enumerate(b, 1):
+                    previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ca != cb))
+            return row[-1]
+
+        rng = random.Random(1)
+        # Longer than a machine word, so the bit vectors span several words
+        for _ in range(200):
+            a = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 90)))
+            b = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 90)))
+            self.assertEqual(levenshtein(a, b), reference(a, b), (a, b))
+
+class TranslationMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.memory = TranslationMemory()
+        for text in filler(300):
+            self.memory.add(text, f"T:{text}")
+        for text in SENTENCES:
+            self.memory.add(text, f"T:{text}")
+
+    def test_normalize_ignores_case_punctuation_and_points(self):
+        self.assertEqual(normalize("Shalom,  World!"), "shalom world")
+        self.assertEqual(normalize("שָׁלוֹם"), normalize("שלום"))
+
+    def test_exact_match_after_normalizing(self):
+        matches = self.memory.lookup("today, we are going to talk about the structure of the CELL membrane!")
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].similarity, 1.0)
+        self.assertEqual(matches[0].translation, f"T:{SENTENCES[0]}")
+
+    def test_near_duplicate_is_reused(self):
+        # One letter added; found through the MinHash bands, scored by edit distance
+        matches = self.memory.lookup("The mitochondria produces most of the energy the cell needs")
+        self.assertTrue(matches)
+        best = matches[0]
+        self.assertEqual(best.text, SENTENCES[2])
+        self.assertGreaterEqual(best.similarity, REUSE_SIMILARITY)
+        self.assertTrue(best.same_numbers)
+
+    def test_different_numbers_are_flagged(self):
+        matches = self.memory.lookup("Please open your books to chapter 4 before we begin")
+        self.assertEqual(matches[0].text, SENTENCES[1])
+        self.assertGreaterEqual(matches[0].similarity, REUSE_SIMILARITY)
+        self.assertFalse(matches[0].same_numbers)
+
+    def test_similar_sentence_is_a_hint_only(self):
+        matches = self.memory.lookup("We will take a long break and continue in twenty minutes")
+        self.assertEqual(matches[0].text, SENTENCES[4])
+        self.assertLess(matches[0].similarity, REUSE_SIMILARITY)
+
+    def test_unrelated_sentence_has_no_match(self):
+        self.assertEqual(self.memory.lookup("Completely different words about quantum chromodynamics"), [])
+
+class LoadMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "cache", "translation_memory.sqlite")
+        self.settings = translation_settings("Translate lectures.", "en", "he")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def project(self, name, pairs, settings):
+        path = os.path.join(self.tmp.name, name, "segments.json")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"id": n, "text": text, "translation": translation} for n, (text, translation) in enumerate(pairs, 1)], f)
+        if settings is not None:
+            write_settings(path, settings)
+        return path
+
+    def test_only_projects_with_the_same_settings_are_used(self):
+        self.project("same", [(SENTENCES[0], "same settings")], self.settings)
+        self.project("other", [(SENTENCES[2], "other prompt")], translation_settings("Other prompt.", "en", "he"))
+        self.project("old", [(SENTENCES[3], "no settings")], None)
+
+        for _ in range(2):
+            # The second load reads the signatures back from SQLite
+            memory, used = load_memory([self.tmp.name], self.db_path, self.settings)
+            self.assertEqual(used, 1)
+            self.assertEqual(len(memory), 1)
+            self.assertEqual(memory.lookup(SENTENCES[0])[0].translation, "same settings")
+            self.assertEqual(memory.lookup(SENTENCES[2]), [])
+
+    def test_excluded_and_failed_translations_are_left_out(self):
+        own = self.project("own", [(SENTENCES[0], "own output")], self.settings)
+        self.project("failed", [(SENTENCES[1], "[translation_error]"), (SENTENCES[4], "kept")], self.settings)
+
+        memory, used = load_memory([self.tmp.name], self.db_path, self.settings, exclude=(own,))
+        self.assertEqual(used, 1)
+        self.assertEqual(memory.lookup(SENTENCES[0]), [])
+        self.assertEqual(memory.lookup(SENTENCES[1]), [])
+        self.assertEqual(memory.lookup(SENTENCES[4])[0].translation, "kept")
+
+if __name__ == "__main__":
+    unittest.main()
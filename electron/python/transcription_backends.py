@@ -0,0 +1,119 @@
+"""Interchangeable speech-to-text engines behind one transcribe(samples, language) call
+
+Every backend returns the same segment schema, with times relative to the samples passed in:
+    {"id", "start", "end", "text", "avg_logprob", "compression_ratio", "no_speech_prob"}
+"""
+
+# Decoding settings shared by all backends - greedy, no cross-window conditioning
+DECODE_OPTIONS = {
+    "temperature": 0.0,
+    "beam_size": 1,
+    "patience": 1.0,
+    "length_penalty": 1.0,
+    "compression_ratio_threshold": 2.4,
+    "no_speech_threshold": 0.6
+}
+LOGPROB_THRESHOLD = -1.0
+
+def _language(language):
+    """The UI's "auto" means let the model detect the language"""
+    return None if language == "auto" else language
+
+def _default_device():
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+class WhisperBackend:
+    """The reference openai-whisper (PyTorch) implementation"""
+
+    name = "whisper"
+
+    def __init__(self, model_size, device=None, threads=0):
+        import whisper
+
+        self.device = device or _default_device()
+        self.model = whisper.load_model(model_size, device=self.device)
+        # Half precision only exists on the GPU; on CPU whisper would warn and fall back to fp32 anyway
+        self.fp16 = self.device == "cuda"
+
+    def transcribe(self, samples, language):
+        result = self.model.transcribe(
+            samples,
+            language=_language(language),
+            word_timestamps=False,  # Disable word timestamps to save memory
+            verbose=False,
+            best_of=1,
+            suppress_tokens=[-1],
+            initial_prompt=None,
+            condition_on_previous_text=False,  # Disable to save memory
+            fp16=self.fp16,
+            logprob_threshold=LOGPROB_THRESHOLD,
+            **DECODE_OPTIONS
+        )
+        return [
+            {
+                "id": seg.get("id", n),
+                "start": seg["start"],
+                "end": seg["end"],
+                "text": seg["text"],
+                "avg_logprob": seg.get("avg_logprob"),
+                "compression_ratio": seg.get("compression_ratio"),
+                "no_speech_prob": seg.get("no_speech_prob")
+            }
+            for n, seg in enumerate(result["segments"])
+        ]
+
+class FasterWhisperBackend:
+    """CTranslate2 engine (faster-whisper) with int8 weights on CPU, float16 on GPU
+
+    Several times faster than the PyTorch path on CPU for a small accuracy cost.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size, device=None, threads=0):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("The faster-whisper backend needs the faster-whisper package (pip install faster-whisper)")
+
+        self.device = device or _default_device()
+        compute_type = "float16" if self.device == "cuda" else "int8"
+        self.model = WhisperModel(model_size, device=self.device, compute_type=compute_type, cpu_threads=threads)
+
+    def transcribe(self, samples, language):
+        segments, _info = self.model.transcribe(
+            samples,
+            language=_language(language),
+            best_of=1,
+            suppress_tokens=[-1],
+            initial_prompt=None,
+            condition_on_previous_text=False,
+            word_timestamps=False,
+            vad_filter=False,
+            log_prob_threshold=LOGPROB_THRESHOLD,
+            **DECODE_OPTIONS
+        )
+        # segments is a lazy generator - decoding happens while it is consumed
+        return [
+            {
+                "id": seg.id,
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "avg_logprob": seg.avg_logprob,
+                "compression_ratio": seg.compression_ratio,
+                "no_speech_prob": seg.no_speech_prob
+            }
+            for seg in segments
+        ]
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend, FasterWhisperBackend)}
+
+def load_backend(name, model_size, device=None, threads=0):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name} (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name](model_size, device=device, threads=threads)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# Written next to a translated segments file, naming what it was translated with
+SETTINGS_SUFFIX = ".translation.json"
+
+def translation_settings(system_prompt, source_lang, target_lang):
+    """The settings that decide whether one project's translations fit another's (see translation_memory)"""
+    return {
+        "sourceLanguage": source_lang,
+        "targetLanguage": target_lang,
+        "systemPrompt": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    }
+
+def settings_path(segments_path):
+    return f"{segments_path}{SETTINGS_SUFFIX}"
+
+def write_settings(segments_path, settings):
+    with open(settings_path(segments_path), "w", encoding="utf-8") as f:
+        json.dump(settings, f)
+
+def read_settings(segments_path):
+    """The settings a segments file was translated with, or None for files translated before they were recorded"""
+    try:
+        with open(settings_path(segments_path), "r", encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return settings if isinstance(settings, dict) else None
+
+class TranslationCache:
+    """Persistent translation cache keyed by a hash of everything that affects the output
+
+    Entries are evicted least-recently-used first once the cache holds more than max_entries.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, translation TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(source_text, system_prompt, source_lang, target_lang, model):
+        payload = json.dumps([source_text, system_prompt, source_lang, target_lang, model], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: translation} for the keys that are cached, refreshing their LRU position"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self.conn.commit()
+
+        self.hits += sum(1 for k in keys if k in found)
+        self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items):
+        """Store (key, translation) pairs and evict the oldest entries beyond max_entries"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+            [(key, translation, now) for key, translation in items]
+        )
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+        return max(0, excess)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import random
+import re
+import time
+from openai import APIConnectionError, APIStatusError, RateLimitError
+from job_control import JobCancelled
+
+BATCH_INSTRUCTIONS = (
+    "You will receive a JSON object that maps segment numbers to source texts. "
+    "Translate every text independently and reply with only a JSON object that maps "
+    "the same segment numbers to their translations."
+)
+
+# Few-shot examples sent with one batch request (the hints of all its segments together)
+MAX_BATCH_HINTS = 8
+
+class TokenBucket:
+    """Async token bucket that spaces requests out to a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute, capacity=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity or max(1, int(self.rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, cancelled=None):
+        """Wait for a token; raises JobCancelled once cancelled() is true instead of waiting on"""
+        async with self.lock:
+            while True:
+                if cancelled and cancelled():
+                    raise JobCancelled()
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def _is_retryable(error):
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, if it said so"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def _parse_json_object(content):
+    """Parse a JSON object reply, tolerating a surrounding markdown code fence"""
+    content = content.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", content, re.DOTALL)
+    if fenced:
+        content = fenced.group(1)
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("Batch reply is not a JSON object")
+    return data
+
+class TranslationEngine:
+    """Translates many texts concurrently, packing several per request where possible
+
+    Results come back in input order as (translation, error) pairs - exactly one is None.
+    Optional hints give (source, translation) examples per text, sent as earlier turns of the
+    conversation so similar sentences are translated the way they were before.
+    An optional Telemetry records API latency, retries and batch fallbacks. An optional
+    JobControl pauses before the next request; once it is cancelled no further requests
+    are sent and the texts not yet translated come back as None.
+    """
+
+    def __init__(self, client, model, system_prompt, concurrency=8, requests_per_minute=500,
+                 batch_size=10, batch_max_chars=4000, max_retries=5, on_progress=None, on_result=None, log=None,
+                 telemetry=None, control=None):
+        self.client = client
+        self.model = model
+        self.system_prompt = system_prompt
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.bucket = TokenBucket(requests_per_minute)
+        self.batch_size = max(1, batch_size)
+        self.batch_max_chars = batch_max_chars
+        self.max_retries = max_retries
+        self.on_progress = on_progress
+        self.on_result = on_result
+        self.log = log or (lambda status, message: None)
+        self.telemetry = telemetry
+        self.control = control
+        self.completed = 0
+
+    async def _request(self, messages, max_tokens):
+        """Send one chat completion, retrying 429/5xx/connection errors with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            # Requests already sent are finished; new ones wait out a pause or stop here,
+            # both before taking a rate limit token and once a slot is free
+            if self.control and not await self.control.wait_async():
+                raise JobCancelled()
+            await self.bucket.acquire(self.control and (lambda: self.control.cancelled))
+            try:
+                async with self.semaphore:
+                    if self.control and not await self.control.wait_async():
+                        raise JobCancelled()
+                    started = time.perf_counter()
+                    try:
+                        response = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=0.3,  # Lower temperature for more consistent translations
+                            max_tokens=max_tokens
+                        )
+                    finally:
+                        # API latency only - waiting for the rate limit or a free slot is excluded
+                        if self.telemetry:
+                            self.telemetry.add_span("api_request", time.perf_counter() - started)
+                return response.choices[0].message.content.strip()
+            except JobCancelled:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                if self.telemetry:
+                    self.telemetry.count("retries")
+
+                delay = _retry_after(e) or min(60, 2 ** attempt) + random.uniform(0, 1)
+                self.log("info", f"Request failed ({str(e)}), retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    async def _translate_one(self, text, hints=()):
+        examples = []
+        for source, translation in hints:
+            examples += [{"role": "user", "content": source}, {"role": "assistant", "content": translation}]
+        return await self._request(
+            [
+                {"role": "system", "content": self.system_prompt},
+                *examples,
+                {"role": "user", "content": text}
+            ],
+            max_tokens=500  # Reasonable limit for segment translations
+        )
+
+    async def _translate_batch(self, indices, texts, hints, results):
+        if len(indices) > 1:
+            numbered = {str(n + 1): texts[i] for n, i in enumerate(indices)}
+            # All hints of the batch as one earlier exchange in the same numbered format
+            batch_hints = list(dict(pair for i in indices for pair in hints[i]).items())[:MAX_BATCH_HINTS]
+            examples = []
+            if batch_hints:
+                examples = [
+                    {"role": "user", "content": json.dumps(
+                        {str(n + 1): source for n, (source, _) in enumerate(batch_hints)}, ensure_ascii=False)},
+                    {"role": "assistant", "content": json.dumps(
+                        {str(n + 1): translation for n, (_, translation) in enumerate(batch_hints)}, ensure_ascii=False)}
+                ]
+            try:
+                content = await self._request(
+                    [
+                        {"role": "system", "content": f"{self.system_prompt}\n\n{BATCH_INSTRUCTIONS}"},
+                        *examples,
+                        {"role": "user", "content": json.dumps(numbered, ensure_ascii=False)}
+                    ],
+                    max_tokens=min(4000, 500 * len(indices))
+                )
+                reply = _parse_json_object(content)
+
+                translations = [reply.get(key) for key in numbered]
+                if set(reply) != set(numbered) or not all(isinstance(t, str) and t.strip() for t in translations):
+                    raise ValueError("Batch reply does not match the numbered segments")
+
+                for i, translation in zip(indices, translations):
+                    self._store(results, i, (translation.strip(), None))
+                self._advance(len(indices))
+                return
+            except JobCancelled:
+                return
+            except Exception as e:
+                if self.telemetry:
+                    self.telemetry.count("batch_fallbacks")
+                self.log("info", f"Batch of {len(indices)} segments failed ({str(e)}), translating them one by one")
+
+        await asyncio.gather(*(self._translate_single(i, texts, hints, results) for i in indices))
+
+    async def _translate_single(self, i, texts, hints, results):
+        try:
+            self._store(results, i, (await self._translate_one(texts[i], hints[i]), None))
+        except JobCancelled:
+            return
+        except Exception as e:
+            self._store(results, i, (None, str(e)))
+        self._advance(1)
+
+    def _store(self, results, i, result):
+        results[i] = result
+        if self.on_result:
+            self.on_result(i, *result)
+
+    def _advance(self, count):
+        self.completed += count
+        if self.on_progress:
+            self.on_progress(self.completed)
+
+    def _plan_batches(self, texts):
+        """Group consecutive texts into batches bounded by count and total characters"""
+        batches = []
+        current = []
+        current_chars = 0
+        for i, text in enumerate(texts):
+            if current and (len(current) >= self.batch_size or current_chars + len(text) > self.batch_max_chars):
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append(i)
+            current_chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    async def translate_all(self, texts, hints=None):
+        results = [None] * len(texts)
+        hints = hints or [()] * len(texts)
+        await asyncio.gather(*(
+            self._translate_batch(batch, texts, hints, results) for batch in self._plan_batches(texts)
+        ))
+        return results
@@ -0,0 +1,322 @@
+"""Fuzzy translation memory built from the text/translation pairs of earlier projects
+
+Editors correct translations in the editor, so a project's segments.json (plus its segment
+store) holds the best known translation of every sentence. New segments are looked up here
+before they go to the API: near-identical sources reuse the stored translation, similar ones
+are sent along as few-shot examples. Only projects translated with the same languages and
+system prompt count (see translation_cache.translation_settings), and a translation is only
+reused verbatim when both sentences contain the same numbers.
+
+Lookup: sources are normalized (case, punctuation, Hebrew points), shingled into character
+3-grams and MinHashed; LSH bands pick a handful of candidates, which are ranked by their
+estimated Jaccard similarity and checked with a real edit distance. Signatures are kept in
+SQLite per source file and only recomputed for files that changed.
+"""
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+import zlib
+
+import numpy as np
+
+from segment_store import load_segments, store_path
+from translation_cache import read_settings, settings_path
+
+# 16 bands of 2 rows: pairs above ~0.25 Jaccard share a band with good probability
+NUM_PERM = 32
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3
+# Candidates checked with the edit distance, best estimated similarity first; candidates
+# sharing fewer MinHash values than this are too far apart to reach HINT_SIMILARITY
+MAX_CANDIDATES = 4
+MIN_ESTIMATE = 0.25
+
+# Edit similarity (1 - distance / longer length) of the normalized sources
+REUSE_SIMILARITY = 0.95
+HINT_SIMILARITY = 0.6
+MAX_HINTS = 3
+
+SEGMENTS_FILE = "segments.json"
+FAILED_TRANSLATION = "[translation_error]"
+# Bumped whenever the SQLite layout changes; older caches are rebuilt
+SCHEMA_VERSION = 2
+
+_PRIME = 4294967311  # Smallest prime above 2^32, so (a * x + b) stays within uint64
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Distinguishes equal rows in different bands, so all bands share one sorted key array
+_BAND_SALT = _rng.randint(0, 2 ** 63, size=BANDS, dtype=np.uint64)
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+_NUMBERS = re.compile(r"\d+")
+
+def normalize(text):
+    """Lowercase, without punctuation, combining marks (niqqud, accents) or repeated spaces"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+def signature(normalized):
+    """MinHash of the character 3-grams (deterministic across runs - stored in SQLite)"""
+    padded = f" {normalized} "
+    shingles = {padded[i:i + SHINGLE] for i in range(max(1, len(padded) - SHINGLE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+def levenshtein(a, b):
+    """Edit distance with Myers' bit-parallel algorithm - one pass over a, b as a bit vector"""
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    peq = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    full = (1 << len(b)) - 1
+    last = 1 << (len(b) - 1)
+    pv = full
+    mv = 0
+    distance = len(b)
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return distance
+
+def band_keys(signatures):
+    """One integer per band and signature (BANDS x n) - the rows of a band mixed with a band salt"""
+    signatures = np.atleast_2d(signatures).reshape(-1, BANDS, ROWS)
+    keys = signatures[:, :, 0] ^ _BAND_SALT
+    for row in range(1, ROWS):
+        # Wrapping multiplication is intended; a rare collision only adds a candidate
+        with np.errstate(over="ignore"):
+            keys = keys * _BAND_MIX ^ signatures[:, :, row]
+    return keys.T
+
+def same_numbers(a, b):
+    """Whether two sentences contain the same digit sequences in the same order ("chapter 3" vs "chapter 4")"""
+    return _NUMBERS.findall(a) == _NUMBERS.findall(b)
+
+def similarity(a, b):
+    longest = max(len(a), len(b))
+    return 1.0 - levenshtein(a, b) / longest if longest else 1.0
+
+def find_sources(paths):
+    """Segments files to learn from: files as given, directories as <dir>/*/segments.json (project folders)"""
+    sources = []
+    for path in paths or []:
+        if os.path.isfile(path):
+            sources.append(os.path.abspath(path))
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                candidate = os.path.join(path, name, SEGMENTS_FILE)
+                if os.path.isfile(candidate):
+                    sources.append(os.path.abspath(candidate))
+    return list(dict.fromkeys(sources))
+
+def source_identity(path):
+    """Size and mtime of the JSON file, its segment store (where editor changes land first) and its settings"""
+    identity = []
+    for candidate in (path, store_path(path), settings_path(path)):
+        try:
+            stat = os.stat(candidate)
+            identity.append([stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            identity.append(None)
+    return json.dumps(identity)
+
+def read_pairs(path):
+    """(source, translation) pairs with a usable translation from one segments file"""
+    try:
+        segments = load_segments(path)
+    except (OSError, ValueError):
+        return []
+    if not isinstance(segments, list):
+        return []
+
+    pairs = []
+    for seg in segments:
+        if not isinstance(seg, dict):
+            continue
+        text = (seg.get("text") or "").strip()
+        translation = (seg.get("translation") or "").strip()
+        if text and translation and translation != FAILED_TRANSLATION:
+            pairs.append((text, translation))
+    return pairs
+
+class Match:
+    """A stored pair similar to a query; same_numbers tells whether both contain the same numbers"""
+    __slots__ = ("similarity", "text", "translation", "same_numbers")
+
+    def __init__(self, similarity, text, translation, same_numbers=True):
+        self.similarity = similarity
+        self.text = text
+        self.translation = translation
+        self.same_numbers = same_numbers
+
+class TranslationMemory:
+    """In-memory MinHash/LSH index over (source, translation) pairs
+
+    Identical normalized sources keep the pair added last, so newer projects win. The band
+    index is one sorted array of every band key, built on the first lookup after pairs were added.
+    """
+
+    def __init__(self):
+        self.normalized = []
+        self.pairs = []
+        self.signatures = []
+        self.exact = {}
+        self.matrix = None
+        self.sorted_keys = None
+        self.key_pairs = None
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def add(self, text, translation, normalized=None, sig=None):
+        normalized = normalize(text) if normalized is None else normalized
+        if not normalized:
+            return
+        if normalized in self.exact:
+            self.pairs[self.exact[normalized]] = (text, translation)
+            return
+
+        sig = signature(normalized) if sig is None else sig
+        index = len(self.pairs)
+        self.exact[normalized] = index
+        self.normalized.append(normalized)
+        self.pairs.append((text, translation))
+        self.signatures.append(sig)
+        self.matrix = None
+
+    def _build(self):
+        self.matrix = np.vstack(self.signatures)
+        keys = band_keys(self.matrix).ravel()
+        order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[order]
+        # Pair index of every sorted key (keys are laid out band by band)
+        self.key_pairs = order % len(self.pairs)
+
+    def lookup(self, text, limit=MAX_HINTS, threshold=HINT_SIMILARITY):
+        """Up to limit matches at or above threshold, most similar first"""
+        normalized = normalize(text)
+        if not normalized or not self.pairs:
+            return []
+
+        index = self.exact.get(normalized)
+        if index is not None:
+            return [Match(1.0, *self.pairs[index])]
+
+        if self.matrix is None:
+            self._build()
+        sig = signature(normalized)
+        keys = band_keys(sig)[:, 0]
+        # Pairs sharing at least one band with the query
+        lows = np.searchsorted(self.sorted_keys, keys, side="left")
+        highs = np.searchsorted(self.sorted_keys, keys, side="right")
+        found = [self.key_pairs[low:high] for low, high in zip(lows, highs) if high > low]
+        if not found:
+            return []
+
+        candidates = np.unique(np.concatenate(found))
+        # Estimated Jaccard similarity - the share of matching MinHash values
+        estimates = (self.matrix[candidates] == sig).sum(axis=1)
+        ranked = np.argsort(-estimates, kind="stable")[:MAX_CANDIDATES]
+        best = candidates[ranked[estimates[ranked] >= MIN_ESTIMATE * NUM_PERM]]
+
+        matches = []
+        for index in best:
+            other = self.normalized[index]
+            # The length difference alone bounds the edit similarity
+            if min(len(normalized), len(other)) < threshold * max(len(normalized), len(other)):
+                continue
+            score = similarity(normalized, other)
+            if score >= threshold:
+                matches.append(Match(score, *self.pairs[index], same_numbers(normalized, other)))
+        matches.sort(key=lambda match: -match.similarity)
+        return matches[:limit]
+
+def load_memory(paths, db_path, settings, exclude=()):
+    """A TranslationMemory of the segments files found in paths that were translated with settings
+
+    settings come from translation_cache.translation_settings; files translated with other
+    languages or another prompt, files without recorded settings and those in exclude are
+    left out. Signatures are cached in the SQLite file at db_path and recomputed only for
+    files whose JSON, segment store or settings changed. Returns (memory, number of source files used).
+    """
+    excluded = {os.path.abspath(path) for path in exclude}
+    sources = [path for path in find_sources(paths) if path not in excluded]
+    # Oldest first, so the newest project's translation of a sentence wins
+    sources.sort(key=lambda path: os.path.getmtime(path))
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS files")
+            conn.execute("DROP TABLE IF EXISTS pairs")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, identity TEXT NOT NULL, settings TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pairs ("
+            "file TEXT NOT NULL, source TEXT NOT NULL, translation TEXT NOT NULL, "
+            "normalized TEXT NOT NULL, signature BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS pairs_file ON pairs (file)")
+        known = {path: (identity, stored) for path, identity, stored in conn.execute("SELECT * FROM files")}
+        wanted = json.dumps(settings, sort_keys=True)
+
+        # Forget projects that were deleted
+        for path in known:
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM pairs WHERE file = ?", (path,))
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+        memory = TranslationMemory()
+        used = 0
+        for path in sources:
+            identity = source_identity(path)
+            known_identity, stored = known.get(path, (None, None))
+            if known_identity != identity:
+                file_settings = read_settings(path)
+                stored = json.dumps(file_settings, sort_keys=True) if file_settings is not None else None
+                rows = []
+                for text, translation in read_pairs(path):
+                    normalized = normalize(text)
+                    if normalized:
+                        rows.append((path, text, translation, normalized, signature(normalized).tobytes()))
+                conn.execute("DELETE FROM pairs WHERE file = ?", (path,))
+                conn.executemany("INSERT INTO pairs VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (path, identity, stored))
+
+            if stored != wanted:
+                continue
+            used += 1
+            for text, translation, normalized, sig in conn.execute(
+                    "SELECT source, translation, normalized, signature FROM pairs WHERE file = ? ORDER BY rowid", (path,)):
+                memory.add(text, translation, normalized, np.frombuffer(sig, dtype=np.uint64))
+        conn.commit()
+    finally:
+        conn.close()
+    return memory, used
@@ -0,0 +1,142 @@
+import json
+import queue
+import sys
+import threading
+from collections import OrderedDict
+from job_control import JobCancelled, JobControl, handle_signals, parse_command
+from stages import load_transcriber
+
+transcriber = load_transcriber()
+
+log_status = transcriber.log_status
+
+def log_job(job_id, status, error=None):
+    """Report job lifecycle events so Electron can match output to the request that started it"""
+    job_data = {
+        "type": "job",
+        "id": job_id,
+        "status": status
+    }
+    if error:
+        job_data["error"] = error
+    print(f"JOB:{json.dumps(job_data)}", flush=True)
+
+class ModelCache:
+    """Keeps the most recently used models loaded, keyed by backend, model size and device"""
+
+    def __init__(self, max_models=1):
+        self.max_models = max(1, max_models)
+        self.models = OrderedDict()
+
+    def get(self, model_size, backend="whisper"):
+        device = "cuda" if transcriber.gpu_available() else "cpu"
+        key = (backend, model_size, device)
+
+        if key in self.models:
+            self.models.move_to_end(key)
+            log_status("info", f"Reusing loaded {backend} model: {model_size} ({device})")
+            return self.models[key]
+
+        # Evict least recently used models before loading a new one to keep peak memory down
+        while len(self.models) >= self.max_models:
+            evicted_key, evicted_model = self.models.popitem(last=False)
+            del evicted_model
+            transcriber.force_garbage_collection()
+            log_status("info", f"Unloaded {evicted_key[0]} model: {evicted_key[1]} ({evicted_key[2]})")
+
+        model = transcriber.load_model(model_size, backend)
+        self.models[key] = model
+        return model
+
+def run_job(job, cache, control):
+    """Run a single transcription job, returning an error message or None on success"""
+    try:
+        transcriber.transcribe_job(job, model_loader=cache.get, control=control)
+        return None
+    except JobCancelled:
+        raise
+    except SystemExit:
+        # transcribe_audio exits after reporting the failure through log_status
+        return "Transcription failed"
+    except Exception as e:
+        log_status("error", f"Transcription failed: {str(e)}")
+        return str(e)
+
+class JobReader:
+    """Reads stdin on its own thread, so control commands reach the job that is running
+
+    Job lines are queued for the main loop; pause/resume/cancel lines (see job_control) go
+    straight to the current job's control when their id matches it (or has no id).
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.current = None
+        self.current_id = None
+        self.lock = threading.Lock()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            command = parse_command(line)
+            if command:
+                name, job_id = command
+                with self.lock:
+                    if self.current and job_id in (None, self.current_id):
+                        self.current.apply(name)
+                continue
+
+            self.jobs.put(line)
+        # Electron closed stdin
+        self.jobs.put(None)
+
+    def start(self, job_id):
+        with self.lock:
+            self.current = JobControl(log_status)
+            self.current_id = job_id
+            return self.current
+
+    def finish(self):
+        with self.lock:
+            self.current = None
+            self.current_id = None
+
+def main():
+    max_models = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    cache = ModelCache(max_models=max_models)
+    reader = JobReader()
+    # SIGTERM cancels the running job at the next chunk; between jobs it stops the worker
+    handle_signals(lambda: reader.current)
+
+    log_status("info", f"Transcription worker ready (keeping up to {cache.max_models} model(s) loaded)")
+
+    # One JSON job per line; the worker exits when Electron closes stdin
+    while True:
+        line = reader.jobs.get()
+        if line is None:
+            break
+
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            log_status("error", f"Invalid job JSON: {str(e)}")
+            continue
+
+        job_id = job.get("id")
+        control = reader.start(job_id)
+        log_job(job_id, "started")
+        try:
+            error = run_job(job, cache, control)
+            status = "failed" if error else "done"
+        except JobCancelled:
+            error, status = None, "cancelled"
+        finally:
+            reader.finish()
+        log_job(job_id, status, error)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+// Append-only segment store kept next to a JSON segments file.
+// Same on-disk format as python/segment_store.py (see there for the record layout):
+// an edit appends one line, and the log is compacted into a snapshot once most of it is superseded.
+const fs = require('fs');
+const path = require('path');
+
+const STORE_SUFFIX = '.segments.log';
+const HEADER = { format: 'slider-segments', version: 1 };
+
+// Compact once the log has this many lines and at least half of them are superseded
+const COMPACT_MIN_RECORDS = 200;
+
+// Fields that move a segment in the slide/time indexes
+const INDEXED_FIELDS = ['slide', 'start', 'end', 'startTime', 'endTime'];
+
+function storePath(jsonPath) {
+  const parsed = path.parse(jsonPath);
+  return path.join(parsed.dir, parsed.name + STORE_SUFFIX);
+}
+
+// Transcription output uses start/end, the editor model startTime/endTime
+function segmentTimes(segment) {
+  const start = segment.start ?? segment.startTime ?? 0;
+  const end = segment.end ?? segment.endTime ?? start;
+  return [start, end];
+}
+
+// The ids when every segment has a unique one, else positions
+function segmentKeys(segments) {
+  const ids = segments.map(segment => (segment && typeof segment === 'object' ? segment.id : undefined));
+  if (ids.every(id => Number.isInteger(id)) && new Set(ids).size === ids.length) {
+    return ids;
+  }
+  return segments.map((_segment, index) => index);
+}
+
+// Size and whole-millisecond mtime, comparable with what the Python side records
+function fileIdentity(filePath) {
+  const stat = fs.statSync(filePath, { bigint: true });
+  return { size: Number(stat.size), mtime: Number(stat.mtimeNs / 1000000n) };
+}
+
+function sameIdentity(a, b) {
+  return !!a && !!b && a.size === b.size && a.mtime === b.mtime;
+}
+
+function writeLines(filePath, records) {
+  const tmpPath = `${filePath}.tmp`;
+  fs.writeFileSync(tmpPath, records.map(record => JSON.stringify(record) + '\n').join(''), 'utf-8');
+  fs.renameSync(tmpPath, filePath);
+}
+
+class SegmentStore {
+  constructor(jsonPath) {
+    this.jsonPath = jsonPath;
+    this.path = storePath(jsonPath);
+    this.segments = new Map();
+    this.records = 0;
+    this.synced = null;
+    this.logIdentity = null;
+    this.index = null;
+  }
+
+  // Load the log, importing the JSON file when it is newer than the store's view of it
+  open() {
+    this.load();
+    if (fs.existsSync(this.jsonPath)) {
+      if (!sameIdentity(this.synced, fileIdentity(this.jsonPath))) {
+        const segments = JSON.parse(fs.readFileSync(this.jsonPath, 'utf-8'));
+        if (!Array.isArray(segments)) {
+          throw new Error('Segments file must contain a JSON array of segments');
+        }
+        this.replace(segments, true);
+      }
+    } else if (!fs.existsSync(this.path)) {
+      this.replace([]);
+    }
+    return this;
+  }
+
+  // Reload when the log or the JSON file was written by someone else (a Python stage, write-json-file)
+  refresh() {
+    const logChanged = !fs.existsSync(this.path) || !sameIdentity(this.logIdentity, fileIdentity(this.path));
+    const jsonChanged = fs.existsSync(this.jsonPath) && !sameIdentity(this.synced, fileIdentity(this.jsonPath));
+    if (logChanged || jsonChanged) {
+      this.open();
+    }
+    return this;
+  }
+
+  load() {
+    this.segments = new Map();
+    this.records = 0;
+    this.synced = null;
+    this.index = null;
+    if (!fs.existsSync(this.path)) {
+      return;
+    }
+
+    const data = fs.readFileSync(this.path);
+    let valid = 0;
+    let lineNumber = 0;
+    while (valid < data.length) {
+      const newline = data.indexOf(0x0a, valid);
+      const lineEnd = newline === -1 ? data.length : newline + 1;
+      let record;
+      try {
+        record = JSON.parse(data.subarray(valid, lineEnd).toString('utf-8'));
+      } catch (e) {
+        // A crash mid-append leaves a partial last line; everything before it is valid
+        break;
+      }
+      if (lineNumber === 0) {
+        if (record.format !== HEADER.format) {
+          throw new Error(`Not a segment store: ${this.path}`);
+        }
+      } else {
+        this.apply(record);
+        this.records++;
+      }
+      lineNumber++;
+      valid = lineEnd;
+    }
+
+    if (valid < data.length) {
+      fs.truncateSync(this.path, valid);
+    }
+    this.logIdentity = fileIdentity(this.path);
+  }
+
+  apply(record) {
+    if (record.op === 'put') {
+      this.segments.set(record.id, record.segment);
+    } else if (record.op === 'patch' && this.segments.has(record.id)) {
+      this.segments.set(record.id, { ...this.segments.get(record.id), ...record.fields });
+    } else if (record.op === 'delete') {
+      this.segments.delete(record.id);
+    } else if (record.op === 'sync') {
+      this.synced = { size: record.size, mtime: record.mtime };
+    }
+  }
+
+  append(record) {
+    fs.appendFileSync(this.path, JSON.stringify(record) + '\n', 'utf-8');
+    this.apply(record);
+    this.records++;
+    this.logIdentity = fileIdentity(this.path);
+  }
+
+  snapshot() {
+    const records = [HEADER];
+    for (const [id, segment] of this.segments) {
+      records.push({ op: 'put', id, segment });
+    }
+    if (this.synced) {
+      records.push({ op: 'sync', ...this.synced });
+    }
+    return records;
+  }
+
+  // Reads
+
+  all() {
+    return Array.from(this.segments.values());
+  }
+
+  buildIndex() {
+    const byStart = Array.from(this.segments, ([id, segment]) => [segmentTimes(segment)[0], id])
+      .sort((a, b) => a[0] - b[0]);
+    let longest = 0;
+    const slides = new Map();
+    for (const [id, segment] of this.segments) {
+      const [start, end] = segmentTimes(segment);
+      longest = Math.max(longest, end - start);
+      const slide = segment.slide ?? 0;
+      if (!slides.has(slide)) slides.set(slide, []);
+      slides.get(slide).push(id);
+    }
+    this.index = {
+      starts: byStart.map(([start]) => start),
+      ids: byStart.map(([, id]) => id),
+      longest,
+      slides
+    };
+    return this.index;
+  }
+
+  // Segments on a slide and/or overlapping the time range [start, end), in store order
+  query({ slide, start, end } = {}) {
+    const index = this.index || this.buildIndex();
+    const hasSlide = slide !== undefined && slide !== null;
+    const hasStart = start !== undefined && start !== null;
+    const hasEnd = end !== undefined && end !== null;
+
+    if (!hasStart && !hasEnd) {
+      const ids = hasSlide ? (index.slides.get(slide) || []) : Array.from(this.segments.keys());
+      return ids.map(id => this.segments.get(id));
+    }
+
+    // Only segments starting within one segment-length before the range can overlap it
+    const low = hasStart ? start : -Infinity;
+    const high = hasEnd ? end : Infinity;
+    const first = lowerBound(index.starts, low - index.longest);
+    const last = lowerBound(index.starts, high);
+    const matches = new Set();
+    for (const id of index.ids.slice(first, last)) {
+      const segment = this.segments.get(id);
+      const [segmentStart, segmentEnd] = segmentTimes(segment);
+      if ((segmentEnd > low || segmentStart === low) && (!hasSlide || (segment.slide ?? 0) === slide)) {
+        matches.add(id);
+      }
+    }
+    return Array.from(this.segments.keys()).filter(id => matches.has(id)).map(id => this.segments.get(id));
+  }
+
+  // Writes
+
+  put(id, segment) {
+    this.append({ op: 'put', id, segment });
+    this.index = null;
+    this.maybeCompact();
+  }
+
+  patch(id, fields) {
+    if (!this.segments.has(id)) {
+      throw new Error(`No segment with id ${id}`);
+    }
+    this.append({ op: 'patch', id, fields });
+    if (INDEXED_FIELDS.some(field => field in fields)) {
+      this.index = null;
+    }
+    this.maybeCompact();
+  }
+
+  delete(id) {
+    if (this.segments.has(id)) {
+      this.append({ op: 'delete', id });
+      this.index = null;
+      this.maybeCompact();
+    }
+  }
+
+  // Replace every segment (a JSON import); sync=true records the JSON file as up to date
+  replace(segments, sync = false) {
+    const keys = segmentKeys(segments);
+    this.segments = new Map(keys.map((key, index) => [key, segments[index]]));
+    this.synced = sync ? fileIdentity(this.jsonPath) : null;
+    this.index = null;
+    this.compact();
+  }
+
+  // Write the segments to the JSON file, pretty-printed as before the store existed
+  export() {
+    const tmpPath = `${this.jsonPath}.tmp`;
+    fs.writeFileSync(tmpPath, JSON.stringify(this.all(), null, 2), 'utf-8');
+    fs.renameSync(tmpPath, this.jsonPath);
+    this.append({ op: 'sync', ...fileIdentity(this.jsonPath) });
+  }
+
+  compact() {
+    writeLines(this.path, this.snapshot());
+    this.records = this.segments.size + (this.synced ? 1 : 0);
+    this.logIdentity = fileIdentity(this.path);
+  }
+
+  maybeCompact() {
+    if (this.records >= COMPACT_MIN_RECORDS && this.records > 2 * (this.segments.size + 1)) {
+      this.compact();
+    }
+  }
+}
+
+function lowerBound(values, target) {
+  let low = 0;
+  let high = values.length;
+  while (low < high) {
+    const middle = (low + high) >> 1;
+    if (values[middle] < target) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+
+// Stores stay loaded between calls; each call first picks up changes made by other writers
+const openStores = new Map();
+
+function openStore(jsonPath) {
+  const key = path.resolve(jsonPath);
+  const cached = openStores.get(key);
+  if (cached) {
+    return cached.refresh();
+  }
+  const store = new SegmentStore(key).open();
+  openStores.set(key, store);
+  return store;
+}
+
+function closeStore(jsonPath) {
+  openStores.delete(path.resolve(jsonPath));
+}
+
+module.exports = { SegmentStore, openStore, closeStore, storePath };
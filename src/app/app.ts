@@ -57,7 +57,7 @@ export class App implements OnInit {
     try {
       await this.sharedService.loadImages(projectName);
       const filePath = (await window.electron.getProjectPath(projectName)).path + "/segments.json";
-      const json = await window.electron.readJsonFile(filePath || '');
+      const json = await window.electron.loadSegments(filePath || '');
       if (json.success) {
         this.sharedService.setSegmnents(json.data as SegmentModel[]);
       }
@@ -92,7 +92,16 @@ export class App implements OnInit {
   }
 
   async saveProject() {
-    // Implementation for save project
+    // Edits are saved to the segment store as they are made; write them through to segments.json
+    const projectName = this.sharedService.projectName();
+    if (!projectName) {
+      return;
+    }
+    try {
+      await this.segmentService.exportSegments(projectName);
+    } catch (err) {
+      console.error('❌ Failed to save project:', err);
+    }
   }
 
   newProject() {
@@ -174,6 +183,25 @@ export class App implements OnInit {
     }
   }
 
+  async detectSlides() {
+    const projectName = this.sharedService.projectName();
+
+    if (!projectName) {
+      console.log('No project selected.');
+      return;
+    }
+
+    // Only segments without a slide are assigned, so manual edits are kept
+    const result = await window.electron.runSlideDetection({ projectName });
+
+    if (result.success) {
+      this.loadData(projectName);
+    } else {
+      console.error('Error detecting slides:', result.error);
+      alert(`Slide detection failed: ${result.error}`);
+    }
+  }
+
   async loadTranslated() {
     const projectName = this.sharedService.projectName();
     if (!projectName) {
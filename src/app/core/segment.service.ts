@@ -13,6 +13,27 @@ export class SegmentService {
         }
     }
 
+    async patchSegment(projectName: string, id: number, fields: Partial<SegmentModel>): Promise<void> {
+        // Appends one record to the segment store instead of rewriting the whole file
+        const result = await window.electron.patchSegment(await this.segmentsPath(projectName), id, fields);
+        if (!result.success) {
+            console.error('Error saving segment:', result.error);
+            throw new Error('Failed to save segment.');
+        }
+    }
+
+    async exportSegments(projectName: string): Promise<void> {
+        const result = await window.electron.exportSegments(await this.segmentsPath(projectName));
+        if (!result.success) {
+            console.error('Error exporting segments:', result.error);
+            throw new Error('Failed to export segments.');
+        }
+    }
+
+    private async segmentsPath(projectName: string): Promise<string> {
+        return (await window.electron.getProjectPath(projectName)).path + '/segments.json';
+    }
+
     async writeSegmentsToFile(data: any, projectName: string, fileName: string): Promise<SegmentModel[]> {
         const segments = this.convertToOriginalSegmentModels(data || []);
         const convertedData = this.convertToSegmentModel(segments);
@@ -58,12 +58,17 @@ export class Editor {
       );
 
       this.sharedService.setSegmnents(segments); // trigger reactivity
+      this.patchSegment(id, { slide: 0 });
     }
   }
 
   async saveEdit(index: number) {
     const segment = this.filteredSegments()[index];
-    await this.saveSegments();
+    await this.patchSegment(segment.id, {
+      translation: segment.translation,
+      delayStartSeconds: segment.delayStartSeconds,
+      delayEndSeconds: segment.delayEndSeconds
+    });
     this.originalSegments.delete(segment.id);
     this.editingIndex.set(null);
   }
@@ -83,6 +88,24 @@ export class Editor {
   }
 
 
+  // Saves just the edited fields of one segment
+  async patchSegment(id: number, fields: Partial<SegmentModel>) {
+    const projectName = this.sharedService.projectName();
+
+    if (!projectName) {
+      console.warn('No project name set in SharedService');
+      return;
+    }
+
+    try {
+      await this.segmentService.patchSegment(projectName, id, fields);
+      console.log(`✅ Segment ${id} saved successfully.`);
+    } catch (err) {
+      console.error('❌ Failed to save segment:', err);
+      alert('Failed to save segment. Please try again.');
+    }
+  }
+
   async saveSegments() {
     const projectName = this.sharedService.projectName();
 
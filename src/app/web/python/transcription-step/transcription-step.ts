@@ -14,15 +14,20 @@ export class TranscriptionStep implements OnInit, OnDestroy {
 
   // Signals
   isTranscribing = signal<boolean>(false);
+  isPaused = signal<boolean>(false);
   progress = signal<number>(0);
   statusMessage = signal<string>('');
   hasError = signal<boolean>(false);
   transcriptionResult = signal<string>('');
   isApplyingCorrections = signal<boolean>(false); // Added for corrections button
+  // Segments streamed by the transcriber while later parts of the audio are still decoding
+  liveSegments = signal<{ index: number; text: string; start: number; end: number }[]>([]);
   
   // Transcription settings
   language = signal<string>('he');
   modelSize = signal<string>('medium');
+  workers = signal<number | 'auto'>('auto');
+  backend = signal<string>('whisper');
 
   // Output
   transcriptionCompleted = output<{ result: string; success: boolean }>();
@@ -36,6 +41,19 @@ export class TranscriptionStep implements OnInit, OnDestroy {
     { value: 'large', label: 'Large (Slowest, Best Accuracy)' }
   ];
   
+  workerOptions: { value: number | 'auto'; label: string }[] = [
+    { value: 'auto', label: 'Auto (Fit Available Memory)' },
+    { value: 1, label: '1 (Lowest Memory)' },
+    { value: 2, label: '2 Workers' },
+    { value: 4, label: '4 Workers' },
+    { value: 8, label: '8 Workers (Needs Lots of RAM)' }
+  ];
+  
+  backendOptions = [
+    { value: 'whisper', label: 'Whisper (Reference)' },
+    { value: 'faster-whisper', label: 'Faster-Whisper (int8 on CPU)' }
+  ];
+  
   languageOptions = [
     { value: 'he', label: 'Hebrew' },
     { value: 'en', label: 'English' },
@@ -79,6 +97,11 @@ export class TranscriptionStep implements OnInit, OnDestroy {
         this.statusMessage.set(data.message);
         this.hasError.set(data.status === 'error');
       });
+
+      window.electron.onTranscriptionSegment((data) => {
+        const { type, ...segment } = data;
+        this.liveSegments.update(segments => [...segments, segment]);
+      });
     } else {
       console.warn('Electron API not available. Running in a non-Electron environment.');
     }
@@ -97,10 +120,12 @@ export class TranscriptionStep implements OnInit, OnDestroy {
     }
 
     this.isTranscribing.set(true);
+    this.isPaused.set(false);
     this.progress.set(0);
     this.statusMessage.set('Starting transcription...');
     this.hasError.set(false);
     this.transcriptionResult.set('');
+    this.liveSegments.set([]);
 
     try {
       // Ensure window.electron exists before calling its methods
@@ -114,12 +139,17 @@ export class TranscriptionStep implements OnInit, OnDestroy {
         audioPath: this.audioPath(),
         outputPath: outputPath,
         language: this.language(),
-        modelSize: this.modelSize()
+        modelSize: this.modelSize(),
+        workers: this.workers() === 'auto' ? 'auto' : Number(this.workers()),
+        backend: this.backend()
       });
 
       if (result.success) {
         this.progress.set(100);
-        this.statusMessage.set('✅ Transcription completed successfully!');
+        // Chunks that still failed after their retries are left out of the transcript
+        this.statusMessage.set(result.warnings?.length
+          ? `⚠️ Transcription completed with ${result.warnings.length} error(s), first: ${result.warnings[0]}`
+          : '✅ Transcription completed successfully!');
         this.hasError.set(false);
         this.transcriptionResult.set('Transcription saved to: ' + outputPath);
         
@@ -127,6 +157,12 @@ export class TranscriptionStep implements OnInit, OnDestroy {
           result: outputPath,
           success: true
         });
+      } else if (result.cancelled) {
+        this.statusMessage.set(result.error || 'Transcription cancelled');
+        this.transcriptionCompleted.emit({
+          result: '',
+          success: false
+        });
       } else {
         this.showError(result.error || 'Unknown transcription error occurred');
         this.transcriptionCompleted.emit({
@@ -142,9 +178,23 @@ export class TranscriptionStep implements OnInit, OnDestroy {
       });
     } finally {
       this.isTranscribing.set(false);
+      this.isPaused.set(false);
+    }
+  }
+
+  // The chunk being decoded finishes first; finished chunks are reused by the next run
+  async togglePause() {
+    const command = this.isPaused() ? 'resume' : 'pause';
+    const result = await window.electron.controlJob({ job: 'transcription', command });
+    if (result.success) {
+      this.isPaused.set(command === 'pause');
     }
   }
 
+  async cancelTranscription() {
+    await window.electron.controlJob({ job: 'transcription', command: 'cancel' });
+  }
+
   // Placeholder for applying corrections - implement actual logic here
   async applyCorrectionsToFile() {
     this.isApplyingCorrections.set(true);
@@ -178,6 +228,12 @@ export class TranscriptionStep implements OnInit, OnDestroy {
     }
   }
 
+  formatTime(seconds: number): string {
+    const minutes = Math.floor(seconds / 60);
+    const rest = Math.floor(seconds % 60);
+    return `${minutes}:${rest.toString().padStart(2, '0')}`;
+  }
+
   getDisplayPath(path: string): string {
     if (!path) return '';
     // Example: if path is a full system path, you might want to show just the filename
@@ -37,6 +37,7 @@ export class TranslationStep implements OnInit, OnDestroy {
 
   // Processing state
   isProcessing = signal<boolean>(false);
+  isPaused = signal<boolean>(false);
   progress = signal<number>(0);
   translationPath = signal<string>('');
 
@@ -122,6 +123,12 @@ export class TranslationStep implements OnInit, OnDestroy {
         this.hasError.set(false);
         break;
 
+      case 'paused':
+      case 'cancelled':
+        this.statusMessage.set(data.message);
+        this.hasError.set(false);
+        break;
+
       default:
         console.log('Unknown translation status:', data);
     }
@@ -197,6 +204,7 @@ export class TranslationStep implements OnInit, OnDestroy {
     }
 
     this.isProcessing.set(true);
+    this.isPaused.set(false);
     this.progress.set(0);
     this.hasError.set(false);
     this.statusMessage.set('Starting translation...');
@@ -221,7 +229,10 @@ export class TranslationStep implements OnInit, OnDestroy {
 
       if (result.success) {
         this.progress.set(100);
-        this.statusMessage.set('✅ Translation completed successfully!');
+        // Segments that still failed are saved as [translation_error]
+        this.statusMessage.set(result.warnings?.length
+          ? `⚠️ Translation completed with ${result.warnings.length} error(s), first: ${result.warnings[0]}`
+          : '✅ Translation completed successfully!');
         this.translationPath.set(outputPath);
 
         // Emit completion event
@@ -229,6 +240,12 @@ export class TranslationStep implements OnInit, OnDestroy {
           result: outputPath,
           success: true
         });
+      } else if (result.cancelled) {
+        this.statusMessage.set(result.error || 'Translation cancelled');
+        this.translationCompleted.emit({
+          result: '',
+          success: false
+        });
       } else {
         this.showError(result.error || 'Translation failed');
         this.translationCompleted.emit({
@@ -244,6 +261,20 @@ export class TranslationStep implements OnInit, OnDestroy {
       });
     } finally {
       this.isProcessing.set(false);
+      this.isPaused.set(false);
+    }
+  }
+
+  // Requests already sent finish first; finished translations are kept for the next run
+  async togglePause() {
+    const command = this.isPaused() ? 'resume' : 'pause';
+    const result = await window.electron.controlJob({ job: 'translation', command });
+    if (result.success) {
+      this.isPaused.set(command === 'pause');
     }
   }
+
+  async cancelTranslation() {
+    await window.electron.controlJob({ job: 'translation', command: 'cancel' });
+  }
 }
\ No newline at end of file
@@ -19,6 +19,17 @@ declare global {
       getProjectPath: (projectName: string) => Promise<{ success: boolean; path?: string; error?: string; }>;
       getAppPath: () => Promise<{ success: boolean; path?: string; error?: string; }>;
 
+      // Segment store methods (filePath is the segments JSON file the store belongs to)
+      loadSegments: (filePath: string) => Promise<{ success: boolean; data?: any[]; error?: string; }>;
+      querySegments: (filePath: string, query: {
+        slide?: number;
+        start?: number;
+        end?: number;
+      }) => Promise<{ success: boolean; data?: any[]; error?: string; }>;
+      patchSegment: (filePath: string, id: number, fields: { [key: string]: any }) => Promise<{ success: boolean; error?: string; }>;
+      importSegments: (filePath: string, segments: any[]) => Promise<{ success: boolean; path?: string; error?: string; }>;
+      exportSegments: (filePath: string) => Promise<{ success: boolean; path?: string; error?: string; }>;
+
       // Video file selection and management methods
       selectVideoFile: () => Promise<string | null>;
       copyVideoToProject: (data: {
@@ -36,11 +47,19 @@ declare global {
       checkPythonDependencies: () => Promise<{
         python: boolean;
         ffmpeg: boolean;
-        ready: boolean
+        ready: boolean;
+        environment?: {
+          python: { executable: string; version: string; prefix: string; venv: boolean; path: string[] };
+          packages: Record<string, { installed: boolean; version: string | null }>;
+          backends: string[];
+          tools: Record<string, string | null>;
+          ready: boolean;
+          cached: boolean;
+        };
       }>;
 
       // Audio extraction methods
-      runAudioExtraction: (inputPath: string, outputPath: string) => Promise<{
+      runAudioExtraction: (inputPath: string, outputPath: string, segments?: number | 'auto') => Promise<{
         success: boolean;
         error?: string
       }>;
@@ -60,10 +79,20 @@ declare global {
         audioPath: string;
         outputPath: string;
         corrections?: string;
+        correctionsPath?: string;
         language?: string;
         modelSize?: string;
+        chunkSeconds?: number | 'auto';
+        overlapSeconds?: number;
+        workers?: number | 'auto';
+        resume?: boolean;
+        backend?: 'whisper' | 'faster-whisper';
+        memoryBudgetMb?: number;
       }) => Promise<{
         success: boolean;
+        cancelled?: boolean;
+        // Chunks or segments that failed in a run that still completed
+        warnings?: string[];
         error?: string
       }>;
       onTranscriptionProgress: (callback: (data: {
@@ -73,9 +102,16 @@ declare global {
       }) => void) => void;
       onTranscriptionStatus: (callback: (data: {
         type: string;
-        status: 'info' | 'success' | 'error' | 'warning';
+        status: 'info' | 'success' | 'error' | 'warning' | 'paused' | 'cancelled';
         message: string
       }) => void) => void;
+      onTranscriptionSegment: (callback: (data: {
+        type: 'segment';
+        index: number;
+        text: string;
+        start: number;
+        end: number;
+      }) => void) => void;
       removeTranscriptionListeners: () => void;
 
       // Corrections methods
@@ -102,18 +138,162 @@ declare global {
         sourceLanguage?: string;
         targetLanguage?: string;
         model?: string;
+        concurrency?: number;
+        batchSize?: number;
+        resume?: boolean;
+        useMemory?: boolean;
       }) => Promise<{
         success: boolean;
+        cancelled?: boolean;
+        // Chunks or segments that failed in a run that still completed
+        warnings?: string[];
         error?: string
       }>;
       onTranslationStatus: (callback: (data: {
         type: string;
-        status: 'info' | 'success' | 'error' | 'warning' | 'progress';
+        status: 'info' | 'success' | 'error' | 'warning' | 'progress' | 'paused' | 'cancelled';
         message: string;
         percent?: number;
       }) => void) => void;
       removeTranslationListeners: () => void;
 
+      // Pause, resume or cancel a running transcription or translation; it stops at the next
+      // chunk or request and saves what it has finished
+      controlJob: (params: {
+        job: 'transcription' | 'translation';
+        command: 'pause' | 'resume' | 'cancel';
+      }) => Promise<{
+        success: boolean;
+        error?: string
+      }>;
+
+      runPipeline: (params: {
+        videoPath: string;
+        audioPath: string;
+        transcriptionPath: string;
+        translationPath?: string;
+        corrections?: string;
+        correctionsPath?: string;
+        language?: string;
+        modelSize?: string;
+        chunkSeconds?: number | 'auto';
+        overlapSeconds?: number;
+        backend?: 'whisper' | 'faster-whisper';
+        memoryBudgetMb?: number;
+        apiKey?: string;
+        systemPrompt?: string;
+        sourceLanguage?: string;
+        targetLanguage?: string;
+        model?: string;
+        concurrency?: number;
+        batchSize?: number;
+      }) => Promise<{
+        success: boolean;
+        translated?: boolean;
+        // Chunks or segments that failed in a run that still completed
+        warnings?: string[];
+        error?: string
+      }>;
+      onPipelineProgress: (callback: (data: {
+        type: string;
+        percent: number;
+        stages: { extract: number; transcribe: number; translate?: number };
+      }) => void) => void;
+      onPipelineStatus: (callback: (data: {
+        type: string;
+        status: 'info' | 'success' | 'error' | 'warning';
+        message: string;
+        stage?: 'extract' | 'transcribe' | 'translate';
+      }) => void) => void;
+      removePipelineListeners: () => void;
+
+      runBatch: (params: {
+        projectDir: string;
+        videos?: string[];
+        folder?: string;
+        transcription?: {
+          corrections?: string;
+          correctionsPath?: string;
+          language?: string;
+          modelSize?: string;
+          chunkSeconds?: number | 'auto';
+          overlapSeconds?: number;
+          workers?: number | 'auto';
+          backend?: 'whisper' | 'faster-whisper';
+          memoryBudgetMb?: number;
+        };
+        translation?: {
+          apiKey?: string;
+          systemPrompt?: string;
+          sourceLanguage?: string;
+          targetLanguage?: string;
+          model?: string;
+          concurrency?: number;
+          batchSize?: number;
+        };
+        pools?: { extract?: number; transcribe?: number; translate?: number };
+        retryFailed?: boolean;
+      }) => Promise<{
+        success: boolean;
+        summary?: string;
+        error?: string
+      }>;
+      getBatchQueue: (projectDir: string) => Promise<{
+        success: boolean;
+        jobs: {
+          id: number;
+          video_path: string;
+          output_dir: string;
+          stage: 'extract' | 'transcribe' | 'translate' | 'done';
+          state: 'pending' | 'running' | 'failed' | 'done';
+          error: string | null;
+          created: number;
+          updated: number;
+        }[];
+        error?: string;
+      }>;
+      onBatchProgress: (callback: (data: {
+        type: string;
+        percent: number;
+        job: number;
+        video: string;
+        stage: string;
+      }) => void) => void;
+      onBatchStatus: (callback: (data: {
+        type: string;
+        status: 'info' | 'success' | 'error' | 'warning' | 'progress';
+        message: string;
+        job?: number;
+        video?: string;
+        stage?: string;
+      }) => void) => void;
+      removeBatchListeners: () => void;
+
+      // Slide detection methods
+      runSlideDetection: (params: {
+        projectName: string;
+        videoPath?: string;
+        segmentsPath?: string;
+        timesPath?: string;
+        fps?: number;
+        overwrite?: boolean;
+      }) => Promise<{
+        success: boolean;
+        segmentsPath?: string;
+        slidesPath?: string;
+        error?: string
+      }>;
+      onSlideDetectionProgress: (callback: (data: {
+        type: string;
+        percent: number
+      }) => void) => void;
+      onSlideDetectionStatus: (callback: (data: {
+        type: string;
+        status: 'info' | 'success' | 'error' | 'warning';
+        message: string
+      }) => void) => void;
+      removeSlideDetectionListeners: () => void;
+
       // Python environment setup methods
       setupLocalPython: () => Promise<{
         success: boolean;